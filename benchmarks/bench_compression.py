@@ -0,0 +1,85 @@
+"""
+Benchmark pyburn's compression profiles: output size against write time.
+
+Writes a synthetic T21 dataset (32x64 grid, 10 levels, 12 output times, 20 surface and 20 column
+variables) with the netCDF and HDF5 writers under each compression profile, plus a couple of
+lossy variants, and prints a table of file sizes and write times.
+
+Usage:
+
+    python benchmarks/bench_compression.py [workdir]
+"""
+import numpy as np
+import os, sys, time, shutil, tempfile
+import exoplasimlegacy.pyburn as pyburn
+
+NLAT  = 32
+NLON  = 64
+NLEV  = 10
+NTIME = 12
+
+CASES = [("default"            ,None      ,None),
+         ("fast"               ,"fast"    ,None),
+         ("balanced"           ,"balanced",None),
+         ("archive"            ,"archive" ,None),
+         ("balanced+keepbits12","balanced",{"keepbits":12}),
+         ("balanced+float16"   ,"balanced",{"precision":"float16"}),
+         ]
+
+def smoothfield(shape):
+    """Smooth, weather-like field, so that compression behaves roughly as it does on model output."""
+    field = np.ones(shape)
+    for axis,n in enumerate(shape):
+        profile = np.sin(np.linspace(0,np.pi*np.random.uniform(1,3),n)+np.random.uniform(0,np.pi))
+        field = field*(1.5+profile.reshape([n if k==axis else 1 for k in range(len(shape))]))
+    return 250.0+10.0*field+0.01*np.random.standard_normal(shape)
+
+def makedataset(n2d=20,n3d=20):
+    rdataset = {}
+    rdataset["lat" ] = [np.linspace(-90,90,NLAT),["lat","latitude","deg"]]
+    rdataset["lon" ] = [np.arange(NLON)/float(NLON)*360.0,["lon","longitude","deg"]]
+    rdataset["lev" ] = [np.linspace(0.05,0.95,NLEV),["lev","sigma_coordinate","nondimensional"]]
+    rdataset["levp"] = [np.linspace(0,1,NLEV+1),["levp","half_sigma_coordinate","nondimensional"]]
+    rdataset["time"] = [np.arange(NTIME,dtype=float),["time","timestep_of_year","timesteps"]]
+    for n in range(n2d):
+        rdataset["sfc%02d"%n] = [smoothfield((NTIME,NLAT,NLON)),
+                                 ["sfc%02d"%n,"surface_%02d"%n,"K","%d"%n,("time","lat","lon")]]
+    for n in range(n3d):
+        rdataset["col%02d"%n] = [smoothfield((NTIME,NLEV,NLAT,NLON)),
+                                 ["col%02d"%n,"column_%02d"%n,"K","%d"%(n+100),
+                                  ("time","lev","lat","lon")]]
+    return rdataset
+
+def copydataset(rdataset):
+    #The writers may modify metadata in place, so give each one a fresh copy
+    return dict([(key,[rdataset[key][0],list(rdataset[key][1])]) for key in rdataset])
+
+if __name__=="__main__":
+    if len(sys.argv)>1:
+        workdir = sys.argv[1]
+    else:
+        workdir = tempfile.mkdtemp()
+
+    rdataset = makedataset()
+    dimvars = ["lat","lon","lev","levp","time"]
+    results = []
+    for writer,extension in ((pyburn.netcdf,".nc"),(pyburn.hdf5,".hdf5")):
+        for name,profile,override in CASES:
+            overrides = None
+            if override is not None:
+                overrides = dict([(key,override) for key in rdataset if key not in dimvars])
+            filename = os.path.join(workdir,"bench"+extension)
+            tic = time.time()
+            output = writer(copydataset(rdataset),filename=filename,logfile=os.devnull,
+                            compression=profile,compressionoverrides=overrides)
+            output.close()
+            toc = time.time()
+            results.append((extension,name,os.path.getsize(filename)/1024.0**2,toc-tic))
+            os.remove(filename)
+
+    if len(sys.argv)<2:
+        shutil.rmtree(workdir)
+
+    print("%-8s %-22s %12s %10s"%("Format","Profile","Size (MiB)","Time (s)"))
+    for extension,name,size,dt in results:
+        print("%-8s %-22s %12.2f %10.2f"%(extension,name,size,dt))
@@ -0,0 +1,93 @@
+"""
+Benchmark adding derived variables to a CSV tarball archive through gcmt.
+
+Builds a synthetic T42 archive (64x128 grid, 10 levels, 12 output times, 10 surface and
+10 column variables), then times adding 10 derived variables:
+
+    * to an uncompressed .tar, one at a time (appended in place)
+    * to a .tar.gz, one at a time (archive rewritten for every variable)
+    * to a .tar.gz, inside a single batch() (archive rewritten once)
+
+Usage:
+
+    python benchmarks/bench_csvappend.py [workdir]
+"""
+import numpy as np
+import os, sys, time, shutil, tempfile
+import exoplasimlegacy.pyburn as pyburn
+import exoplasimlegacy.gcmt as gcmt
+
+NLAT  = 64
+NLON  = 128
+NLEV  = 10
+NTIME = 12
+NADD  = 10
+
+def smoothfield(shape):
+    """Smooth, weather-like field, so that compression behaves roughly as it does on model output."""
+    field = np.ones(shape)
+    for axis,n in enumerate(shape):
+        profile = np.sin(np.linspace(0,np.pi*np.random.uniform(1,3),n)+np.random.uniform(0,np.pi))
+        field = field*(1.5+profile.reshape([n if k==axis else 1 for k in range(len(shape))]))
+    return 250.0+10.0*field+0.01*np.random.standard_normal(shape)
+
+def makedataset(n2d=10,n3d=10):
+    rdataset = {}
+    rdataset["lat" ] = [np.linspace(-90,90,NLAT),["lat","latitude","deg"]]
+    rdataset["lon" ] = [np.arange(NLON)/float(NLON)*360.0,["lon","longitude","deg"]]
+    rdataset["lev" ] = [np.linspace(0.05,0.95,NLEV),["lev","sigma_coordinate","nondimensional"]]
+    rdataset["levp"] = [np.linspace(0,1,NLEV+1),["levp","half_sigma_coordinate","nondimensional"]]
+    rdataset["time"] = [np.arange(NTIME,dtype=float),["time","timestep_of_year","timesteps"]]
+    for n in range(n2d):
+        rdataset["sfc%02d"%n] = [smoothfield((NTIME,NLAT,NLON)),
+                                 ["sfc%02d"%n,"surface_%02d"%n,"K","%d"%n,("time","lat","lon")]]
+    for n in range(n3d):
+        rdataset["col%02d"%n] = [smoothfield((NTIME,NLEV,NLAT,NLON)),
+                                 ["col%02d"%n,"column_%02d"%n,"K","%d"%(n+100),("time","lev","lat","lon")]]
+    return rdataset
+
+def addvariables(archive,batch=False):
+    data = gcmt.load(archive)
+    derived = {}
+    for n in range(NADD):
+        if n%2:
+            derived["der%02d"%n] = smoothfield((NTIME,NLEV,NLAT,NLON))
+        else:
+            derived["der%02d"%n] = smoothfield((NTIME,NLAT,NLON))
+    tic = time.time()
+    if batch:
+        with data.variables.batch():
+            for key in derived:
+                data.variables[key] = derived[key]
+    else:
+        for key in derived:
+            data.variables[key] = derived[key]
+    toc = time.time()
+    data.close()
+    return toc-tic
+
+if __name__=="__main__":
+    if len(sys.argv)>1:
+        workdir = sys.argv[1]
+    else:
+        workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    rdataset = makedataset()
+    results = []
+    for archive,batch in (("bench.tar",False),("bench.tar.gz",False),("bench.tar.gz",True)):
+        pyburn.csv(rdataset,filename=archive,logfile=os.devnull)
+        size = os.path.getsize(archive)/1024.0**2
+        dt = addvariables(archive,batch=batch)
+        results.append((archive,batch,size,dt))
+        os.remove(archive)
+
+    os.chdir(cwd)
+    if len(sys.argv)<2:
+        shutil.rmtree(workdir)
+
+    print("Adding %d variables to a T42 CSV archive:"%NADD)
+    print("%-14s %-6s %12s %10s"%("Archive","Batch","Size (MiB)","Time (s)"))
+    for archive,batch,size,dt in results:
+        print("%-14s %-6s %12.1f %10.2f"%(archive,str(batch),size,dt))
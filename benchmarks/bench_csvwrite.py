@@ -0,0 +1,119 @@
+"""
+Benchmark pyburn's CSV writer against the previous np.savetxt-based writer.
+
+Writes a synthetic T21 dataset (32x64 grid, 10 levels, 12 output times, 10 surface and 10 column
+variables) as a directory of CSV files and as .tar, .tar.gz, and .tar.xz tarballs. The reference
+writer formats each variable with np.savetxt into a temporary directory and then packs that
+directory with tarfile, which is what pyburn.csv() used to do; the outputs are checked to be
+identical once unpacked.
+
+Usage:
+
+    python benchmarks/bench_csvwrite.py [workdir]
+"""
+import numpy as np
+import os, sys, time, shutil, tarfile, tempfile
+import exoplasimlegacy.pyburn as pyburn
+
+NLAT  = 32
+NLON  = 64
+NLEV  = 10
+NTIME = 12
+
+def smoothfield(shape):
+    """Smooth, weather-like field, so that compression behaves roughly as it does on model output."""
+    field = np.ones(shape)
+    for axis,n in enumerate(shape):
+        profile = np.sin(np.linspace(0,np.pi*np.random.uniform(1,3),n)+np.random.uniform(0,np.pi))
+        field = field*(1.5+profile.reshape([n if k==axis else 1 for k in range(len(shape))]))
+    return 250.0+10.0*field+0.01*np.random.standard_normal(shape)
+
+def makedataset(n2d=10,n3d=10):
+    rdataset = {}
+    rdataset["lat" ] = [np.linspace(-90,90,NLAT),["lat","latitude","deg"]]
+    rdataset["lon" ] = [np.arange(NLON)/float(NLON)*360.0,["lon","longitude","deg"]]
+    rdataset["lev" ] = [np.linspace(0.05,0.95,NLEV),["lev","sigma_coordinate","nondimensional"]]
+    rdataset["levp"] = [np.linspace(0,1,NLEV+1),["levp","half_sigma_coordinate","nondimensional"]]
+    rdataset["time"] = [np.arange(NTIME,dtype=float),["time","timestep_of_year","timesteps"]]
+    for n in range(n2d):
+        rdataset["sfc%02d"%n] = [smoothfield((NTIME,NLAT,NLON)),
+                                 ["sfc%02d"%n,"surface_%02d"%n,"K","%d"%n,("time","lat","lon")]]
+    for n in range(n3d):
+        rdataset["col%02d"%n] = [smoothfield((NTIME,NLEV,NLAT,NLON)),
+                                 ["col%02d"%n,"column_%02d"%n,"K","%d"%(n+100),("time","lev","lat","lon")]]
+    return rdataset
+
+def reference(rdataset,filename):
+    """The previous writer: np.savetxt into a directory, then tar that directory up."""
+    dirname = filename.split(".")[0]
+    os.mkdir(dirname)
+    files = []
+    for key in rdataset:
+        data,meta = rdataset[key]
+        outname = "%s/%s_%s.csv"%(dirname,dirname,key)
+        if key in ("lat","lon","lev","levp","time"):
+            header = str(len(data))+",|||,"+','.join(meta)
+        else:
+            header = (','.join(np.array(data.shape).astype(str))+",|||,"
+                      +','.join(meta[:-1])+",".join(meta[-1]))
+            data = np.reshape(data,(int(np.prod(data.shape[:-1])),data.shape[-1]))
+        np.savetxt(outname,data.astype("float32"),header=header,delimiter=',')
+        files.append(outname)
+    if filename.endswith(".csv"):
+        return
+    mode = "w"
+    if not filename.endswith(".tar"):
+        mode = "w:"+filename.split(".")[-1]
+    with tarfile.open(filename,mode) as tarball:
+        for outname in files:
+            tarball.add(outname)
+    shutil.rmtree(dirname)
+
+def unpack(filename):
+    """Contents of every member, keyed by name."""
+    if filename.endswith(".csv"):
+        dirname = filename.split(".")[0]
+        return dict([(name,open(os.path.join(dirname,name),"rb").read()) for name in os.listdir(dirname)])
+    with tarfile.open(filename) as tarball:
+        return dict([(member.name.split("/")[-1],tarball.extractfile(member).read())
+                     for member in tarball.getmembers()])
+
+if __name__=="__main__":
+    if len(sys.argv)>1:
+        workdir = sys.argv[1]
+    else:
+        workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    rdataset = makedataset()
+    results = []
+    for filename in ("bench.csv","bench.tar","bench.tar.gz","bench.tar.xz"):
+        tic = time.time()
+        reference(rdataset,filename)
+        oldtime = time.time()-tic
+        old = unpack(filename)
+        if filename.endswith(".csv"):
+            shutil.rmtree("bench")
+        else:
+            os.remove(filename)
+        tic = time.time()
+        pyburn.csv(rdataset,filename=filename,logfile=os.devnull)
+        newtime = time.time()-tic
+        new = unpack(filename)
+        identical = sorted(old)==sorted(new) and all([old[name]==new[name] for name in old])
+        if filename.endswith(".csv"):
+            size = sum([len(text) for text in new.values()])
+            shutil.rmtree("bench")
+        else:
+            size = os.path.getsize(filename)
+            os.remove(filename)
+        results.append((filename,size/1024.0**2,oldtime,newtime,identical))
+
+    os.chdir(cwd)
+    if len(sys.argv)<2:
+        shutil.rmtree(workdir)
+
+    print("%-14s %12s %14s %12s %10s"%("Output","Size (MiB)","savetxt (s)","pyburn (s)","Identical"))
+    for filename,size,oldtime,newtime,identical in results:
+        print("%-14s %12.1f %14.2f %12.2f %10s"%(filename,size,oldtime,newtime,identical))
@@ -0,0 +1,47 @@
+"""
+Benchmark how long a cold ``import exoplasimlegacy`` takes, as every job step and hpc launcher script pays it.
+
+Each import runs in a fresh interpreter, so nothing is cached in sys.modules. NumPy alone is timed
+as the floor (the package cannot import faster than its one hard dependency), and importing
+pyburn, which pulls in SciPy, is timed to show what lazy submodule imports save. The heavy
+modules left loaded by the bare package import are listed; there should be none.
+
+Usage:
+
+    python benchmarks/bench_import.py [repeats]
+"""
+import sys, time, subprocess, json
+
+STATEMENTS = [("numpy"                    ,"import numpy"),
+              ("exoplasimlegacy"          ,"import exoplasimlegacy"),
+              ("exoplasimlegacy + pyburn" ,"import exoplasimlegacy, exoplasimlegacy.pyburn"),
+              ]
+
+HEAVY = ["scipy","matplotlib","netCDF4","h5py"]
+
+def coldimport(statement):
+    """Wall time of an import in a fresh interpreter, and the heavy modules it left loaded."""
+    script = ("import time, sys, json\n"
+              "tic = time.perf_counter()\n"
+              "%s\n"
+              "toc = time.perf_counter()-tic\n"
+              "print(json.dumps([toc,sorted(set([m.split('.')[0] for m in sys.modules])&set(%r))]))"%(statement,HEAVY))
+    output = subprocess.run([sys.executable,"-c",script],capture_output=True,text=True,check=True).stdout
+    return json.loads(output.strip().split("\n")[-1])
+
+if __name__=="__main__":
+    repeats = 5
+    if len(sys.argv)>1:
+        repeats = int(sys.argv[1])
+
+    results = []
+    for label,statement in STATEMENTS:
+        times = []
+        for n in range(repeats):
+            elapsed,heavy = coldimport(statement)
+            times.append(elapsed)
+        results.append((label,min(times),sorted(times)[len(times)//2],heavy))
+
+    print("%-26s %10s %12s   %s"%("Import","Best (s)","Median (s)","Heavy modules loaded"))
+    for label,best,median,heavy in results:
+        print("%-26s %10.3f %12.3f   %s"%(label,best,median,", ".join(heavy) or "-"))
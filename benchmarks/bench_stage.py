@@ -0,0 +1,90 @@
+"""
+Benchmark moving a job directory to and from scratch on each resubmission cycle, the old way
+(tar up the directory, copy, untar; run; tar up everything, copy back, untar) against
+incremental staging with exoplasimlegacy/hpc/stage.py.
+
+A synthetic job directory stands in for a PlaSim run: an executable, boundary condition files,
+namelists, and a restart file. Each cycle "runs" by rewriting the restart file and writing a year
+of output, so the job directory grows as it would over a long integration. The old way compresses
+and moves every input in both directions on every cycle; staging moves the inputs once, and after
+that only the restart file and the new year. Times exclude the (synthetic) model run itself.
+
+Usage:
+
+    python benchmarks/bench_stage.py [cycles] [output MB per cycle]
+"""
+import os, sys, time, shutil, tempfile, subprocess
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","exoplasimlegacy","hpc"))
+import stage
+
+INPUTS = [("most_plasim_t21_l10_p4.x",8),("N032_surf_0129.sra",2),("N032_surf_0172.sra",2),
+          ("N032_surf_0232.sra",2),("plasim_restart",4)]  #(name, MB)
+
+def makefile(path,megabytes):
+    with open(path,"wb") as f:
+        f.write(os.urandom(int(megabytes*(1<<20))))
+
+def makejob(workdir):
+    os.makedirs(workdir)
+    for name,megabytes in INPUTS:
+        makefile(os.path.join(workdir,name),megabytes)
+    for n in range(15):
+        with open(os.path.join(workdir,"namelist%02d"%n),"w") as f:
+            f.write(" &NL\n X=%d\n /\n"%n)
+
+def run(scratchdir,cycle,outputmb):
+    """One cycle of the model: a new restart file, and a year of output. Returns how long it took."""
+    tic = time.perf_counter()
+    makefile(os.path.join(scratchdir,"plasim_restart"),4)
+    makefile(os.path.join(scratchdir,"MOST_OUT.%04d"%cycle),outputmb)
+    makefile(os.path.join(scratchdir,"MOST_REST.%04d"%cycle),0.5)
+    return time.perf_counter()-tic
+
+def tarcycle(workdir,scratchdir,cycle,outputmb):
+    """The job script before stage.py (rsync of a single file replaced by cp)."""
+    def sh(command,cwd):
+        subprocess.run(command,shell=True,cwd=cwd,check=True,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+    os.makedirs(scratchdir,exist_ok=True)
+    sh("tar czf stuff.tar.gz --exclude='*_OUT*' --exclude='*_REST*' --exclude='*.nc' --exclude='snapshots/' ./*",workdir)
+    sh("cp stuff.tar.gz "+scratchdir+"/ && rm stuff.tar.gz",workdir)
+    sh("tar xzf stuff.tar.gz && rm stuff.tar.gz",scratchdir)
+    modeltime = run(scratchdir,cycle,outputmb)
+    sh("tar czf stuff.tar.gz * && cp stuff.tar.gz "+workdir+"/ && rm -rf *",scratchdir)
+    sh("tar xzf stuff.tar.gz && rm stuff.tar.gz",workdir)
+    return modeltime
+
+def stagecycle(workdir,scratchdir,cycle,outputmb):
+    stage.stagein(workdir,scratchdir)
+    modeltime = run(scratchdir,cycle,outputmb)
+    stage.stageout(scratchdir,workdir)
+    return modeltime
+
+if __name__=="__main__":
+    cycles = 8
+    outputmb = 8
+    if len(sys.argv)>1:
+        cycles = int(sys.argv[1])
+    if len(sys.argv)>2:
+        outputmb = float(sys.argv[2])
+
+    top = tempfile.mkdtemp()
+    results = {}
+    try:
+        for label,cycle in (("tar round trip",tarcycle),("stage.py",stagecycle)):
+            workdir = os.path.join(top,label.replace(" ","_"),"job")
+            scratchdir = os.path.join(top,label.replace(" ","_"),"scratch")
+            makejob(workdir)
+            times = []
+            for n in range(cycles):
+                tic = time.perf_counter()
+                modeltime = cycle(workdir,scratchdir,n,outputmb)
+                times.append(time.perf_counter()-tic-modeltime) #Staging time only
+            results[label] = times
+    finally:
+        shutil.rmtree(top)
+
+    print("%-6s %16s %12s"%("Cycle","tar round trip (s)","stage.py (s)"))
+    for n in range(cycles):
+        print("%-6d %16.3f %12.3f"%(n+1,results["tar round trip"][n],results["stage.py"][n]))
+    print("%-6s %16.3f %12.3f"%("Total",sum(results["tar round trip"]),sum(results["stage.py"])))
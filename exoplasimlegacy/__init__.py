@@ -7,14 +7,31 @@ import sys
 import subprocess
 import numpy as np
 import glob
-import exoplasimlegacy.gcmt 
-import exoplasimlegacy.pyburn
+import time
+import shutil
+import threading
+import importlib
 import exoplasimlegacy.filesupport
-from exoplasimlegacy.filesupport import SUPPORTED
-import exoplasimlegacy.randomcontinents
-import exoplasimlegacy.makestellarspec
+from exoplasimlegacy.filesupport import SUPPORTED, APPENDABLE
+import exoplasimlegacy.telemetry
+import exoplasimlegacy.resolutions
+import exoplasimlegacy.restart
+import exoplasimlegacy.buildcache
+import exoplasimlegacy.inputstore
 import platform
 
+#Submodules imported on first use, since pyburn pulls in SciPy, and randomcontinents and
+#makestellarspec pull in matplotlib. ``exoplasimlegacy.pyburn`` etc. work as before.
+_LAZYMODULES = ["gcmt","pyburn","randomcontinents","makestellarspec","ensemble","restartlibrary"]
+
+def __getattr__(name):
+    if name in _LAZYMODULES:
+        return importlib.import_module("exoplasimlegacy."+name) #Also binds it, so this runs once
+    raise AttributeError("module 'exoplasimlegacy' has no attribute '%s'"%name)
+
+def __dir__():
+    return sorted(set(list(globals())+_LAZYMODULES))
+
 smws = {'mH2': 2.01588,
         'mHe': 4.002602,
         'mN2': 28.0134,
@@ -40,11 +57,79 @@ MARS_RADIUS = 3400000.0
 MARS_RD     = 189.0
 MARS_MMW    = 43.991866
 
+_installed = False #Whether this process has checked for post-install work (see _firstrun)
+
+def _firstrun(sourcedir,burn7=False):
+    """Do the post-install work (configure.sh) if it hasn't been done yet. Returns True if it was done now.
+
+    The check is made once per process, rather than every time a Model is created.
+    """
+    global _installed
+    if _installed:
+        return False
+    _installed = True
+    if os.path.isfile(sourcedir+"/firstrun"):
+        return False
+    #os.system('spth=$(python%s -c "import exoplasimlegacy as exo; print(exo.__path__)") && echo $spth>sourcepath'%sys.version[0])
+    #with open("sourcepath","r") as spf:
+        #sourcedir = spf.read().strip()
+        #if sourcedir[0]=="[":
+            #sourcedir=sourcedir[1:]
+        #if sourcedir[-1]=="]":
+            #sourcedir=sourcedir[:-1]
+        #if sourcedir[0]=="'":
+            #sourcedir=sourcedir[1:]
+        #if sourcedir[-1]=="'":
+            #sourcedir=sourcedir[:-1]
+    #os.system("rm sourcepath")
+    #with open("%s/__init__.py"%sourcedir,"r") as sourcef:
+        #sourcecode = sourcef.read().split('\n')
+    #sourcecode[2] = 'sourcedir = "%s"'%sourcedir
+    #sourcecode = '\n'.join(sourcecode)
+    #os.system("cp %s/__init__.py %s/preinit.py"%(sourcedir,sourcedir))
+    try:
+        #with open("%s/__init__.py"%sourcedir,"w") as sourcef:
+            #sourcef.write(sourcecode)
+        cwd = os.getcwd()
+        os.chdir(sourcedir)
+        os.system("touch firstrun")
+        os.system("./configure.sh %s"%(sys.version[0:3]))
+        if burn7:
+            os.system("nc-config --version > ncversion.tmp")
+            with open("ncversion.tmp","r") as ncftmpf:
+                version = float('.'.join(ncftmpf.read().split()[1].split('.')[:2]))
+            if version>4.2:
+                os.system("cd postprocessor && ./build_init.sh || ./build_init_compatibility.sh")
+            else:
+                os.system("cd postprocessor && rm burn7.x && make")
+            os.chdir(cwd)
+            os.system("touch %s/postprocessor/netcdfbuilt"%sourcedir)
+        os.chdir(cwd)
+    except PermissionError:
+        raise PermissionError("\nHi! Welcome to ExoPlaSim. It looks like this is the first "+
+                            "time you're using this program since installing, and you "+
+                            "may have installed it to a location that needs root "+
+                            "privileges to modify. This is not ideal! If you want to "+
+                            "use the program this way, you will need to run python code"+
+                            " that uses ExoPlaSim with sudo privileges; i.e. sudo "+
+                            "python3 myscript.py. If you did this because pip install "+
+                            "breaks without sudo privileges, then try using \n\n\tpip "+ "install --user exoplasimlegacy \n\ninstead. It is generally a "+
+                            "very bad idea to install things with sudo pip install.")
+    return True
+
 def _noneparse(text,dtype):
     if text=="None" or text=="none":
         return None
     else:
         return dtype(text)
+
+def _balancebounds(currentyear,minyears,maxyears):
+    """Years bounding a run to energy balance that starts in ``currentyear``.
+    
+    Returns ``(minyear, runlimit)``: a model counts as balanced only once it has reached ``minyear``,
+    and is not run past ``runlimit``. Shared by Model.runtobalance and Ensemble.runtobalance.
+    """
+    return currentyear+minyears,currentyear+maxyears
     
 #def readsourcepath():
     #with open("sourcepath","r") as sf:
@@ -91,11 +176,12 @@ class Model(object):
     recompile : bool, optional
         True/False flag used to force a recompile. Cannot force the 
         model to skip compilation if the executable does not exist or
-        compilation-inducing flags are set.
+        compilation-inducing flags are set and the build is not cached.
     optimization : str, optional
         Fortran compiler arguments for optimization. ANY compiler
         flags can be passed here, but it's intended for optimization
-        flags. Setting this will trigger a recompile.
+        flags. Setting this will trigger a recompile, unless the same build is already in the
+        build cache (see :py:mod:`exoplasimlegacy.buildcache`).
     mars : bool, optional
         True/False. If True, will use Mars-specific routines.
     workdir : str, optional
@@ -113,13 +199,32 @@ class Model(object):
         postprocessor will be used (default).
     outputtype : str, optional
         File extension to use for the output, if using the pyburn postprocessor. Supported extensions
-        are `.nc`, `.npy`, `.npz`, `.hdf5`, `.he5`, `.h5`, `.csv`, `.gz`, `.txt`, `.tar`, `.tar.gz`,
+        are `.nc`, `.npy`, `.npz`, `.npyd`, `.hdf5`, `.he5`, `.h5`, `.csv`, `.gz`, `.txt`, `.tar`, `.tar.gz`,
         `.tar.xz`, and `.tar.bz2`. If using `.nc`, `netcdf4-python` must be installed. If using any of 
         `.hdf5`, `.he5`, or `.h5`, then `h5py` must be installed. The default is the numpy compressed
         format, `.npz`.
     crashtolerant : bool, optional
         If True, then on a crash, ExoPlaSim will rewind 10 years and resume from there.
         If fewer than 10 years have elapsed, ExoPlaSim will simply crash.
+    singlestore : bool, optional
+        If True, each postprocessed year is appended to a single whole-simulation store 
+        (``history.nc``, ``history.hdf5``, etc, with ``snapshots/`` and ``highcadence/`` equivalents)
+        instead of being written to its own ``MOST.XXXXX`` file. The store has an unlimited time axis
+        chunked for time-series reads, and records the model year of each timestamp, so 
+        :py:func:`Model.get() <exoplasimlegacy.Model.get>` and 
+        :py:func:`Model.inspect() <exoplasimlegacy.Model.inspect>` can still address individual years.
+        Requires a netCDF or HDF5 output type.
+    rawcompression : str, optional
+        If set (".gz", ".bz2", ".xz", or ".zst"), raw output files are compressed in the background 
+        into a ``raw/`` directory after they are postprocessed, instead of being deleted, so they can
+        be postprocessed again later without decompressing them first (see 
+        :py:func:`pyburn.compressraw() <exoplasimlegacy.pyburn.compressraw>`). They are kept by
+        :py:func:`Model.finalize() <exoplasimlegacy.Model.finalize>` when ``allyears=True``.
+    linkinputs : bool or str, optional
+        If True or "symlink" (default), the executable, namelists, and boundary condition files are
+        symlinked into the working directory from a shared, read-only store (see
+        :py:mod:`exoplasimlegacy.inputstore`), and only copied once the model changes them. If "hard",
+        hard links are used instead. If False, every file is copied into the working directory.
         
     Returns
     -------
@@ -161,7 +266,8 @@ class Model(object):
     """
     def __init__(self,resolution="T21",layers=10,ncpus=4,precision=8,debug=False,inityear=0,
                 recompile=False,optimization=None,mars=False,workdir="most",source=None,force991=False,
-                modelname="MOST_EXP",burn7=False,outputtype=".npz",crashtolerant=False):
+                modelname="MOST_EXP",burn7=False,outputtype=".npz",crashtolerant=False,singlestore=False,
+                rawcompression=None,linkinputs=True):
         
         global sourcedir
         
@@ -179,59 +285,28 @@ class Model(object):
                                       "highcadence" : {"times":None,"timeaverage":False,"stdev":False}}
         self.postprocessorcfgs = {"regular":{},"snapshot":{},"highcadence":{}}
         self.crashtolerant = crashtolerant
-        
-        if self.extension not in pyburn.SUPPORTED:
-            raise Exception("Unsupported output format detected. Supported formats are:\n\t\n\t%s"%("\n\t".join(pyburn.SUPPORTED)))
+        self.singlestore = singlestore
+        if rawcompression is not None and not rawcompression.startswith("."):
+            rawcompression = "."+rawcompression
+        self.rawcompression = rawcompression
+        self._compressors = [] #This model's background threads compressing raw output files
+        
+        if self.extension not in SUPPORTED:
+            raise Exception("Unsupported output format detected. Supported formats are:\n\t\n\t%s"%("\n\t".join(SUPPORTED)))
+        if self.singlestore and (burn7 or self.extension not in APPENDABLE):
+            raise Exception("A single whole-simulation store requires the pyburn postprocessor and one of "+
+                            "the following output types:\n\t\n\t%s"%("\n\t".join(APPENDABLE)))
+        if self.rawcompression is not None:
+            import exoplasimlegacy.pyburn as pyburn
+            if self.rawcompression not in pyburn.RAW_COMPRESSION:
+                raise Exception("Unsupported raw file compression detected. Supported types are:\n\t\n\t%s"%(
+                                "\n\t".join(pyburn.RAW_COMPRESSION)))
         
         sourcedir = "/".join(__file__.split("/")[:-1]) #Get the absolute path for the module
         
-        if not os.path.isfile(sourcedir+"/firstrun"): #This means we haven't run yet, and have some post-install work to do
+        if _firstrun(sourcedir,burn7=self.burn7): #The model must be compiled after post-install work
             recompile=True
-            #os.system('spth=$(python%s -c "import exoplasimlegacy as exo; print(exo.__path__)") && echo $spth>sourcepath'%sys.version[0])
-            #with open("sourcepath","r") as spf:
-                #sourcedir = spf.read().strip()
-                #if sourcedir[0]=="[":
-                    #sourcedir=sourcedir[1:]
-                #if sourcedir[-1]=="]":
-                    #sourcedir=sourcedir[:-1]
-                #if sourcedir[0]=="'":
-                    #sourcedir=sourcedir[1:]
-                #if sourcedir[-1]=="'":
-                    #sourcedir=sourcedir[:-1]
-            #os.system("rm sourcepath")
-            #with open("%s/__init__.py"%sourcedir,"r") as sourcef:
-                #sourcecode = sourcef.read().split('\n')
-            #sourcecode[2] = 'sourcedir = "%s"'%sourcedir
-            #sourcecode = '\n'.join(sourcecode)
-            #os.system("cp %s/__init__.py %s/preinit.py"%(sourcedir,sourcedir))
-            try:
-                #with open("%s/__init__.py"%sourcedir,"w") as sourcef:
-                    #sourcef.write(sourcecode)
-                cwd = os.getcwd()
-                os.chdir(sourcedir)
-                os.system("touch firstrun")
-                os.system("./configure.sh %s"%(sys.version[0:3]))
-                if self.burn7:
-                    os.system("nc-config --version > ncversion.tmp")
-                    with open("ncversion.tmp","r") as ncftmpf:
-                        version = float('.'.join(ncftmpf.read().split()[1].split('.')[:2]))
-                    if version>4.2:
-                        os.system("cd postprocessor && ./build_init.sh || ./build_init_compatibility.sh")
-                    else:
-                        os.system("cd postprocessor && rm burn7.x && make")
-                    os.chdir(cwd)
-                    os.system("touch %s/postprocessor/netcdfbuilt"%sourcedir)
-                os.chdir(cwd)
-            except PermissionError:
-                raise PermissionError("\nHi! Welcome to ExoPlaSim. It looks like this is the first "+
-                                    "time you're using this program since installing, and you "+
-                                    "may have installed it to a location that needs root "+
-                                    "privileges to modify. This is not ideal! If you want to "+
-                                    "use the program this way, you will need to run python code"+
-                                    " that uses ExoPlaSim with sudo privileges; i.e. sudo "+
-                                    "python3 myscript.py. If you did this because pip install "+
-                                    "breaks without sudo privileges, then try using \n\n\tpip "+ "install --user exoplasimlegacy \n\ninstead. It is generally a "+
-                                    "very bad idea to install things with sudo pip install.")
+        
         if self.burn7:
             self.extension = ".nc"
             if not os.path.isfile("%s/postprocessor/netcdfbuilt"%sourcedir): #netcdf postprocessor hasn't been built
@@ -265,9 +340,6 @@ class Model(object):
         self.cleaned=False
         self.recursecheck=False
         
-        if debug or optimization: #There is no need to set these for precompiled binaries
-            recompile=True
-        
         self.ncpus = ncpus
         if self.ncpus>1:
             self._exec = "mpiexec -np %d "%self.ncpus
@@ -283,34 +355,18 @@ class Model(object):
             self.workdir += "_dir"
         os.system("mkdir %s/"%self.workdir)
         self.currentyear=inityear
+        self.inityear=inityear
+        self.precision=precision
+        self.warmstart=None #Set by RestartLibrary.warmstart()
+        self.telemetry = telemetry.Telemetry(self.workdir+"/telemetry.txt",
+                                             prometheus=self.workdir+"/telemetry.prom",
+                                             labels={"model":self.modelname})
+        self.stopreason = None
         
         # Depending on how the user has entered the resolution, set the appropriate number
         # of spectral modes and latitudes
-        if resolution=="T21" or resolution=="t21" or resolution==21 or resolution==32:
-            self.nsp=21
-            self.nlats=32
-        elif resolution=="T42" or resolution=="t42" or resolution==42 or resolution==64:
-            self.nsp=42
-            self.nlats=64
-        elif resolution=="T63" or resolution=="t63" or resolution==63 or resolution==96:
-            self.nsp=63
-            self.nlats=96
-        elif resolution=="T85" or resolution=="t85" or resolution==85 or resolution==128:
-            self.nsp=85
-            self.nlats=128
-        elif resolution=="T106" or resolution=="T106" or resolution==106 or resolution==160:
-            self.nsp=106
-            self.nlats=160
-        elif resolution=="T127" or resolution=="t127" or resolution==127 or resolution==192:
-            self.nsp=127
-            self.nlats=192
-        elif resolution=="T170" or resolution=="t170" or resolution==170 or resolution==256:
-            self.nsp=170
-            self.nlats=256
-        else:
-            raise ValueError("Resolution unsupported. ExoPlaSim supports T21, T42, T63, T85, "+
-                            "T106, T127, and T170 (32, 64, 96, 128, 160, 192, and 256 "+
-                            "latitudes respectively")
+        self.nsp = exoplasimlegacy.resolutions.truncation(resolution)
+        self.nlats = exoplasimlegacy.resolutions.NLATS[self.nsp]
         
         # If the executable does not exist, then regardless of whether we've been asked
         # to recompile, we'll have to recompile
@@ -325,29 +381,25 @@ class Model(object):
         
         print("Checking for %s...."%self.executable)
         
-        if recompile or not os.path.exists(self.executable):
-            extraflags = ""
-            if debug:
-                extraflags+= "-d "
-            if optimization:
-                extraflags+= "-O %s"%optimization
-            if self.mars:
-                extraflags+= "-m "
-            if force991:
-                extraflags+= "-f "
-            os.system("cwd=$(pwd) && "+
-                    "cd %s && ./compile.sh -n %d -p %d -r T%d -v %d "%(sourcedir,self.ncpus,
-                                                                        precision,self.nsp,
-                                                                        self.layers)+
-                    extraflags+" &&"+
-                    "cd $cwd")
-        
-        os.system("cp %s/* %s/"%(source,self.workdir))
-        if self.burn7:
-            os.system("cp %s/burn7.x %s/"%(burnsource,self.workdir))
-        
-        #Copy the executable to the working directory, and then CD there
-        os.system("cp %s %s"%(self.executable,self.workdir))
+        if recompile or debug or optimization or not os.path.exists(self.executable):
+            #Builds are shared through the build cache, so each configuration is only compiled once
+            self.executable = buildcache.build(self.nsp,self.layers,self.ncpus,precision=precision,
+                                               debug=debug,optimization=optimization,mars=self.mars,
+                                               force991=force991,rebuild=recompile)
+        
+        self.linkinputs = linkinputs
+        if linkinputs:
+            inputs = sorted(glob.glob(source+"/*"))+[self.executable,]
+            if self.burn7:
+                inputs.append(burnsource+"/burn7.x")
+            inputstore.provision(inputs,self.workdir,link=("hard" if linkinputs=="hard" else "symlink"))
+        else:
+            os.system("cp %s/* %s/"%(source,self.workdir))
+            if self.burn7:
+                os.system("cp %s/burn7.x %s/"%(burnsource,self.workdir))
+            
+            #Copy the executable to the working directory, and then CD there
+            os.system("cp %s %s"%(self.executable,self.workdir))
         #os.chdir(self.workdir)
         
         self.executable = self.executable.split("/")[-1] #Strip off all the preceding path
@@ -375,7 +427,11 @@ class Model(object):
         crashifbroken : bool, optional
             True/False. If True, use Pythonic error handling    
         clean : bool, optional
-            True/False. If True, delete raw output files once output files are made
+            True/False. If True, delete raw output files once output files are made (or compress
+            them, if the Model was created with ``rawcompression``)
+        yearsperlaunch : int, optional
+            Number of years to integrate per launch of the model executable (default 1). See
+            :py:func:`_run <exoplasimlegacy.Model._run>`.
             
         """
         if not self.runscript:
@@ -388,62 +444,54 @@ class Model(object):
                 self._crash()
     
     def _checktimes(self):
-        """Get list of durations for each year computed so far."""
-        diagfiles = sorted(glob.glob(self.workdir+"/*DIAG*"))
-        times = []
-        for df in diagfiles:
-            with open(df,"r") as diagf:
-                diag = diagf.read().split("\n")
-            elapsed=1.0e6 #Assume a large value so we stop if there's a problem.
-            found=False
-            for ln in range(len(diag)-1,-1,-1):
-                if "Seconds per sim year" in diag[ln]:
-                    elapsed = float(diag[ln].split(":")[1].split("*")[0].strip()) #seconds
-                    found=True
-                    break
-            if not found:
-                for ln in range(len(diag)-1,-1,-1):
-                    if "Minutes per sim year" in diag[ln]:
-                        try:
-                            elapsed =diag[ln].split('year')
-                            elapsed = elapsed[1].split("*")
-                            elapsed = elapsed[0].strip()
-                            elapsed = float(elapsed)*60.0 
-                                                                                #seconds
-                        except:
-                            raise 
-                        found=True
-                        break
-                
-            times.append(elapsed/60.0)
-        return times
+        """Get list of durations (in minutes) for each year computed so far."""
+        return [self._minutesperyear(row) for row in self._diagtelemetry()]
             
     
     def _checktime(self,year=-1):
-        """Get walltime duration for a given year of output."""
-        diagfiles = sorted(glob.glob(self.workdir+"/*DIAG*"))
-        recent = diagfiles[year]
-        with open(recent,"r") as diagf:
-            diag = diagf.read().split("\n")
-        elapsed=1.0e6 #Assume a large value so we stop if there's a problem.
-        found=False
-        for ln in range(len(diag)-1,-1,-1):
-            if "Seconds per sim year" in diag[ln]:
-                elapsed = float(diag[ln].split(":")[1].split("*")[0].strip()) #seconds
-                found=True
-                break
-        if not found:
-            for ln in range(len(diag)-1,-1,-1):
-                if "Minutes per sim year" in diag[ln]:
-                    elapsed = float(diag[ln].split(":")[1].split("*")[0].strip())*60.0 
-                                                                            #seconds
-                    found=True
-                    break
-        return elapsed/60.0 #convert to minutes
+        """Get walltime duration (in minutes) for a given year of output."""
+        return self._minutesperyear(self._diagtelemetry()[year])
+    
+    def _diagtelemetry(self):
+        """Telemetry for every DIAG file in the working directory, parsing any not yet recorded."""
+        rows = []
+        for df in sorted(glob.glob(self.workdir+"/*DIAG*")):
+            try:
+                year = int(df.split(".")[-1])
+            except ValueError: #Not named by year, so it can't be recorded; just read it
+                rows.append(telemetry.parsediag(df))
+                continue
+            if year not in self.telemetry:
+                self.telemetry.recorddiag(year,df)
+            rows.append(self.telemetry[year])
+        return rows
+    
+    def _minutesperyear(self,row):
+        """Wall time per simulated year from a telemetry row, in minutes."""
+        elapsed = row.get("secondsperyear",np.nan)
+        if np.isnan(elapsed):
+            elapsed = 1.0e6 #Assume a large value so we stop if there's a problem.
+        return elapsed/60.0
+    
+    def _predictyear(self,window=5):
+        """Predict the wall time (in seconds) of the next year, including postprocessing.
+        
+        Uses the most recent ``window`` years in the telemetry table. The larger of their mean
+        and the latest year is returned, so a run that is slowing down is not underestimated.
+        Returns None if there is no history yet.
+        """
+        costs = []
+        for year in sorted(self.telemetry.rows)[-window:]:
+            row = self.telemetry[year]
+            if not np.isnan(row["walltime"]):
+                costs.append(row["walltime"])
+        if len(costs)==0:
+            return None
+        return max(np.mean(costs),costs[-1])
         
         
     def runtobalance(self,threshold = None,baseline=50,maxyears=300,minyears=75,
-                    timelimit=None,crashifbroken=True,clean=True):
+                    timelimit=None,crashifbroken=True,clean=True,timemargin=1.2):
         """ Run the model until energy balance equilibrium is reached at the top and surface.
             
         Parameters
@@ -460,26 +508,39 @@ class Model(object):
         minyears : int, optional
             The minimum number of years to run before determining that the model is in
             equilibrium.
+            
+            Both ``maxyears`` and ``minyears`` count from the model year this call starts in.
         timelimit : float, optional
-            If set, maxyears will be revised each year based on the average minutes
-            per year thus far, to try to avoid going over the time limit, which should
-            be given in minutes.
+            Wall time available to this call, in minutes. Before each year, the wall time
+            that year and its postprocessing will take is predicted from the recent years'
+            telemetry; if it would not finish inside the time that is left, the run stops
+            cleanly instead of being killed partway through a year.
         crashifbroken : bool, optional
             True/False. If True, Pythonic error handling is enabled. Default True.
         clean : bool, optional
             True/False. If True, raw output is deleted once postprocessed. Default True.
+        timemargin : float, optional
+            Safety factor applied to the predicted duration of the next year when checking it
+            against ``timelimit``. Default 1.2.
 
         Returns
         -------
         bool
             True if the model reached equilibrium, False if not.
+            
+        Notes
+        -----
+        When the run stops because of ``timelimit``, ``self.stopreason`` is set to ``"timelimit"``
+        (it is None otherwise). By then ``plasim_restart`` holds the last completed year, raw files
+        being compressed in the background have been finished, and ``toahistory.pso`` and
+        ``shistory.pso`` have been written, so calling :py:func:`runtobalance` again (e.g. in the
+        next batch allocation) picks up where this call left off.
         """
-        runlimit = self.currentyear+maxyears
+        minyear,runlimit = _balancebounds(self.currentyear,minyears,maxyears)
         if threshold:
             self.threshold = threshold
-        ogrunlimit = runlimit
-        ogminyears = minyears
-        runstart = self.currentyear
+        self.stopreason = None
+        tstart = time.time()
         if os.getcwd()!=self.workdir:
             os.chdir(self.workdir)
         os.system("mkdir snapshots")
@@ -494,7 +555,17 @@ class Model(object):
         #Balanced, but run fewer than minyears:         (False+True)*True= True
         #Balanced, and ran more than minyears:          (False+False)*True=False
         while (not self._isbalanced(threshold=self.threshold,baseline=baseline) \
-                or self.currentyear<minyears) and self.currentyear<runlimit:
+                or self.currentyear<minyear) and self.currentyear<runlimit:
+            if timelimit:
+                remaining = timelimit*60.0-(time.time()-tstart)
+                predicted = self._predictyear()
+                if predicted is None: #No history to go on, so only stop if we're already out of time
+                    predicted = 0.0
+                if predicted*timemargin>remaining:
+                    os.system("echo 'stopping at year %d: next year predicted to take %1.1f s, %1.1f s left'>>%s/limits.log"%(self.currentyear,predicted,remaining,self.workdir))
+                    self.stopreason = "timelimit"
+                    break
+            tyear = time.time()
             dataname="MOST.%05d"%self.currentyear
             snapname="MOST_SNAP.%05d"%self.currentyear
             hcname  ="MOST_HC.%05d"%self.currentyear
@@ -533,6 +604,8 @@ class Model(object):
                     print("[ -e plasim_hcadence ] && mv plasim_hcadence "+hcname)
                 os.system("[ -e plasim_diag ] && mv plasim_diag "+diagname)
                 print("[ -e plasim_diag ] && mv plasim_diag "+diagname)
+                if os.path.exists(diagname):
+                    self.telemetry.recorddiag(self.currentyear,diagname)
                 os.system("[ -e plasim_status ] && cp plasim_status plasim_restart")
                 print("[ -e plasim_status ] && cp plasim_status plasim_restart")
                 os.system("[ -e plasim_status ] && mv plasim_status "+restname)
@@ -542,41 +615,58 @@ class Model(object):
                 os.system("[ -e hurricane_indicators ] && mv hurricane_indicators "+stormname)
                 print("[ -e hurricane_indicators ] && mv hurricane_indicators "+stormname)
                 
+                rawchecked=False
+                if crashifbroken: #Catch a diverging run straight from the raw output, before postprocessing
+                    try:
+                        rawchecked=self.rawcheck(dataname)
+                    except Exception as e:
+                        if self.crashtolerant:
+                            raise #get out before the cleaners arrive
+                        print(e)
+                        self._crash()
+                
                 #Do any additional work
                 timeavg=0
                 snapsht=0
                 highcdn=0
+                tpost=time.time()
                 try:
-                    timeavg=self.postprocess(dataname,None,
+                    timeavg=self.postprocess(dataname,None,year=self.currentyear,
                                             log="burnout",crashifbroken=crashifbroken)
-                    snapsht=self.postprocess(snapname,None,ftype="snapshot",
+                    snapsht=self.postprocess(snapname,None,ftype="snapshot",year=self.currentyear,
                                             log="snapout",crashifbroken=crashifbroken)
-                    os.system("mv %s%s snapshots/"%(snapname,self.extension))
+                    if not self.singlestore:
+                        os.system("mv %s%s snapshots/"%(snapname,self.extension))
                     if self.highcadence["toggle"]:
-                        highcdn=self.postprocess(hcname  ,None,ftype="highcadence",
+                        highcdn=self.postprocess(hcname  ,None,ftype="highcadence",year=self.currentyear,
                                                 log="hcout"  ,crashifbroken=crashifbroken)
-                        os.system("mv %s%s highcadence/"%(hcname,self.extension))
+                        if not self.singlestore:
+                            os.system("mv %s%s highcadence/"%(hcname,self.extension))
                 except Exception as e:
                     print(e)
                     if self.crashtolerant:
                         raise #We actually need to get out of here before the cleanup routines kick in
                     self._crash()
+                tpost=time.time()-tpost
                 if clean:
                     if timeavg:
-                        os.system("rm %s"%dataname)
+                        self._cleanraw(dataname)
                     if snapsht:
-                        os.system("rm %s"%snapname)
+                        self._cleanraw(snapname)
                     if highcdn:
-                        os.system("rm %s"%hcname)
+                        self._cleanraw(hcname)
                     
                 if os.path.exists("Abort_Message"): #We need to stop RIGHT NOW
                     if self.crashtolerant: #get out right now before the cleanup routines start
                         raise Exception("ExoPlaSim native Abort Message raised")
                     self._crash() 
                     
-                if crashifbroken: #Check to see that we aren't throwing NaNs
+                if crashifbroken and not rawchecked: #Check to see that we aren't throwing NaNs
                     try:
-                        check=self.integritycheck(dataname+"%s"%self.extension)
+                        if self.singlestore:
+                            check=self.integritycheck(self._storename(),year=self.currentyear)
+                        else:
+                            check=self.integritycheck(dataname+"%s"%self.extension)
                     except Exception as e:
                         if self.crashtolerant:
                             raise #get out before the cleaners arrive
@@ -589,42 +679,40 @@ class Model(object):
                 self.currentyear += 1
                 sb = self.getbalance("hfns")
                 tb = self.getbalance("ntr")
+                self.telemetry.record(self.currentyear-1,postprocess=tpost,toa=tb,surface=sb,
+                                      walltime=time.time()-tyear)
                 os.system("echo '%02.6f  %02.6f'>>%s/balance.log"%(sb,tb,self.workdir))
                 
                 if timelimit:
-                    avgyear = self._checktimes() #get how long it took to run each year
-                    os.system("echo '%1.3f minutes'>>%s/runtimes.log"%(avgyear[-1],self.workdir))
-                    currentyears = np.loadtxt("%s/runtimes.log"%self.workdir,usecols=[0,]) 
-                        #^Get how long it took to run each year of the current run
-                    currentavgyear = np.nanmean(currentyears) 
-                        #^Average walltime per year for this run
-                    runlimit = min(runstart + int(timelimit//currentavgyear),ogrunlimit)
-                    crunlimit = min(int(timelimit//currentavgyear),ogrunlimit-runstart)
-                                #options for the runlimit are N0+T/tau, where tau is avg year
-                    os.system("echo 'limit to %d years total; %d years this run'>>%s/limits.log"%(runlimit,crunlimit,self.workdir))
-                    minyears = min(ogminyears,runlimit)
+                    os.system("echo '%1.3f minutes'>>%s/runtimes.log"%(self.telemetry[self.currentyear-1]["walltime"]/60.0,
+                                                                     self.workdir))
                 
             except Exception as e:
                 if runerror:
-                    if self.crashtolerant and self.currentyear>=10:
-                        self.currentyear-=10
-                        os.system("cp MOST_REST.%05d plasim_restart"%self.currentyear)
-                        for n in range(self.currentyear+1,self.currentyear+10):
-                            os.system("rm MOST*%05d*"%n)
-                            os.system("rm snapshots/MOST*%05d*"%n)
-                            os.system("rm highcadence/MOST*%05d*"%n)
-                        os.system("rm plasim_status")
-                        os.system("rm plasim_output")
-                        os.system("rm plasim_hcadence")
-                        os.system("rm plasim_snapshot")
-                        self.currentyear+=1
-                    else:
-                        print(e)
+                    print(e)
+                    if not (self.crashtolerant and self._rewind()):
                         self._crash() #Bring in the cleaners
                 else:
                     pass
             
+        self._waitforcompression() #Nothing should be left half-written if the job ends after we return
             
+        self._writebalancehistory()
+        finished = self._isbalanced(threshold=self.threshold,baseline=baseline)
+        finished *= (self.currentyear>=minyear) #Must be both
+        if not finished:
+            return False
+        if self.warmstart:
+            years = self.currentyear-self.warmstart["startyear"]
+            self.warmstart["yearssaved"] = self.warmstart["coldyears"]-years
+            print("Reached energy balance in %d years from a warm start; from a cold start this took %d years, "
+                  "so the warm start saved %d years."%(years,self.warmstart["coldyears"],
+                                                       self.warmstart["yearssaved"]))
+        return True
+    
+            
+    def _writebalancehistory(self):
+        """Append the annual surface and TOA energy balance of the run so far to shistory.pso and toahistory.pso."""
         bott = self.gethistory(key="hfns")
         topt = self.gethistory(key="ntr")
         with open("%s/shistory.pso"%self.workdir,"a+") as f:
@@ -633,12 +721,6 @@ class Model(object):
         with open("%s/toahistory.pso"%self.workdir,"a+") as f:
             text='\n'+'\n'.join(topt.astype(str))
             f.write(text)
-        finished = self._isbalanced(threshold=self.threshold,baseline=baseline)
-        finished *= (self.currentyear>ogminyears) #Must be both
-        if not finished:
-            return False
-        return True
-    
             
     def getbalance(self,key,year=-1):
         """Return the global annual mean of a given variable for a given year
@@ -658,6 +740,31 @@ class Model(object):
         var = self.inspect(key,savg=True,tavg=True,year=year)
         return var
     
+    def _storename(self,ftype="regular"):
+        """Return the path of the whole-simulation store for a given output type, relative to the work directory."""
+        extension = self.extension
+        if self._configuredpostprocessor[ftype]:
+            extension = self.extensions[ftype]
+        if extension not in APPENDABLE:
+            raise Exception("A single whole-simulation store requires one of the following output types:"+
+                            "\n\t\n\t%s"%("\n\t".join(APPENDABLE)))
+        if ftype=="snapshot":
+            return "snapshots/history%s"%extension
+        elif ftype=="highcadence":
+            return "highcadence/history%s"%extension
+        return "history%s"%extension
+    
+    def _storeyears(self):
+        """Return the sorted model years held in the whole-simulation store (empty if there isn't one yet)."""
+        import exoplasimlegacy.gcmt as gcmt
+        store = "%s/%s"%(self.workdir,self._storename())
+        if not os.path.exists(store):
+            return np.array([],dtype=int)
+        ncd = gcmt.load(store)
+        years = np.asarray(ncd.variables["year"][:])
+        ncd.close()
+        return np.unique(years[years>=0])
+    
     def gethistory(self,key="ts",mean=True,layer=-1):
         """Return the an array of global annual means of a given variable for each year
             
@@ -675,6 +782,24 @@ class Model(object):
         numpy.ndarray
             1-D Array of global annual means
         """
+        import exoplasimlegacy.gcmt as gcmt
+        if self.singlestore: #Read the whole time series at once, then split it by year
+            ncd = gcmt.load("%s/%s"%(self.workdir,self._storename()))
+            years = np.asarray(ncd.variables["year"][:])
+            variable = ncd.variables[key]
+            if len(variable.shape)>3:
+                variable = variable[:,layer,:,:]
+            else:
+                variable = variable[:]
+            lon = ncd.variables['lon'][:]
+            lat = ncd.variables['lat'][:]
+            ncd.close()
+            storeyears = np.unique(years[years>=0])
+            dd=np.zeros(len(storeyears))
+            for n in range(0,len(storeyears)):
+                dd[n] = gcmt.spatialmath(variable[years==storeyears[n]],lon=lon,lat=lat,
+                                        mean=mean,radius=self.radius)
+            return dd
         files = sorted(glob.glob("%s/MOST*%s"%(self.workdir,self.extension)))
         dd=np.zeros(len(files))
         for n in range(0,len(files)):
@@ -705,7 +830,10 @@ class Model(object):
         bool
             Whether or not the model is in energy balance equilibrium
         """
-        nfiles = len((glob.glob("%s/MOST*%s"%(self.workdir,self.extension))))
+        if self.singlestore:
+            nfiles = len(self._storeyears())
+        else:
+            nfiles = len((glob.glob("%s/MOST*%s"%(self.workdir,self.extension))))
         if nfiles==0: #For when the run restarts and there are no netcdf files yet
             return False
         prior=False
@@ -750,7 +878,7 @@ class Model(object):
             else:
                 return False
         
-    def _run(self,years=1,postprocess=True,crashifbroken=False,clean=True):
+    def _run(self,years=1,postprocess=True,crashifbroken=False,clean=True,yearsperlaunch=1):
         """Run the model for a set number of years.
 
         Parameters
@@ -762,17 +890,36 @@ class Model(object):
         crashifbroken : bool, optional
             True/False. If True, use Pythonic error handling    
         clean : bool, optional
-            True/False. If True, delete raw output files once output files are made
+            True/False. If True, delete raw output files once output files are made (or compress
+            them, if the Model was created with ``rawcompression``)
+        yearsperlaunch : int, optional
+            Number of years to integrate per launch of the model executable. Default 1. Each launch
+            pays for MPI startup and for reading the boundary files, restart, and namelists, which
+            at low resolution can be a sizeable fraction of a year's runtime. With more than one 
+            year per launch, each year's raw output is split out of the running model's output 
+            files with :py:func:`pyburn.splitraw() <exoplasimlegacy.pyburn.splitraw>` as soon as the
+            model moves on to the next year, and postprocessed while the model keeps running.
             
+        Notes
+        -----
+        With more than one year per launch, the model only writes its restart file and DIAG file at
+        the end of each launch, so those are kept under the name of the last year of the launch, and
+        crash recovery (with ``crashtolerant``) rewinds to the newest of those at least 10 years
+        back. Runs whose
+        length is set with ``runsteps`` must use one year per launch.
 
         """
+        if yearsperlaunch>1 and self.runsteps is not None:
+            raise Exception("Runs of a fixed number of timesteps (runsteps) must use one year per launch.")
         odir = os.getcwd()
         if os.getcwd()!=self.workdir:
             os.chdir(self.workdir)
         os.system("mkdir snapshots")
         if self.highcadence["toggle"]:
             os.system("mkdir highcadence")
+        launch = None
         for year in range(years):
+            tyear = time.time()
             dataname="MOST.%05d"%self.currentyear
             snapname="MOST_SNAP.%05d"%self.currentyear
             hcname  ="MOST_HC.%05d"%self.currentyear
@@ -783,7 +930,16 @@ class Model(object):
             
             #Run ExoPlaSim
             try:
-                if float(sys.version[:3])>=3.5 and float(sys.version[:3])<3.7:
+                launchyears = [self.currentyear,]
+                if yearsperlaunch>1:
+                    if launch is None:
+                        launch = self._launch(min(yearsperlaunch,years-year))
+                    launchyears = launch["all"]
+                    if self._awaityear(launch): #The model has finished this launch
+                        launch = None
+                    else:
+                        launchyears = []
+                elif float(sys.version[:3])>=3.5 and float(sys.version[:3])<3.7:
                     subprocess.run([self._exec+self.executable],shell=True,check=True)
                 elif float(sys.version[:3])>=3.7:
                     subprocess.run([self._exec+self.executable],shell=True,check=True,
@@ -794,55 +950,78 @@ class Model(object):
                         raise Exception("runtime crash")
             
                 #Sort, categorize, and arrange the various outputs
-                os.system("[ -e restart_dsnow ] && rm restart_dsnow")
-                os.system("[ -e restart_xsnow ] && rm restart_xsnow")
-                os.system("[ -e Abort_Message ] && exit 1")
-                os.system("[ -e plasim_output ] && mv plasim_output "+dataname)
-                os.system("[ -e plasim_snapshot ] && mv plasim_snapshot "+snapname)
-                if self.highcadence["toggle"]:
-                    os.system("[ -e plasim_hcadence ] && mv plasim_hcadence "+hcname)
-                os.system("[ -e plasim_diag ] && mv plasim_diag "+diagname)
-                os.system("[ -e plasim_status ] && cp plasim_status plasim_restart")
-                os.system("[ -e plasim_status ] && mv plasim_status "+restname)
-                os.system("[ -e restart_snow ] && mv restart_snow "+snowname)
-                os.system("[ -e hurricane_indicators ] && mv hurricane_indicators "+stormname)
+                if len(launchyears)>0: #The model has exited, so the end-of-run files are complete
+                    os.system("[ -e restart_dsnow ] && rm restart_dsnow")
+                    os.system("[ -e restart_xsnow ] && rm restart_xsnow")
+                    os.system("[ -e Abort_Message ] && exit 1")
+                    os.system("[ -e plasim_output ] && mv plasim_output "+dataname)
+                    os.system("[ -e plasim_snapshot ] && mv plasim_snapshot "+snapname)
+                    if self.highcadence["toggle"]:
+                        os.system("[ -e plasim_hcadence ] && mv plasim_hcadence "+hcname)
+                    os.system("[ -e plasim_diag ] && mv plasim_diag "+diagname)
+                    if os.path.exists(diagname):
+                        for launchyear in launchyears: #The timings in the DIAG file are per-year averages
+                            self.telemetry.recorddiag(launchyear,diagname)
+                    os.system("[ -e plasim_status ] && cp plasim_status plasim_restart")
+                    os.system("[ -e plasim_status ] && mv plasim_status "+restname)
+                    os.system("[ -e restart_snow ] && mv restart_snow "+snowname)
+                    os.system("[ -e hurricane_indicators ] && mv hurricane_indicators "+stormname)
+                
+                rawchecked=False
+                if crashifbroken: #Catch a diverging run straight from the raw output, before postprocessing
+                    try:
+                        rawchecked=self.rawcheck(dataname)
+                    except Exception as e:
+                        if self.crashtolerant:
+                            raise
+                        print(e)
+                        self._crash()
                 
                 #Do any additional work
                 timeavg=0
                 snapsht=0
                 highcdn=0
+                tpost=time.time()
                 if postprocess:
                     try:
-                        timeavg=self.postprocess(dataname,None,
+                        timeavg=self.postprocess(dataname,None,year=self.currentyear,
                                                 log="burnout",crashifbroken=crashifbroken)
-                        snapsht=self.postprocess(snapname,None,ftype="snapshot",
+                        snapsht=self.postprocess(snapname,None,ftype="snapshot",year=self.currentyear,
                                                 log="snapout",crashifbroken=crashifbroken)
-                        os.system("mv %s%s snapshots/"%(snapname,self.extension))
+                        if not self.singlestore:
+                            os.system("mv %s%s snapshots/"%(snapname,self.extension))
                         if self.highcadence["toggle"]:
                             highcdn=self.postprocess(hcname  ,None,ftype="highcadence",
+                                                    year=self.currentyear,
                                                     log="hcout"  ,crashifbroken=crashifbroken)
-                            os.system("mv %s%s highcadence/"%(hcname,self.extension))
+                            if not self.singlestore:
+                                os.system("mv %s%s highcadence/"%(hcname,self.extension))
                     except Exception as e:
                         if self.crashtolerant:
                             raise
                         print(e)
                         self._crash()
+                    self.telemetry.record(self.currentyear,postprocess=time.time()-tpost,
+                                          walltime=time.time()-tyear)
                 if clean:
                     if timeavg:
-                        os.system("rm %s"%dataname)
+                        self._cleanraw(dataname)
                     if snapsht:
-                        os.system("rm %s"%snapname)
+                        self._cleanraw(snapname)
                     if highcdn:
-                        os.system("rm %s"%hcname)
+                        self._cleanraw(hcname)
                         
                 if os.path.exists("Abort_Message"): #We need to stop RIGHT NOW
                     if self.crashtolerant:
                         raise Exception("ExoPlaSim native Abort Message raised")
                     self._crash()
                     
-                if crashifbroken: #Check to see that we aren't throwing NaNs
+                if crashifbroken and not rawchecked: #Check to see that we aren't throwing NaNs
                     try:
-                        check=self.integritycheck(dataname+"%s"%self.extension)
+                        if self.singlestore:
+                            check=self.integritycheck(self._storename(),year=self.currentyear)
+                        else:
+                            check=self.integritycheck(dataname+"%s"%self.extension)
                     except Exception as e:
                         if self.crashtolerant:
                             raise
@@ -851,29 +1030,121 @@ class Model(object):
                     
                 self.currentyear += 1
             except Exception as e:
-                if self.crashtolerant and self.currentyear>=10:
-                    print(self.currentyear,e)
-                    self.currentyear-=10
-                    os.system("cp MOST_REST.%05d plasim_restart"%self.currentyear)
-                    for n in range(self.currentyear+1,self.currentyear+10):
-                        os.system("rm MOST*%05d*"%n)
-                        os.system("rm snapshots/MOST*%05d*"%n)
-                        os.system("rm highcadence/MOST*%05d*"%n)
-                    os.system("rm plasim_status")
-                    os.system("rm plasim_output")
-                    os.system("rm plasim_hcadence")
-                    os.system("rm plasim_snapshot")
-                    self.currentyear+=1
-                else:
-                    print(e)
+                if launch is not None: #Don't leave the model running into the rewind
+                    self._endlaunch(launch,kill=True)
+                    launch = None
+                print(self.currentyear,e)
+                if not (self.crashtolerant and self._rewind()):
                     self._crash() #Bring in the cleaners
         os.chdir(odir)
+        
+    def _yearlength(self):
+        """Namelist settings for one year of integration, as :py:func:`configure` sets them.
+        
+        A year is always one N_RUN_YEARS; models with a rotation period other than 1 day also set
+        the number of timesteps in a year (N_RUN_STEPS), as do runs sized with ``runsteps``.
+        """
+        length = {"N_RUN_YEARS":"1"}
+        if self.runsteps is not None:
+            length["N_RUN_STEPS"] = str(self.runsteps)
+        elif self.rotationperiod!=1.0:
+            length["N_RUN_STEPS"] = str(max(1,int(round(360.0*1440.0/self.timestep+0.49999))))
+        return length
+        
+    def _launch(self,nyears):
+        """Start the model in the background, integrating several years in one launch.
+        
+        Returns a dict describing the launch, to be passed to :py:func:`_awaityear` once per year.
+        """
+        original = self._yearlength() #From the model's settings, not the namelist, which an interrupted launch may have left scaled
+        for arg in original:
+            self._edit_namelist("plasim_namelist",arg,str(int(original[arg])*nyears))
+        years = list(range(self.currentyear,self.currentyear+nyears))
+        streams = {}
+        if self.noutput:
+            streams["plasim_output"] = ["MOST.%05d"%n for n in years]
+        if self.snapshots:
+            streams["plasim_snapshot"] = ["MOST_SNAP.%05d"%n for n in years]
+        if self.highcadence["toggle"]:
+            streams["plasim_hcadence"] = ["MOST_HC.%05d"%n for n in years]
+        process = subprocess.Popen(self._exec+self.executable,shell=True,
+                                   stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+        return {"process":process,"namelist":original,"years":years[:],"all":years,
+                "streams":streams,"offsets":dict([(stream,0) for stream in streams])}
+    
+    def _awaityear(self,launch,polltime=1.0):
+        """Wait for the next year of a multi-year launch, and split its raw output into year files.
+        
+        Years are split out of the output files as soon as the model has moved on to the next year,
+        so they can be postprocessed while the model keeps running. Returns True if this was the 
+        last year of the launch, in which case the model has exited.
+        """
+        import exoplasimlegacy.pyburn as pyburn
+        year = launch["years"].pop(0)
+        while True:
+            finished = launch["process"].poll() is not None
+            ready = True
+            for stream in launch["streams"]:
+                names = launch["streams"][stream]
+                if os.path.exists(stream):
+                    written,launch["offsets"][stream] = pyburn.splitraw(stream,names,
+                                                                        offset=launch["offsets"][stream],
+                                                                        final=finished)
+                    names = names[len(written):]
+                    launch["streams"][stream] = names
+                if stream!="plasim_hcadence": #High-cadence output may skip years entirely
+                    ready = ready and len(names)<=len(launch["years"])
+            if finished or ready:
+                break
+            time.sleep(polltime)
+        if finished and not ready:
+            self._endlaunch(launch) #Raises if the model crashed
+            raise Exception("The model exited before finishing year %d"%year)
+        if finished and len(launch["years"])==0:
+            self._endlaunch(launch)
+            return True
+        return False
+    
+    def _endlaunch(self,launch,kill=False):
+        """Clean up after a multi-year launch (killing the model first, if asked), and restore the namelist."""
+        if kill and launch["process"].poll() is None:
+            launch["process"].kill()
+            launch["process"].wait()
+        for arg in launch["namelist"]:
+            self._edit_namelist("plasim_namelist",arg,launch["namelist"][arg])
+        launch["namelist"] = {}
+        for stream in launch["streams"]:
+            if os.path.exists(stream):
+                os.remove(stream)
+        if not kill and launch["process"].returncode!=0:
+            raise Exception("runtime crash")
+        
+    def _cleanraw(self,rawname):
+        """Delete a postprocessed raw output file, or compress it into raw/ in the background."""
+        import exoplasimlegacy.pyburn as pyburn
+        if self.rawcompression is None:
+            os.system("rm %s"%rawname)
+            return
+        if not os.path.isdir("%s/raw"%self.workdir):
+            os.system("mkdir %s/raw"%self.workdir)
+        thread = threading.Thread(target=pyburn.compressraw,args=("%s/%s"%(self.workdir,rawname),),
+                                  kwargs={"codec":self.rawcompression,
+                                          "outfile":"%s/raw/%s%s"%(self.workdir,rawname,
+                                                                   self.rawcompression)})
+        thread.start()
+        self._compressors.append(thread)
+        
+    def _waitforcompression(self):
+        """Wait for raw output files still being compressed in the background."""
+        while len(self._compressors)>0:
+            self._compressors.pop().join()
                 
     
     def cfgpostprocessor(self,ftype="regular",
-                         extension=".npz",namelist=None,variables=list(pyburn.ilibrary.keys()),
+                         extension=".npz",namelist=None,variables=None,
                          mode='grid',zonal=False, substellarlon=180.0, physfilter=False,
-                         timeaverage=True,stdev=False,times=12,interpolatetimes=True):
+                         timeaverage=True,stdev=False,times=12,interpolatetimes=True,
+                         compression=None,compressionoverrides=None):
         '''Configure postprocessor options for pyburn.
         
         Output format is determined by the file extension of outfile. Current supported formats are 
@@ -887,7 +1158,7 @@ class Model(object):
         gzip (.gz), bzip2 (.bz2), and lzma (.xz) compression types are supported. If a tarball format is 
         not used, then accepted file extensions are .csv, .txt, or .gz. All three will produce a
         directory named following the filename pattern, with one file per variable in the directory. If 
-        the .gz extension is used, NumPy will compress each output file using gzip compression. 
+        the .gz extension is used, each output file will be compressed with gzip. 
         
         CSV-type files will only contain 2D
         variable information, so the first N-1 dimensions will be flattened. The original variable shape 
@@ -932,7 +1203,8 @@ class Model(object):
             snapshot output file ('snapshot'), or high-cadence ('highcadence')?
         extension : str, optional
             Output format to use, specified via file extension. Supported formats are netCDF (``.nc``), 
-            NumPy compressed archives (``.npy``, ``.npz``), HDF5 archives (``.hdf5``, ``.he5``, ``.h5``), or
+            NumPy compressed archives (``.npy``, ``.npz``), uncompressed memory-mappable NumPy
+            directories (``.npyd``), HDF5 archives (``.hdf5``, ``.he5``, ``.h5``), or
             plain-text comma-separated value files, which may be compressed individually or as a
             tarball (``.csv``, ``.gz``, ``.txt``, ``.tar``, ``.tar.gz``, ``.tar.xz``, and ``.tar.bz2``). If using 
             netCDF, ``netcdf4-python`` must be installed. If using HDF5, then ``h5py`` must be installed. 
@@ -944,7 +1216,8 @@ class Model(object):
             variable name (e.g. 'ts' for surface temperature). If a dict is given, each item in the dictionary
             should have the keycode or variable name as the key, and the desired horizontal mode and additional
             options for that variable as a sub-dict. Each member of the subdict should be passable as **kwargs 
-            to :py:func`pyburn.advancedDataset() <exoplasimlegacy.pyburn.advancedDataset>`. If None, then ``namelist`` must be set.
+            to :py:func`pyburn.advancedDataset() <exoplasimlegacy.pyburn.advancedDataset>`. If None and ``namelist`` is not
+            set, every variable pyburn knows is used.
         mode : str, optional
             Horizontal output mode, if modes are not specified for individual variables. Options are 
             'grid', meaning the Gaussian latitude-longitude grid used
@@ -979,7 +1252,19 @@ class Model(object):
         interpolatetimes : bool, optional
             If true, then if the times requested don't correspond to existing timestamps, outputs will be
             linearly interpolated to those times. If false, then nearest-neighbor interpolation will be used.
+        compression : str or dict or None, optional
+            Compression profile for netCDF, HDF5, and NumPy outputs: "fast", "balanced", or "archive",
+            or a dictionary of settings (see :py:func:`pyburn.postprocess() <exoplasimlegacy.pyburn.postprocess>`).
+            If None, each format's historical defaults are used.
+        compressionoverrides : dict, optional
+            Per-variable compression settings (or profile names), keyed by variable name, e.g. 
+            ``{"ta":{"precision":"float16"}}``. Unknown profile names raise a ValueError.
         '''
+        import exoplasimlegacy.pyburn as pyburn
+        if variables is None and namelist is None:
+            variables = list(pyburn.ilibrary.keys())
+        for key in [None,]+list(compressionoverrides or {}): #Unknown profile names fail now, not after a model year
+            pyburn._compressionsettings(compression,compressionoverrides,key)
         self._configuredpostprocessor[ftype] = True
         self.extensions[ftype] = extension
         self.postprocessorcfgs[ftype] = {"variables"        : variables,
@@ -991,10 +1276,12 @@ class Model(object):
                                          "timeaverage"      : timeaverage,
                                          "stdev"            : stdev,
                                          "times"            : times,
-                                         "interpolatetimes" : interpolatetimes}
+                                         "interpolatetimes" : interpolatetimes,
+                                         "compression"      : compression,
+                                         "compressionoverrides" : compressionoverrides}
     
     def postprocess(self,inputfile,variables,ftype="regular",log="postprocess.log",
-                    crashifbroken=False,**kwargs):
+                    crashifbroken=False,year=None,**kwargs):
         """    Produce NetCDF output from an input file, using a specified postprocessing namelist. 
 
         Parameters
@@ -1013,16 +1300,23 @@ class Model(object):
             The log file to which burn7 should output standard output and errors
         crashifbroken : bool, optional 
             True/False. If True, exoplasimlegacy will run .integritycheck() on the file.
+        year : int, optional
+            Model year of the raw file. If the Model was created with ``singlestore=True``, the output
+            is appended to the whole-simulation store as this year instead of being written next to
+            the raw file.
         **kwargs : keyword arguments
             Keyword arguments accepted by pyburn.postprocess. Do not specify radius, gravity, or
             gascon. These are set by the model configuration. Specifying additional keywords here
-            will override any options set via :py:func`Model.cfgpostprocessor() <exoplasimlegacy.Model.cfgpostprocessor>`
+            will override any options set via :py:func`Model.cfgpostprocessor() <exoplasimlegacy.Model.cfgpostprocessor>`.
+            If the output already holds this raw file postprocessed with the same settings (for example
+            after recovering from a crash), it is not rebuilt; pass ``cache=False`` to rebuild it anyway.
 
         Returns
         -------
         int
             1 if successful, 0 if not
         """
+        import exoplasimlegacy.pyburn as pyburn
         namelist = None
         if type(variables)==str:
             namelist = variables
@@ -1048,11 +1342,19 @@ class Model(object):
                     raise RuntimeError("Going to stop here just in case......")
                 return 0
         else:
+            storeargs = {}
+            if self.singlestore and year is not None:
+                storename = self._storename(ftype)
+                storeargs = {"append":True,"chunks":"timeseries","year":year}
             try:
                 if len(kwargs.keys())==0 and self._configuredpostprocessor[ftype]:
                     kwargs = self.postprocessorcfgs[ftype]
+                kwargs = dict(kwargs,**storeargs)
                 if variables is None and self._configuredpostprocessor[ftype]:
-                    pyburn.postprocess(inputfile,inputfile+self.extensions[ftype],logfile=log,
+                    outputfile = inputfile+self.extensions[ftype]
+                    if storeargs:
+                        outputfile = storename
+                    pyburn.postprocess(inputfile,outputfile,logfile=log,
                                        radius=self.radius,
                                        gravity=self.gravity,gascon=self.gascon,**kwargs)
                 else:
@@ -1063,7 +1365,10 @@ class Model(object):
                             kwargs["timeaverage"] = self.postprocessordefaults[ftype]["timeaverage"]
                         if "stdev" not in kwargs:
                             kwargs["stdev"] = self.postprocessordefaults[ftype]["stdev"]
-                    pyburn.postprocess(inputfile,inputfile+self.extension,logfile=log,namelist=namelist,
+                    outputfile = inputfile+self.extension
+                    if storeargs:
+                        outputfile = storename
+                    pyburn.postprocess(inputfile,outputfile,logfile=log,namelist=namelist,
                                        variables=variables,radius=self.radius,
                                        gravity=self.gravity,gascon=self.gascon,**kwargs)
                 return 1
@@ -1073,23 +1378,61 @@ class Model(object):
                     extension = self.extensions[ftype]
                 else:
                     extension = self.extension
+                outputfile = "%s%s"%(inputfile,extension)
+                if storeargs:
+                    outputfile = storename
                 if crashifbroken:
                     if not self.recursecheck:
-                        if self.integritycheck("%s%s"%(inputfile,extension)):
+                        if self.integritycheck(outputfile,year=storeargs.get("year")):
                             self.recursecheck=True
                             print("pyburn threw some errors; may want to check %s"%log)
                         else:
-                            raise RuntimeError("Error writing output to %s%s; "%(inputfile,extension) +
+                            raise RuntimeError("Error writing output to %s; "%outputfile +
                                                 "log written to %s"%log)
                     else:
                         raise RuntimeError("An error was encountered, likely with the postprocessor. ExoPlaSim was unable to investigate further due to a recursion trap.")
                 else:
-                    print("Error writing output to %s%s; log written to %s"%(inputfile,extension,log))
+                    print("Error writing output to %s; log written to %s"%(outputfile,log))
                     raise RuntimeError("Going to stop here just in case......")
                 return 0
         
         
-    def integritycheck(self,ncfile): #MUST pass an output archive that contains surface temperature
+    def rawcheck(self,rawfile):
+        """    Check the surface temperature in a raw output file for NaNs, infinities, or implausible values.
+        
+        This reads only the surface temperature records straight from the raw file (see 
+        :py:func:`pyburn.checkraw() <exoplasimlegacy.pyburn.checkraw>`), so it takes milliseconds and
+        needs no postprocessed output. When run with ``crashifbroken=True``, it is done as soon as each
+        year finishes, in place of :py:func:`Model.integritycheck() <exoplasimlegacy.Model.integritycheck>`.
+        
+        Parameters
+        ----------
+        rawfile : str
+            The raw output file to check.
+            
+        Returns
+        -------
+        int
+            1 if the file was checked and is fine, or 0 if there is no raw file to check (in which case 
+            the postprocessed output should be checked instead). An exception is raised if the file is
+            broken.
+        """
+        import exoplasimlegacy.pyburn as pyburn
+        if os.getcwd()!=self.workdir:
+            os.chdir(self.workdir)
+        if not os.path.exists(rawfile):
+            return 0
+        summary = pyburn.checkraw(rawfile,code=139)
+        if summary["records"]==0:
+            raise RuntimeError("Raw output is missing surface temperature; check logs for errors")
+        if summary["nonfinite"]>0:
+            raise RuntimeError("Non-finite values found in surface temperature")
+        if summary["outofrange"]>0:
+            raise RuntimeError("Surface temperature out of range (%g K to %g K)"%(summary["min"],
+                                                                                  summary["max"]))
+        return 1
+        
+    def integritycheck(self,ncfile,year=None): #MUST pass an output archive that contains surface temperature
         """    Check an output file to see it contains the expected variables and isn't full of NaNs.
             
         If the file does not exist, exoplasimlegacy will attempt to create it using the postprocessor.
@@ -1101,25 +1444,30 @@ class Model(object):
         ----------
         ncfile : str 
             The output file to check.
+        year : int, optional
+            If ``ncfile`` is a whole-simulation store, only check the records for this model year.
             
         Returns
         -------
         int
             0 or 1 depending on failure or success respectively
         """
+        import exoplasimlegacy.gcmt as gcmt
         if os.getcwd()!=self.workdir:
             os.chdir(self.workdir)
         ioe=1
-        if not os.path.exists(ncfile): #If the specified output file does not exist, create it
+        if not os.path.exists(ncfile) and year is None: #If the specified output file does not exist, create it
             if not self.recursecheck:
                 ioe = self.postprocess(ncfile[:-3],"example.nl",crashifbroken=False)
                 self.recursecheck=True
         if ioe:
-            ncd = gcmt.load(ncfile)
+            ncd = gcmt.load(ncfile,year=year)
             try:
                 ts = ncd.variables["ts"][:]
             except:
                 raise RuntimeError("Output is missing surface temperature; check logs for errors")
+            finally:
+                ncd.close() #A store has to be closed before the next year can be appended
             if np.sum(np.isnan(ts))+np.sum(np.isinf(ts)) > 0.5:
                 raise RuntimeError("Non-finite values found in surface temperature")
             self.recursecheck=False
@@ -1146,6 +1494,9 @@ class Model(object):
         clean : bool, optional
             True/False. If True, the original working directory will be deleted after files
             are moved. Default True.
+            
+        If the model was run with ``singlestore=True``, the whole-simulation store is kept in either
+        case (renamed after the model if ``allyears`` is False), since it is a single file.
 
         """
         
@@ -1158,34 +1509,45 @@ class Model(object):
             os.chdir(cwd)
         if not os.path.isdir(outputdir):
             os.system("mkdir %s"%outputdir)
+        self._waitforcompression()
         if allyears:
             os.chdir(outputdir)
             os.system("mkdir %s"%self.modelname)
-            os.system("cp %s/MOST*%s %s/"%(self.workdir,self.extension,self.modelname))
+            if self.singlestore:
+                os.system("cp %s/%s %s/"%(self.workdir,self._storename(),self.modelname))
+            else:
+                os.system("cp -r %s/MOST*%s %s/"%(self.workdir,self.extension,self.modelname))
             if self.snapshots:
                 os.system("cp -r %s/snapshots %s/snapshots"%(self.workdir,self.modelname))
             if self.highcadence['toggle']:
                 os.system("cp -r %s/highcadence %s/highcadence"%(self.workdir,self.modelname))
             os.system("cp %s/MOST*DIAG* %s/"%(self.workdir,self.modelname))
+            os.system("cp %s/telemetry.txt %s/"%(self.workdir,self.modelname))
             if keeprestarts:
                 os.system("cp %s/MOST_REST* %s/"%(self.workdir,self.modelname))
+            if os.path.isdir("%s/raw"%self.workdir):
+                os.system("cp -r %s/raw %s/raw"%(self.workdir,self.modelname))
             #else:
             #    restarts = sorted(glob.glob("%s/MOST_REST*"%self.workdir))
             #    os.system("cp %s %s/%s_restart"%(restarts[-1],
             #                                        self.modelname,self.modelname))
             newworkdir = os.getcwd()+"/"+self.modelname
         else:
-            outputs = sorted(glob.glob("%s/MOST*%s"%(self.workdir,self.extension)))
+            if self.singlestore:
+                outputs = ["%s/%s"%(self.workdir,self._storename()),]
+            else:
+                outputs = sorted(glob.glob("%s/MOST*%s"%(self.workdir,self.extension)))
             os.chdir(outputdir)
-            os.system("cp %s %s%s"%(outputs[-1],self.modelname,self.extension))
+            os.system("cp -r %s %s%s"%(outputs[-1],self.modelname,self.extension))
             diags = sorted(glob.glob("%s/MOST*DIAG*"%self.workdir))
             os.system("cp %s %s.DIAG"%(diags[-1],self.modelname))
+            os.system("cp %s/telemetry.txt %s_telemetry.txt"%(self.workdir,self.modelname))
             if self.snapshots:
                 snps = sorted(glob.glob("%s/snapshots/*%s"%(self.workdir,self.extension)))
-                os.system("cp %s %s_snapshot%s"%(snps[-1],self.modelname,self.extension))
+                os.system("cp -r %s %s_snapshot%s"%(snps[-1],self.modelname,self.extension))
             if self.highcadence["toggle"]:
-                hcs = sorted(glob.glob("%s/highcadence/MOST*%s"%(self.workdir,self.extension)))
-                os.system("cp %s %s_highcadence%s"%(hcs[-1],self.modelname,self.extension))
+                hcs = sorted(glob.glob("%s/highcadence/*%s"%(self.workdir,self.extension)))
+                os.system("cp -r %s %s_highcadence%s"%(hcs[-1],self.modelname,self.extension))
             if keeprestarts:
                 rsts = sorted(glob.glob("%s/MOST_REST*"%self.workdir))
                 os.system("cp %s %s_restart"%(rsts[-1],self.modelname))
@@ -1196,6 +1558,11 @@ class Model(object):
         if clean:
             os.system("rm -rf %s"%self.workdir)
             self.workdir = newworkdir
+            if allyears:
+                self.telemetry.filename = "%s/telemetry.txt"%newworkdir
+            else:
+                self.telemetry.filename = "%s/%s_telemetry.txt"%(newworkdir,self.modelname)
+            self.telemetry.promfile = None
                 
     
     def get(self,year,snapshot=False,highcadence=False):
@@ -1213,9 +1580,26 @@ class Model(object):
         Returns
         -------
         netCDF4.Dataset
-            An open netCDF4 data opject
+            An open netCDF4 data opject. If the model uses a single whole-simulation store, this is
+            a view of the store restricted to the requested year.
         """
+        import exoplasimlegacy.gcmt as gcmt
         #Note: if the work directory has been cleaned out, only the final year will be returned.
+        if self.singlestore: #Every year lives in the same store, so load a view of just this year
+            ftype = "regular"
+            if snapshot and not highcadence:
+                ftype = "snapshot"
+            elif highcadence and not snapshot:
+                ftype = "highcadence"
+            name = self._storename(ftype)
+            if self.cleaned:
+                name = "%s%s%s"%(self.modelname,{"regular":"","snapshot":"_snapshot",
+                                                 "highcadence":"_highcadence"}[ftype],
+                                 name.split("history")[-1])
+            if os.path.exists(self.workdir+"/"+name):
+                return gcmt.load(self.workdir+"/"+name,year=year)
+            else:
+                raise RuntimeError("Output file %s not found."%(self.workdir+"/"+name))
         if snapshot and not highcadence:
             name = "snapshots/MOST_SNAP.%05d%s"%(year,self.extension)
         elif highcadence and not snapshot:
@@ -1267,6 +1651,7 @@ class Model(object):
             The requested data, averaged if that was requested.
 
         """
+        import exoplasimlegacy.gcmt as gcmt
         #Note: if the work directory has been cleaned out, only the final year will be returned.
         if snapshot and not highcadence:
             pattern = "snapshots/MOST_SNAP"
@@ -1293,6 +1678,8 @@ class Model(object):
             lon = ncd.variables['lon'][:]
             lat = ncd.variables['lat'][:]
             lev = ncd.variables['lev'][:]
+            if self.singlestore:
+                ncd.close() #Keep the store free for the next year to be appended
             if not savg and not tavg:
                 if type(layer)!=type(None) and len(var.shape)==4:
                     return var[:,layer,:,:]
@@ -1340,6 +1727,8 @@ class Model(object):
                 else:
                     return -1
         else:
+            if self.singlestore:
+                ncd.close()
             return var
                 
     
@@ -1355,16 +1744,43 @@ class Model(object):
         
     def emergencyabort(self):
         """A problem has been encountered by an external script, and the model needs to crash gracefully"""
-        if self.crashtolerant and self.currentyear>=10:
-            self.currentyear-=10
-            os.system("cp MOST_REST.%05d plasim_restart"%self.currentyear)
-            os.system("rm plasim_status")
-            os.system("rm plasim_output")
-            os.system("rm plasim_hcadence")
-            os.system("rm plasim_snapshot")
-        else:
+        if not (self.crashtolerant and self._rewind()):
             self._crash()
     
+    def _rewind(self,years=10):
+        """Rewind a crashed run to the newest restart file at least ``years`` years back.
+        
+        Restart files only exist for the years the model wrote one (with more than one year per
+        launch, only the last year of each launch), so the run goes back to the newest
+        ``MOST_REST`` file at or before ``currentyear-years``. Everything written for later years is
+        deleted, ``plasim_restart`` is replaced, and the run resumes with the year after the
+        restart. Returns the year rewound to, or None (after saying why) if there is no restart
+        file to go back to.
+        """
+        target = self.currentyear-years
+        restarts = []
+        for restart in glob.glob("%s/MOST_REST.*"%self.workdir):
+            try:
+                restarts.append(int(restart.split(".")[-1]))
+            except ValueError:
+                pass
+        restarts = [year for year in restarts if year<=target]
+        if len(restarts)==0:
+            print("Cannot rewind from year %d: no restart file from year %d or earlier."%(self.currentyear,target))
+            return None
+        year = max(restarts)
+        shutil.copyfile("%s/MOST_REST.%05d"%(self.workdir,year),"%s/plasim_restart"%self.workdir)
+        for n in range(year+1,self.currentyear+1):
+            for pattern in ("MOST*%05d*","snapshots/MOST*%05d*","highcadence/MOST*%05d*","raw/MOST*%05d*"):
+                for output in glob.glob("%s/%s"%(self.workdir,pattern%n)):
+                    os.remove(output)
+        for partial in ("plasim_status","plasim_output","plasim_hcadence","plasim_snapshot"):
+            if os.path.exists("%s/%s"%(self.workdir,partial)):
+                os.remove("%s/%s"%(self.workdir,partial))
+        print("Rewound from year %d to the restart file of year %d."%(self.currentyear,year))
+        self.currentyear = year+1
+        return year
+    
     def configure(self,noutput=True,flux=1367.0,startemp=None,starspec=None,pH2=None,
             pHe=None,pN2=None,pO2=None,pCO2=None,pAr=None,pNe=None,
             pKr=None,pH2O=None,gascon=None,pressure=None,pressurebroaden=True,
@@ -2103,6 +2519,7 @@ References
         
         if len(resources)>0:
             for res in resources:
+                self._writable(res.split("/")[-1])
                 os.system("cp %s %s/"%(res,self.workdir))
         self.resources=resources
         
@@ -2792,6 +3209,7 @@ References
                 self.resources=value
                 if len(self.resources)>0:
                     for res in self.resources:
+                        self._writable(res.split("/")[-1])
                         os.system("cp %s %s/"%(res,self.workdir))
                 
             if key=="landmap":
@@ -2944,6 +3362,7 @@ References
                 nwd = os.getcwd()
                 filename = nwd+"/"+filename
                 os.chdir(cwd)
+        self._waitforcompression() #Threads can't be saved
         try:
             np.save(filename,self,allow_pickle=True)
         except:
@@ -3078,6 +3497,23 @@ References
         with open(filename,"w") as cfgf:
             cfgf.write("\n".join(cfg))
         
+    def _writable(self,filename):
+        """Make sure a file in the working directory is the model's own copy, before it is changed"""
+        
+        inputstore.materialize(self.workdir+"/"+filename)
+        
+    def _get_namelist(self,namelist,arg):
+        """Return the value of an argument in a namelist as a string, or None if it isn't set"""
+        
+        with open(self.workdir+"/"+namelist,"r") as f:
+            for line in f.read().split('\n'):
+                if "=" not in line:
+                    continue
+                key,value = line.split("=",1)
+                if key.strip()==arg:
+                    return value.strip().rstrip(",").strip()
+        return None
+        
     def _rm_namelist_param(self,namelist,arg,val):
         """Remove an argument from a namelist"""
         
@@ -3107,6 +3543,7 @@ References
                 fnl.pop(l)
                 break
                 
+        self._writable(namelist)
         f=open(self.workdir+"/"+namelist,"w")
         f.write('\n'.join(fnl))
         f.close()
@@ -3160,6 +3597,7 @@ References
             else:
                 fnl.insert(idx,' '+arg+'= '+val+' ,')
             
+        self._writable(namelist)
         f=open(self.workdir+"/"+namelist,"w")
         f.write('\n'.join(fnl))
         f.close()
@@ -3181,6 +3619,7 @@ References
             pnl.append(arg+'='+val)
         pnl.append('')
         
+        self._writable(namelist)
         with open(self.workdir+"/"+namelist,"w") as f:
             f.write('\n'.join(pnl))
             
@@ -3201,6 +3640,7 @@ References
                 ncodes.append(n)
         pnl[lineno]+=','+','.join([str(n) for n in ncodes])
         #print "Writing to %s/%s: \n"%(home,filename)+'\n'.join(pnl)+"\n"
+        self._writable(namelist)
         with open(self.workdir+"/"+namelist,"w") as f:
             f.write('\n'.join(pnl)+"\n")
 
@@ -3223,6 +3663,7 @@ References
                 newcodes.append(n)
         pnl[lineno]+=','+','.join([str(n) for n in newcodes])
         #print "Writing to %s/%s: \n"%(home,filename)+'\n'.join(pnl)+"\n"
+        self._writable(namelist)
         with open(self.workdir+"/"+namelist,"w") as f:
             f.write('\n'.join(pnl)+"\n")
 
@@ -0,0 +1,189 @@
+"""
+A cache of compiled PlaSim executables, shared by every :py:class:`Model <exoplasimlegacy.Model>`.
+
+Each executable is stored once, under a key hashed from everything that decides what the compiler
+produces: resolution, layers, MPI processes, precision, debug and optimization flags, the Mars and
+FFT991 switches, and the contents of the source tree and compiler settings. A Model asking for a
+build that has already been made (by any process) copies the cached executable instead of running
+``compile.sh`` again, so a sweep of models with the same ``optimization`` compiles once rather than
+once per model.
+
+Builds run ``compile.sh`` with a parallel ``make``, one at a time behind a file lock (the build
+directory is shared), so models constructed concurrently never race into the same ``make``; a model
+waiting on the lock finds the executable it needs in the cache once the lock is released. The cache
+lives in ``plasim/cache`` next to the package, or wherever the ``EXOPLASIM_BUILDCACHE`` environment
+variable points. Configurations can be built ahead of a sweep with :py:func:`prebuild`::
+
+    import exoplasimlegacy.buildcache as buildcache
+    buildcache.prebuild([{"resolution":"T21","ncpus":4,"optimization":"mavx"},
+                         {"resolution":"T42","ncpus":16,"optimization":"mavx"}])
+"""
+import os
+import glob
+import json
+import time
+import shutil
+import hashlib
+import exoplasimlegacy.resolutions as resolutions
+
+try:
+    import fcntl
+except ImportError: #No file locking on this platform; concurrent builds must be avoided by hand
+    fcntl = None
+
+SOURCEDIR = os.path.dirname(os.path.abspath(__file__))
+
+#Files outside plasim/src that change what compile.sh produces
+_BUILDFILES = ["compile.sh","most_compiler","most_compiler_mpi","most_precision_optionsx",
+               "most_debug_options","plasim/src/*"]
+
+_sourcehashes = {} #Source tree hashes already computed by this process, keyed by file sizes and times
+
+def cachedir():
+    '''Directory holding cached executables.'''
+    return os.environ.get("EXOPLASIM_BUILDCACHE",os.path.join(SOURCEDIR,"plasim","cache"))
+
+def executablename(nsp,layers,ncpus):
+    '''Name compile.sh gives an executable.'''
+    return "most_plasim_t%d_l%d_p%d.x"%(nsp,layers,ncpus)
+
+def sourcehash(sourcedir=SOURCEDIR):
+    '''SHA-256 hash of the PlaSim source tree and compiler settings.
+
+    The hash is only recomputed when a file's size or modification time changes.
+    '''
+    files = []
+    for pattern in _BUILDFILES:
+        files += sorted(glob.glob(os.path.join(sourcedir,pattern)))
+    files = [name for name in files if os.path.isfile(name)]
+    stamp = tuple([(name,os.path.getsize(name),os.path.getmtime(name)) for name in files])
+    if stamp not in _sourcehashes:
+        digest = hashlib.sha256()
+        for name in files:
+            digest.update(os.path.relpath(name,sourcedir).encode())
+            with open(name,"rb") as sourcef:
+                digest.update(hashlib.sha256(sourcef.read()).digest())
+        _sourcehashes[stamp] = digest.hexdigest()
+    return _sourcehashes[stamp]
+
+def buildkey(nsp,layers,ncpus,precision=8,debug=False,optimization=None,mars=False,force991=False,
+             sourcedir=SOURCEDIR):
+    '''Key of a build in the cache: a hash of its configuration and of the source tree.'''
+    config = {"nsp":int(nsp),"layers":int(layers),"ncpus":int(ncpus),"precision":int(precision),
+              "debug":bool(debug),"optimization":optimization or "","mars":bool(mars),
+              "force991":bool(force991),"source":sourcehash(sourcedir)}
+    return hashlib.sha256(json.dumps(config,sort_keys=True).encode()).hexdigest()[:24],config
+
+class _Lock(object):
+    '''Exclusive lock on a file, held for the duration of a ``with`` block.'''
+    def __init__(self,filename):
+        self.filename = filename
+        self.lockf = None
+    def __enter__(self):
+        self.lockf = open(self.filename,"a")
+        if fcntl is not None:
+            fcntl.flock(self.lockf,fcntl.LOCK_EX)
+        return self
+    def __exit__(self,*args):
+        if fcntl is not None:
+            fcntl.flock(self.lockf,fcntl.LOCK_UN)
+        self.lockf.close()
+
+def build(nsp,layers,ncpus,precision=8,debug=False,optimization=None,mars=False,force991=False,
+          rebuild=False,jobs=None,sourcedir=SOURCEDIR):
+    '''Return the path to a cached executable for this configuration, compiling it if needed.
+
+    Parameters
+    ----------
+    nsp : int
+        Spectral truncation (e.g. 21 for T21)
+    layers : int
+        Number of vertical layers
+    ncpus : int
+        Number of MPI processes
+    precision : int, optional
+        Bytes per Fortran real (4 or 8)
+    debug : bool, optional
+        Compile with debugging flags
+    optimization : str, optional
+        Extra compiler flags (see :py:class:`Model <exoplasimlegacy.Model>`)
+    mars : bool, optional
+        Compile with Mars routines
+    force991 : bool, optional
+        Use the FFT991 library
+    rebuild : bool, optional
+        Compile even if the executable is already cached, replacing it.
+    jobs : int, optional
+        Number of parallel ``make`` jobs. Defaults to the number of cores.
+
+    Returns
+    -------
+    str
+        Path to the executable.
+    '''
+    key,config = buildkey(nsp,layers,ncpus,precision=precision,debug=debug,optimization=optimization,
+                          mars=mars,force991=force991,sourcedir=sourcedir)
+    entry = os.path.join(cachedir(),key)
+    executable = os.path.join(entry,executablename(nsp,layers,ncpus))
+    if os.path.exists(executable) and not rebuild:
+        return executable
+    if not os.path.isdir(cachedir()):
+        os.makedirs(cachedir(),exist_ok=True)
+
+    with _Lock(os.path.join(cachedir(),"build.lock")):
+        if os.path.exists(executable) and not rebuild: #Built by another process while we waited
+            return executable
+        built = os.path.join(sourcedir,"plasim","run",executablename(nsp,layers,ncpus))
+        if os.path.exists(built):
+            os.remove(built) #So a failed build can't leave an old executable to be cached
+        extraflags = ""
+        if debug:
+            extraflags+= "-d "
+        if optimization:
+            extraflags+= "-O %s "%optimization
+        if mars:
+            extraflags+= "-m "
+        if force991:
+            extraflags+= "-f "
+        tstart = time.time()
+        os.system("cwd=$(pwd) && "+
+                  "cd %s && ./compile.sh -n %d -p %d -r T%d -v %d -j %d "%(sourcedir,ncpus,precision,nsp,
+                                                                          layers,jobs or os.cpu_count() or 1)+
+                  extraflags+" &&"+
+                  "cd $cwd")
+        if not os.path.exists(built):
+            raise RuntimeError("Compiling %s failed; see the compiler output above."%executablename(nsp,layers,ncpus))
+        os.makedirs(entry,exist_ok=True)
+        shutil.copy2(built,executable+".tmp")
+        os.replace(executable+".tmp",executable) #Other processes only ever see a whole executable
+        config["buildtime"] = time.time()-tstart
+        config["built"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(os.path.join(entry,"build.json"),"w") as configf:
+            json.dump(config,configf,indent=1)
+    return executable
+
+def prebuild(configurations,jobs=None):
+    '''Build a list of configurations ahead of time, e.g. before launching a sweep.
+
+    Parameters
+    ----------
+    configurations : list
+        Dicts of :py:class:`Model <exoplasimlegacy.Model>` keyword arguments; "resolution", "layers",
+        "ncpus", "precision", "debug", "optimization", "mars", and "force991" are used, with the
+        Model's defaults for any left out. Other keys are ignored.
+    jobs : int, optional
+        Number of parallel ``make`` jobs for each build. Defaults to the number of cores.
+
+    Returns
+    -------
+    list
+        Paths to the executables, in the order given.
+    '''
+    executables = []
+    for config in configurations:
+        executables.append(build(resolutions.truncation(config.get("resolution","T21")),
+                                 config.get("layers",10),config.get("ncpus",4),
+                                 precision=config.get("precision",8),debug=config.get("debug",False),
+                                 optimization=config.get("optimization"),mars=config.get("mars",False),
+                                 force991=config.get("force991",False),jobs=jobs))
+    return executables
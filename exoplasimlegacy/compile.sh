@@ -24,6 +24,8 @@
 #
 #      -d:   Compile in debug mode (will produce line-number tracebacks on crash)
 #
+#      -j:   Number of parallel make jobs. Default: 1
+#
 helptext=$(cat <<-END
                EXOPLASIM COMPILATION SCRIPT
 
@@ -52,6 +54,8 @@ helptext=$(cat <<-END
       -d:   Compile in debug mode (will produce line-number tracebacks on crash)
 
       -m:   Compile with Mars routines
+
+      -j:   Number of parallel make jobs. Default: 1
       
       -h:   Output this text
 END
@@ -70,8 +74,9 @@ optimization=""
 nopt=0
 years=10
 nmars=0
+jobs=1
 
-while getopts "p:r:v:n:O:t:dhm" opt; do
+while getopts "p:r:v:n:O:t:j:fdhm" opt; do
     case $opt in
         p)
             case $OPTARG in
@@ -171,7 +176,7 @@ while getopts "p:r:v:n:O:t:dhm" opt; do
                     echo "INVALID RESOLUTION PASSED! Reverting to T21."
                     ;;
             esac ;;
-        f)    
+        f)
             fftopt="fft991mod"
             ;;
         v)
@@ -186,6 +191,9 @@ while getopts "p:r:v:n:O:t:dhm" opt; do
         t)
             years=$OPTARG
             ;;
+        j)
+            jobs=$OPTARG
+            ;;
         O)
             optimization="-"$OPTARG
             nopt=1
@@ -282,7 +290,7 @@ export OCEANCOUP=cpl_stub
 export FFTMOD=$fftopt
 #cat makefile
 
-make -e
+make -e -j $jobs
 ./most_snow_build$prec
 ./most_ice_build$prec
 cp plasim.x ../bin/$executable
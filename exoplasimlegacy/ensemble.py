@@ -0,0 +1,267 @@
+"""
+Run many small models side by side on one node.
+
+An :py:class:`Ensemble` takes a list of configured models and runs them a year at a time, packing
+the MPI ranks of as many models as fit into a budget of cores. Each model year runs pinned to its own
+set of cores. Postprocessing is scheduled separately, on a single core, so the cores a model ran on
+go straight to the next model that is ready to run while its output is being postprocessed. Models
+are handed to worker processes and back by pickling, as :py:func:`Model.save()
+<exoplasimlegacy.Model.save>` does, so each one keeps its own working directory and state.
+"""
+import os
+import time
+import shutil
+import concurrent.futures
+import exoplasimlegacy
+
+def _availablecores():
+    '''Cores this process may run on.'''
+    if hasattr(os,"sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def _pin(cores):
+    '''Pin the calling process to a set of cores, where the platform allows it.'''
+    if hasattr(os,"sched_setaffinity"):
+        os.sched_setaffinity(0,cores)
+
+def _runyear(model,cores):
+    '''Integrate one year of a model, with its ranks pinned to the given cores. Runs in a worker process.'''
+    _exec = model._exec
+    if shutil.which("taskset"):
+        model._exec = "taskset -c %s %s"%(",".join([str(core) for core in cores]),_exec)
+    try:
+        model._run(years=1,postprocess=False,crashifbroken=False,clean=False)
+    finally:
+        model._exec = _exec
+    return model
+
+def _postprocessyear(model,year,core,crashifbroken=False,clean=True,balance=None):
+    '''Postprocess one year of a model and, if asked, check its energy balance. Runs in a worker process.
+
+    Returns the model, and whether it is now in energy balance (None if ``balance`` is None).
+    '''
+    _pin([core,])
+    os.chdir(model.workdir)
+    dataname="MOST.%05d"%year
+    snapname="MOST_SNAP.%05d"%year
+    hcname  ="MOST_HC.%05d"%year
+
+    if crashifbroken:
+        model.rawcheck(dataname)
+    tpost = time.time()
+    timeavg=model.postprocess(dataname,None,year=year,log="burnout",crashifbroken=crashifbroken)
+    snapsht=model.postprocess(snapname,None,ftype="snapshot",year=year,log="snapout",
+                              crashifbroken=crashifbroken)
+    if not model.singlestore:
+        os.system("mv %s%s snapshots/"%(snapname,model.extension))
+    highcdn=0
+    if model.highcadence["toggle"]:
+        highcdn=model.postprocess(hcname,None,ftype="highcadence",year=year,log="hcout",
+                                  crashifbroken=crashifbroken)
+        if not model.singlestore:
+            os.system("mv %s%s highcadence/"%(hcname,model.extension))
+    model.telemetry.record(year,postprocess=time.time()-tpost)
+    if clean:
+        if timeavg:
+            model._cleanraw(dataname)
+        if snapsht:
+            model._cleanraw(snapname)
+        if highcdn:
+            model._cleanraw(hcname)
+        model._waitforcompression()
+
+    balanced = None
+    if balance is not None:
+        sb = model.getbalance("hfns")
+        tb = model.getbalance("ntr")
+        model.telemetry.record(year,toa=tb,surface=sb)
+        os.system("echo '%02.6f  %02.6f'>>%s/balance.log"%(sb,tb,model.workdir))
+        balanced = bool(model._isbalanced(threshold=balance["threshold"],baseline=balance["baseline"]))
+    return model,balanced
+
+class Ensemble(object):
+    '''A set of models run side by side, sharing a budget of cores.
+
+    Parameters
+    ----------
+    members : list
+        Configured :py:class:`Model <exoplasimlegacy.Model>` objects, or paths to configuration files
+        written by :py:func:`Model.exportcfg() <exoplasimlegacy.Model.exportcfg>`. Each configuration
+        file becomes a Model named after the file, with its working directory next to it.
+    cores : int, optional
+        Number of cores to use. Defaults to all the cores this process may run on.
+    modelkwargs : dict, optional
+        Keyword arguments used to create Models for configuration files (e.g. ``{"ncpus":8}``).
+
+    Attributes
+    ----------
+    models : list
+        The member models, in the order given, kept up to date as years finish.
+    finished : dict
+        For each model name, whether it ran to completion (for :py:func:`runtobalance`, whether it
+        reached energy balance).
+    errors : dict
+        For each model name that failed, the exception raised.
+
+    Notes
+    -----
+    Each model's MPI launcher is wrapped in ``taskset`` to pin it to its cores. MPI libraries that bind
+    ranks to cores themselves should be told not to (e.g. with OpenMPI's ``--bind-to none``), or to
+    bind within the cores they are given.
+    '''
+    def __init__(self,members,cores=None,modelkwargs=None):
+        self.models = []
+        for member in members:
+            if isinstance(member,str):
+                name = os.path.splitext(os.path.basename(member))[0]
+                kwargs = {"modelname":name,"workdir":os.path.join(os.path.dirname(os.path.abspath(member)),name)}
+                kwargs.update(modelkwargs or {})
+                model = exoplasimlegacy.Model(**kwargs)
+                model.loadconfig(member)
+                member = model
+            self.models.append(member)
+
+        self.cores = _availablecores()
+        if cores is not None:
+            self.cores = self.cores[:cores]
+        names = [model.modelname for model in self.models]
+        workdirs = [model.workdir for model in self.models]
+        if len(set(names))<len(names) or len(set(workdirs))<len(workdirs):
+            raise Exception("Every member of an ensemble needs its own model name and working directory.")
+        for model in self.models:
+            if model.ncpus>len(self.cores):
+                raise Exception("%s needs %d cores, but the ensemble only has %d."%(model.modelname,
+                                                                                    model.ncpus,
+                                                                                    len(self.cores)))
+        self.finished = {}
+        self.errors = {}
+
+    def run(self,years=1,crashifbroken=False,clean=True):
+        '''Run every member for a set number of years.
+
+        Parameters
+        ----------
+        years : int, optional
+            Number of years to run each member
+        crashifbroken : bool, optional
+            True/False. If True, check each year for broken output, and crash any member that
+            produces it (the rest carry on).
+        clean : bool, optional
+            True/False. If True, delete raw output files once output files are made (or compress them,
+            for members created with ``rawcompression``)
+
+        Returns
+        -------
+        dict
+            For each model name, whether it finished its years.
+        '''
+        targets = [model.currentyear+years for model in self.models]
+        return self._schedule(targets,None,crashifbroken,clean)
+
+    def runtobalance(self,threshold=None,baseline=50,maxyears=300,minyears=75,crashifbroken=True,clean=True):
+        '''Run every member until it reaches energy balance, as :py:func:`Model.runtobalance()
+        <exoplasimlegacy.Model.runtobalance>` does.
+
+        Parameters
+        ----------
+        threshold : float, optional
+            If specified, overrides each member's threshold set by ``.config()``.
+        baseline : int, optional
+            The number of years over which to evaluate energy balance drift. Default 50
+        maxyears : int, optional
+            The maximum number of years to run each member. Default 300.
+        minyears : int, optional
+            The minimum number of years to run before determining that a member is in equilibrium.
+            Both count from each member's model year when this call starts, as in
+            :py:func:`Model.runtobalance() <exoplasimlegacy.Model.runtobalance>`.
+        crashifbroken : bool, optional
+            True/False. If True, check each year for broken output, and crash any member that
+            produces it (the rest carry on).
+        clean : bool, optional
+            True/False. If True, raw output is deleted once postprocessed. Default True.
+
+        Returns
+        -------
+        dict
+            For each model name, whether it reached equilibrium.
+        '''
+        if threshold:
+            for model in self.models:
+                model.threshold = threshold
+        bounds = [exoplasimlegacy._balancebounds(model.currentyear,minyears,maxyears) for model in self.models]
+        targets = [runlimit for minyear,runlimit in bounds]
+        balance = {"baseline":baseline,"minyear":[minyear for minyear,runlimit in bounds]}
+        finished = self._schedule(targets,balance,crashifbroken,clean)
+        for model in self.models:
+            if model.modelname not in self.errors:
+                model._writebalancehistory()
+        return finished
+
+    def _schedule(self,targets,balance,crashifbroken,clean):
+        '''Run members a year at a time until each reaches its target year (or balance), packing them onto the cores.'''
+        free = list(self.cores)
+        waiting = [] #Indices of members ready for their next model year
+        postqueue = [] #(index, year) of model years waiting to be postprocessed
+        running = {} #future: (index, kind, cores, year)
+        for k,model in enumerate(self.models):
+            self.finished[model.modelname] = False
+            if model.currentyear<targets[k]:
+                waiting.append(k)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(self.cores)) as pool:
+            while len(waiting)+len(postqueue)+len(running)>0:
+                #Postprocessing first: it frees its member to run again, and only needs one core
+                while len(postqueue)>0 and len(free)>0:
+                    k,year = postqueue.pop(0)
+                    core = free.pop(0)
+                    memberbalance = None
+                    if balance is not None:
+                        memberbalance = {"threshold":self.models[k].threshold,"baseline":balance["baseline"]}
+                    future = pool.submit(_postprocessyear,self.models[k],year,core,
+                                         crashifbroken=crashifbroken,clean=clean,balance=memberbalance)
+                    running[future] = (k,"post",[core,],year)
+                #Then fill the remaining cores with model years, largest first so they aren't crowded out
+                for k in sorted(waiting,key=lambda k: -self.models[k].ncpus):
+                    if self.models[k].ncpus<=len(free):
+                        cores = free[:self.models[k].ncpus]
+                        free = free[self.models[k].ncpus:]
+                        waiting.remove(k)
+                        future = pool.submit(_runyear,self.models[k],cores)
+                        running[future] = (k,"run",cores,self.models[k].currentyear)
+
+                done,pending = concurrent.futures.wait(list(running),
+                                                       return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    k,kind,cores,year = running.pop(future)
+                    free = sorted(free+cores)
+                    model = self.models[k]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print("%s failed in year %d: %s"%(model.modelname,year,e))
+                        self.errors[model.modelname] = e
+                        if crashifbroken and kind=="post" and not model.crashtolerant:
+                            try:
+                                model._crash()
+                            except RuntimeError:
+                                pass
+                        continue
+                    if kind=="run":
+                        self.models[k] = result
+                        if result.currentyear==year+1:
+                            postqueue.append((k,year))
+                        elif result.currentyear<targets[k]: #A crash-tolerant member rewound itself
+                            waiting.append(k)
+                        continue
+                    model,balanced = result
+                    self.models[k] = model
+                    if balance is not None:
+                        complete = balanced and model.currentyear>=balance["minyear"][k]
+                    else:
+                        complete = model.currentyear>=targets[k]
+                    if complete:
+                        self.finished[model.modelname] = True
+                    elif model.currentyear<targets[k]:
+                        waiting.append(k)
+        return dict(self.finished)
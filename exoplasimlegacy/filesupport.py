@@ -2,6 +2,7 @@
 SUPPORTED = [".nc"        , #NetCDF
              ".npz"       , #NumPy
              ".npy"       , #Synonym for NumPy
+             ".npyd"      , #NumPy (uncompressed, memory-mappable directory)
              ".csv"       , #CSV/TXT
              ".txt"       , #CSV/TXT
              ".gz"        , #CSV/TXT (compressed)
@@ -13,4 +14,11 @@ SUPPORTED = [".nc"        , #NetCDF
              ".h5"        , #Synonym for HDF5
              ".he5"       , #Synonym for HDF5
              ]
-             #Future support: parallelized writes
\ No newline at end of file
+             #Future support: parallelized writes
+
+#Formats that can be appended to, and so can hold a whole simulation in one file
+APPENDABLE = [".nc"        , #NetCDF
+              ".hdf5"      , #HDF5
+              ".h5"        , #Synonym for HDF5
+              ".he5"       , #Synonym for HDF5
+              ]
@@ -1,7 +1,7 @@
 import numpy as np
 import exoplasimlegacy.filesupport
 from exoplasimlegacy.filesupport import SUPPORTED
-import os, glob
+import os, glob, time, contextlib
 
 def _loadnetcdf(filename):
     import netCDF4 as nc
@@ -12,47 +12,82 @@ def _loadnpsavez(filename):
     npdata = np.load(filename)    
     return npdata
 
+def _loadnpydir(filename):
+    import json
+    filename = filename.rstrip("/")
+    with open(os.path.join(filename,"metadata.json"),"r") as jsonf:
+        meta = json.load(jsonf)
+    npdata = {}
+    for var in meta:
+        #Memory-mapped, so only the pages that are actually sliced get read from disk
+        npdata[var] = np.load(os.path.join(filename,var+".npy"),mmap_mode='r')
+    return npdata,meta
+
+def _parsecsvheader(header):
+    '''Split a pyburn CSV header line into the variable's shape and its metadata fields.'''
+    if type(header)==bytes:
+        header = header.decode()
+    header = header.strip().lstrip("#").strip().split(',')
+    dims = []
+    k=0
+    while header[k]!="|||":
+        dims.append(int(header[k]))
+        k+=1
+    k+=1
+    return tuple(dims),header[k:]
+
+def _parsecsv(text):
+    '''Parse the contents of a pyburn CSV file (as bytes) into an array.
+    
+    Comment lines are skipped, and the numeric body is handed to NumPy's C-level text parser
+    in a single call, rather than being split and converted line by line.
+    '''
+    while text[:1]==b"#":
+        text = text[text.find(b"\n")+1:]
+    text = text.strip()
+    ncols = text[:text.find(b"\n")].count(b",")+1
+    data = np.fromstring(text.replace(b"\n",b","),sep=",")
+    if ncols>1:
+        data = np.reshape(data,(-1,ncols))
+    return data
+
 def _loadcsv(filename,buffersize=1):
     import gzip 
     
     fileparts = filename.split('.')
 
-    rdataset = {}
     metadata = {}
+    dimensions = {}
     
-    openfiles = []
-    
+    tarobj = None
     if "tar" in fileparts[-2:]: #We're dealing with a tarball of some kind
         import tarfile
-        with tarfile.open(filename,"r") as tarball:
-            members = tarball.getnames()
-            tarball.extractall()
+        #The tarball stays open for the life of the dataset, and members are streamed into memory
+        #from it, so nothing is ever extracted to the working directory.
+        tarobj = tarfile.open(filename,"r")
+        members = [member for member in tarobj.getmembers() if member.isfile()]
             
     else: #filename here should be the name of a directory containing only variable csv/txt/gz files 
         #Just a collection of CSV/TXT-type files in a subdirectory, which may be individually-compressed.
         #These files can have .txt, .csv, or .gz file extensions.
-        members = glob.glob(filename+"/*")
+        members = glob.glob(".".join(filename.split(".")[:-1])+"/*")
         
-    dimensions = {}
     for var in members:
-        #with open(var,"r") as csvf:
-            #data = np.loadtxt(csvf,delimiter=',')
-        if var[-3:]==".gz": #gzipped file
-            with gzip.open(var,"rt") as gzf:
-                header = gzf.readline()[1:].split(',')
+        if tarobj is not None:
+            with tarobj.extractfile(var) as memberf:
+                if var.name[-3:]==".gz": #gzipped file
+                    with gzip.GzipFile(fileobj=memberf) as gzf:
+                        header = gzf.readline()
+                else:
+                    header = memberf.readline()
+        elif var[-3:]==".gz": #gzipped file
+            with gzip.open(var,"rb") as gzf:
+                header = gzf.readline()
         else:
-            with open(var,"r") as txtf:
-                header = txtf.readline()[1:].split(',')
-        dims = []
-        k=0
-        while header[k]!="|||":
-            dims.append(int(header[k]))
-            k+=1
-        k+=1
-        meta = header[k:]
-        dims = tuple(dims)
+            with open(var,"rb") as txtf:
+                header = txtf.readline()
+        dims,meta = _parsecsvheader(header)
         dimensions[meta[0]] = dims
-        #rdataset[meta[0]] = np.reshape(data,dims)
         metadata[meta[0]] = {}
         try:
             metadata[meta[0]]["standard_name"] = meta[1]
@@ -70,13 +105,8 @@ def _loadcsv(filename,buffersize=1):
             metadata[meta[0]]["code"] = int(meta[3])
         except:
             metadata[meta[0]]["code"] = -999
-        openfiles.append(var)
         
-    if "tar" in fileparts[-2:]:
-        for f in openfiles:
-            os.system("rm -rf %s"%f)
-        os.system("rm -rf %s"%(openfiles[0].split("/")[0]))
-    rdataset = _csvData(filename,shapes=dimensions,buffersize=buffersize)
+    rdataset = _csvData(filename,shapes=dimensions,buffersize=buffersize,tarobj=tarobj)
     return rdataset,metadata
     
 def _loadhdf5(filename):
@@ -95,6 +125,9 @@ class _csvData(dict):
         Dictionary of tuples giving the shapes of each variable in the archive
     buffersize : int, optional
         Number of data arrays to store in memory at a time
+    tarobj : tarfile.TarFile, optional
+        An already-open tarfile object for ``archive``. If not given and ``archive`` is a tarball,
+        it will be opened here. Either way, it stays open until :py:meth:`close` is called.
     **kwargs : optional
         Any additional keyword arguments to pass to the parent `dict` object. These will be accessible
         via the usual dictionary methods.
@@ -104,18 +137,26 @@ class _csvData(dict):
     iterable
         Supports all dictionary methods
     '''
-    def __init__(self,archive,shapes={},buffersize=1,**kwargs):
+    def __init__(self,archive,shapes={},buffersize=1,tarobj=None,**kwargs):
         self.archive = archive
         self.tarball=False
         self.buffersize=buffersize
         self.dbuffer = {}
         self.dbufferkeys = []
         self.shapes = shapes
+        self.tarobj = None
+        self.members = {}
+        self.staged = None
         if "tar" in archive:
             self.tarball=True
-            import tarfile
-            with tarfile.open(self.archive,"r") as tarball:
-                self.files = tarball.getnames()
+            if tarobj is None:
+                import tarfile
+                tarobj = tarfile.open(self.archive,"r")
+            self.tarobj = tarobj
+            for member in self.tarobj.getmembers():
+                if member.isfile():
+                    self.members[member.name] = member
+            self.files = list(self.members.keys())
         else:
             self.files = glob.glob(".".join(archive.split(".")[:-1])+"/*")
         self.variables = []
@@ -155,16 +196,9 @@ class _csvData(dict):
         if key in self.permanent:
             return self.permanent[key]
         if key not in self.dbuffer:
-            if self.tarball:
-                import tarfile
-                with tarfile.open(self.archive,"r") as tarball:
-                    tarball.extract(self.filetree[key])
-            with open(self.filetree[key],"r") as csvf:
-                data = np.loadtxt(csvf,delimiter=',')
+            data = _parsecsv(self._readmember(key))
             if key in self.shapes:
                 data = np.reshape(data,self.shapes[key])
-            os.system("rm -rf %s"%self.filetree[key])
-            os.system("rm -rf %s"%(self.filetree[key].split("/")[0]))
             if not overridebuffer:
                 if len(self.dbufferkeys)==self.buffersize:
                     del self.dbuffer[self.dbufferkeys[0]]
@@ -178,11 +212,80 @@ class _csvData(dict):
                 self.dbufferkeys.append(key) #Move this key to the end so it's the last to be removed.
         return data
     
+    def _readmember(self,key):
+        '''Read the raw (decompressed) bytes of a variable's file, straight from the archive.'''
+        import gzip
+        fname = self.filetree[key]
+        if self.staged and key in self.staged:
+            text = self.staged[key][1]
+        elif self.tarball:
+            with self.tarobj.extractfile(self.members[fname]) as memberf:
+                text = memberf.read()
+        else:
+            with open(fname,"rb") as csvf:
+                text = csvf.read()
+        if fname[-3:]==".gz":
+            text = gzip.decompress(text)
+        return text
+    
+    def close(self):
+        '''Close the underlying tarball, if there is one.'''
+        if self.tarobj is not None:
+            self.tarobj.close()
+            self.tarobj = None
+    
+    def _encode(self,key,value,fname):
+        '''Format an array as a pyburn CSV file (as bytes), gzipped if the archive's members are.'''
+        import io, gzip
+        value = np.asarray(value)
+        shape = value.shape
+        if len(shape)>2: #Flatten the first N-1 dimensions, as pyburn does
+            value = np.reshape(value,(int(np.prod(shape[:-1])),shape[-1]))
+        buf = io.BytesIO()
+        np.savetxt(buf,value.astype("float32"),
+                   header=(','.join(np.array(shape).astype(str))+',|||,'
+                           +','.join([key,key,"user","-333"])),delimiter=',')
+        text = buf.getvalue()
+        if fname[-3:]==".gz":
+            text = gzip.compress(text)
+        return text
+    
+    def _register(self,key,value,fname):
+        '''Update the in-memory index after ``key`` has been written to ``fname``.'''
+        if key not in self.filetree:
+            self.variables.append(key)
+        self.filetree[key] = fname
+        self.shapes[key] = np.shape(value)
+        if key in self.dbuffer:
+            del self.dbuffer[key]
+            self.dbufferkeys.remove(key)
+        if key in self.permanent:
+            self.permanent[key] = np.asarray(value)
+        super(_csvData,self).__setitem__(key,fname)
+    
+    def _reopen(self):
+        '''Re-open the tarball for reading and refresh the member index.'''
+        import tarfile
+        self.close()
+        self.tarobj = tarfile.open(self.archive,"r")
+        self.members = {}
+        for member in self.tarobj.getmembers():
+            if member.isfile():
+                self.members[member.name] = member #Later members shadow earlier ones with the same name
+        self.files = list(self.members.keys())
+    
+    def _compressed(self):
+        return self.tarball and self.archive.split(".")[-1] in ("gz","bz2","xz")
+    
     def __setitem__(self,key,value):
         '''Add array to archive
         
-        Unless the archive is an uncompressed tarfile that doesn't already have the variable `key`,
-        this will extract the archive, delete the original, write a new file, and re-tar 
+        Directory archives get a new file written directly. Uncompressed tarballs have the new file
+        appended in place, which costs only as much as the new variable; if `key` already exists,
+        the appended copy shadows the old one. Compressed tarballs cannot be appended to, so the 
+        archive is rewritten once, streaming the existing members into the new archive without
+        touching the disk. When adding several variables to a compressed tarball, use 
+        :py:meth:`batch` so that the archive is only rewritten once.
         
         Parameters
         ----------
@@ -192,64 +295,180 @@ class _csvData(dict):
             Variable data
         '''
         if key in self.filetree:
-            if self.tarball:
-                import tarfile
-                with tarfile.open(self.archive,"r") as tarball:
-                    members = tarball.getnames()
-                    tarball.extractall()
-                os.system("rm -rf "+self.archive)
-            print("Writing %8s to %s"%(key,fname))
-            np.savetxt(fname,value.astype("float32"),
-                    header=(','.join(np.array(value.shape).astype(str))+',|||,'
-                            +','.join([key,key,"user","-333"])),delimiter=',')
-            if self.tarball:
-                if "tar.gz" in self.archive or "tar.bz2" in self.archive or "tar.xz" in self.archive:
-                    with tarfile.open(self.archive,"w:%s"%self.archive.split(".")[-1]) as tarball:
-                        for var in members:
-                            varname = var.split("_")[-1].split(".")[0]
-                            tarball.add(var,arcname=varname)
-                else:
-                    with tarfile.open(self.archive,"w") as tarball:
-                        for var in members:
-                            varname = var.split("_")[-1].split(".")[0]
-                            tarball.add(var,arcname=varname)
-                        
-                for var in members:
-                    os.system("rm -rf %s"%var)
-                
+            fname = self.filetree[key]
         else:
-            fname = lf.filestem+"_"+key+extension
-            self.variables.append(key)
-            self.filetree[key] = fname
+            fname = self.filestem+"_"+key+self.extension
+        text = self._encode(key,value,fname)
+        
+        if self.staged is not None:
+            print("Staging %8s for %s"%(key,self.archive))
+            self.staged[key] = (fname,text,np.shape(value))
+            self._register(key,value,fname)
+            return
+        
+        if not self.tarball:
             print("Writing %8s to %s"%(key,fname))
-            np.savetxt(fname,value.astype("float32"),
-                    header=(','.join(np.array(value.shape).astype(str))+',|||,'
-                            +','.join([key,key,"user","-333"])),delimiter=',')
-            if self.tarball:
-                import tarfile
-                print("Packing %s in %s"%(fname,self.archive))
-                if "tar.gz" in self.archive or "tar.bz2" in self.archive or "tar.xz" in self.archive:
-                    with tarfile.open(self.archive,"r") as tarball:
-                        members = tarball.getnames()
-                        tarball.extractall()
-                    os.system("rm -rf "+self.archive)
-                    with tarfile.open(self.archive,"w:%s"%self.archive.split(".")[-1]) as tarball:
-                        for var in members:
-                            varname = var.split("_")[-1].split(".")[0]
-                            tarball.add(var,arcname=varname)
-                        tarball.add(fname,arcname=key)
-                        for var in members:
-                            os.system("rm -rf %s"%var)
-                        os.system("rm -rf %s"%fname)
-                        os.system("rf -rf %s"%(members[0].split("/")[0]))
-                else:
-                    with tarfile.open(self.archive,"a") as tarball:
-                        tarball.add(fname,arcname=key)
-                        os.system("rm -rf %s"%fname)
-            super(_csvData,self).__setitem__(key,fname)
+            with open(fname,"wb") as csvf:
+                csvf.write(text)
+        elif not self._compressed():
+            import tarfile, io
+            print("Packing %s in %s"%(fname,self.archive))
+            self.close()
+            with tarfile.open(self.archive,"a") as tarball:
+                info = tarfile.TarInfo(fname)
+                info.size = len(text)
+                info.mtime = int(time.time())
+                tarball.addfile(info,io.BytesIO(text))
+            self._reopen()
+        else:
+            print("Packing %s in %s"%(fname,self.archive))
+            self._rewrite({key:(fname,text,np.shape(value))})
+        self._register(key,value,fname)
+    
+    def _rewrite(self,newfiles):
+        '''Rewrite a compressed tarball once, replacing or adding the given members.
+        
+        Existing members are streamed from the old archive into the new one, so nothing is extracted
+        to disk. The new archive is written next to the old one and then moved into place.
+        
+        Parameters
+        ----------
+        newfiles : dict
+            Dictionary of (member name, file contents, shape) tuples, keyed by variable name
+        '''
+        import tarfile, io
+        replaced = set([item[0] for item in newfiles.values()])
+        tmpname = self.archive+".tmp"
+        with tarfile.open(tmpname,"w:%s"%self.archive.split(".")[-1]) as newtar:
+            for name in self.files:
+                if name not in replaced:
+                    member = self.members[name]
+                    with self.tarobj.extractfile(member) as memberf:
+                        newtar.addfile(member,memberf)
+            for key in newfiles:
+                fname,text,shape = newfiles[key]
+                info = tarfile.TarInfo(fname)
+                info.size = len(text)
+                info.mtime = int(time.time())
+                newtar.addfile(info,io.BytesIO(text))
+        self.close()
+        os.replace(tmpname,self.archive)
+        self._reopen()
+    
+    @contextlib.contextmanager
+    def batch(self):
+        '''Stage several variable additions, and write them to the archive all at once on exit.
+        
+        Within the ``with`` block, assignments are held in memory (they can still be read back). On 
+        leaving the block, compressed tarballs are rewritten exactly once, no matter how many variables 
+        were added. For directories and uncompressed tarballs, which can be appended to cheaply, the 
+        staged files are simply written or appended in one pass.
+        
+        Examples
+        --------
+        >>> data = gcmt.load("MOST.00127.tar.gz")
+        >>> with data.variables.batch():
+        ...     for key in derived:
+        ...         data.variables[key] = derived[key]
+        '''
+        self.staged = {}
+        index = self._index()
+        try:
+            yield self
+            self.commit()
+        except:
+            staged = self.staged or {} #Still set if the write failed, since commit() only clears it on success
+            self.staged = None #Drop the staged variables if something went wrong,
+            self._restore(index,staged) #and forget they were ever added
+            raise
+    
+    def _index(self):
+        '''Copy of the in-memory index that :py:meth:`_register` updates, for :py:meth:`_restore`.'''
+        return (dict(self.filetree),list(self.variables),dict(self.shapes),dict(self.permanent),dict(self))
+    
+    def _restore(self,index,staged):
+        '''Put back an index saved by :py:meth:`_index`, dropping anything read from ``staged`` files.'''
+        filetree,variables,shapes,permanent,entries = index
+        self.filetree = filetree
+        self.variables = variables
+        self.shapes.clear()
+        self.shapes.update(shapes)
+        self.permanent = permanent
+        super(_csvData,self).clear()
+        super(_csvData,self).update(entries)
+        for key in staged:
+            if key in self.dbuffer:
+                del self.dbuffer[key]
+                self.dbufferkeys.remove(key)
+    
+    def commit(self):
+        '''Write any variables staged inside :py:meth:`batch` to the archive.
+        
+        The staged variables are only dropped once they have been written, so if writing fails they
+        are still there to be cleaned up (see :py:meth:`batch`).
+        '''
+        if not self.staged:
+            self.staged = None
+            return
+        staged = self.staged
+        if not self.tarball:
+            for key in staged:
+                fname,text,shape = staged[key]
+                print("Writing %8s to %s"%(key,fname))
+                with open(fname,"wb") as csvf:
+                    csvf.write(text)
+        elif not self._compressed():
+            import tarfile, io
+            self.close()
+            with tarfile.open(self.archive,"a") as tarball:
+                for key in staged:
+                    fname,text,shape = staged[key]
+                    print("Packing %s in %s"%(fname,self.archive))
+                    info = tarfile.TarInfo(fname)
+                    info.size = len(text)
+                    info.mtime = int(time.time())
+                    tarball.addfile(info,io.BytesIO(text))
+            self._reopen()
+        else:
+            print("Packing %d variables in %s"%(len(staged),self.archive))
+            self._rewrite(staged)
+        self.staged = None
+
+class _YearSlice(object):
+    '''Variables of a whole-simulation store, restricted to the records of one model year.
+    
+    Dimension variables (lat, lon, lev, etc) are passed through unchanged; everything else is sliced
+    along its leading (time) axis.
+    '''
+    STATIC = ("lat","lon","lev","levp","fharmonic","modes")
+    
+    def __init__(self,variables,start,stop):
+        self.variables = variables
+        self.start = start
+        self.stop = stop
+        
+    def __getitem__(self,key):
+        if key in self.STATIC:
+            return self.variables[key]
+        return self.variables[key][self.start:self.stop]
+    
+    def __contains__(self,key):
+        return key in self.variables
+    
+    def __iter__(self):
+        return iter(self.variables)
+    
+    def __len__(self):
+        return len(self.variables)
+    
+    def keys(self):
+        return self.variables.keys()
+    
+    def close(self):
+        self.variables.close()
 
 class _Dataset:
-    def __init__(self,filename,csvbuffersize=1):
+    def __init__(self,filename,csvbuffersize=1,year=None):
         self.body=None
         fileparts = filename.split('.')
         if fileparts[-1] == "nc":
@@ -297,6 +516,28 @@ class _Dataset:
                 except:
                     self.metadata[var]["code"] = -999
             
+        elif fileparts[-1].rstrip("/") == "npyd":
+            self.variables,meta = _loadnpydir(filename)
+            self.metadata = {}
+            for var in self.variables:
+                self.metadata[var] =  {}
+                try:
+                    self.metadata[var]["standard_name"]= meta[var][1]
+                except:
+                    self.metadata[var]["standard_name"]= var
+                try:
+                    self.metadata[var]["long_name"]= meta[var][1]
+                except:
+                    self.metadata[var]["long_name"] = var
+                try:
+                    self.metadata[var]["units"] = meta[var][2]
+                except:
+                    self.metadata[var]["units"] = "N/A"
+                try:
+                    self.metadata[var]["code"] = int(meta[var][3])
+                except:
+                    self.metadata[var]["code"] = -999
+            
         elif (fileparts[-1]=="tar" or \
                 fileparts[-2]+"."+fileparts[-1] in ("tar.gz","tar.bz2","tar.xz")):
             self.variables,self.metadata =_loadcsv(filename,buffersize=csvbuffersize)
@@ -333,6 +574,17 @@ class _Dataset:
         else:
             raise DatafileError("Unsupported output format detected. Supported formats are:\n%s"%("\n\t".join(SUPPORTED)))
         
+        if year is not None:
+            if "year" not in self.variables:
+                self.close()
+                raise DatafileError("%s does not record model years, so year %d cannot be selected."%(filename,year))
+            self.years = np.asarray(self.variables["year"][:])
+            indices = np.where(self.years==year)[0]
+            if len(indices)==0:
+                self.close()
+                raise DatafileError("Year %d not found in %s."%(year,filename))
+            self.variables = _YearSlice(self.variables,indices[0],indices[-1]+1)
+        
     def close(self):
         try:
             if self.body is not None:
@@ -1348,7 +1600,7 @@ def tlstream(dataset,plarad=6371.0e3,grav=9.80665,substellar=0.0):
     return lat_TL,psurf*lev,stf
 
 
-def load(filename,csvbuffersize=1):
+def load(filename,csvbuffersize=1,year=None):
     '''Open a postprocessed ExoPlaSim output file.
     
     Supported formats include netCDF, CSV/TXT (can be compressed), NumPy, and HDF5. If the data
@@ -1359,8 +1611,9 @@ def load(filename,csvbuffersize=1):
     `filename` ought to be "MOST_output.002.csv", even though no such file exists.
     
     When accessing a file archive comprised of CSV/TXT files such as that described above, only part
-    of the archive will be extracted/read into memory at once, with the exception of the first read,
-    when the entire archive is extracted to read header information. Dimensional arrays, such as 
+    of the archive will be read into memory at once. Tarball members are streamed directly from the
+    archive, which stays open until the dataset is closed, so nothing is extracted to disk; the first
+    read only parses each member's header line. Dimensional arrays, such as 
     latitude, longitude, etc will be ready into memory and stored as attributes of the returned
     object (but are accessed with the usual dictionary pattern). Other data arrays however may need to
     be extracted and read from the archive. A memory buffer exists to hold recently-accessed arrays
@@ -1371,6 +1624,14 @@ def load(filename,csvbuffersize=1):
     Once the variable has left the buffer, due to other variables being accessed, the next access will
     return to file access speeds. This behavior is intended to mimic the npz, netcdf, and hdf5 protocols.
     
+    Uncompressed NumPy directories (\*.npyd) are opened with ``np.load(mmap_mode='r')``, so variables
+    are returned as read-only memory-mapped arrays, and only the slices that are actually used are
+    read from disk.
+    
+    netCDF and HDF5 files that hold many model years (e.g. a Model's single whole-simulation store)
+    have a ``year`` variable along the time axis. Passing ``year`` returns a view of just that year's
+    records, which can be used exactly like a single-year output file.
+    
     Parameters
     ----------
     filename : str 
@@ -1378,6 +1639,9 @@ def load(filename,csvbuffersize=1):
     csvbuffersize : int, optional
         If the file (or group of files) is a file archive such as a directory, tarball, etc, this is
         the number of variables to keep in a memory buffer when the archive is accessed.
+    year : int, optional
+        If given, only the records for this model year are returned (the file must have a ``year``
+        variable).
         
     Returns
     -------
@@ -1391,7 +1655,7 @@ def load(filename,csvbuffersize=1):
             csvbuffersize = int(csvbuffersize)
         except:
             csvbuffersize = 1
-    output=_Dataset(filename,csvbuffersize=csvbuffersize) #Usually _Dataset calls load(), but _Dataset calls _loadnetcdf
+    output=_Dataset(filename,csvbuffersize=csvbuffersize,year=year) #Usually _Dataset calls load(), but _Dataset calls _loadnetcdf
                                   #directly, so here we're going to defer to _Dataset and make use
                                   #of the close() functionality
     #elif fileparts[-1] == "npz" or fileparts[-1] == "npy":
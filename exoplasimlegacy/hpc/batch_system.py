@@ -4,4 +4,5 @@
 
 #Select a batch submission system (ONLY UNCOMMENT ONE)
 from torque import *
-#from slurm import *
\ No newline at end of file
+#from slurm import *
+#from local import *      #Runs jobs on this machine, for workstations or a single node
\ No newline at end of file
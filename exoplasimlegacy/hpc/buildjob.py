@@ -1,6 +1,7 @@
 import os
 import numpy as np
 import time
+import schedulerstatus
 from batch_system import SUB, BATCHSCRIPT
 
 # Options:
@@ -134,6 +135,7 @@ def prep(job):
   os.system("rm plasim/job"+jid+"/plasim_restart")
   os.system("cp plasim/"+scriptfile+" plasim/job"+jid+"/")
   os.system("cp plasim/synthoutput.py plasim/job"+jid+"/")
+  os.system("cp plasim/history.py plasim/job"+jid+"/")
   os.system("cp crawldefs.py plasim/job"+jid+"/")
   os.system("cp identity.py plasim/job"+jid+"/")
   
@@ -646,7 +648,5 @@ def prep(job):
   rs.close()
   
 def submit(job):
-  os.system("cd plasim/job"+str(job.home)+" && "+SUB+" runplasim && cd "+job.top)
-  time.sleep(1.0)
-  tag = job.getID()
+  job.tag = schedulerstatus.cache().submit("runplasim",job.name,cwd="plasim/job"+str(job.home)) #ID comes from the submission output
   job.write()
\ No newline at end of file
@@ -1,7 +1,9 @@
 import os
 import numpy as np
 import time
-from batch_system import SUB, BATCHSCRIPT
+import copy
+import schedulerstatus
+from batch_system import SUB, SCRATCH, BATCHSCRIPT, ARRAYSCRIPT, SUBARRAY, ARRAYINDEX, MAXARRAY, arraytag
 from identity import USER
 import glob
 
@@ -156,6 +158,10 @@ def prep(job):
   os.system("cp "+scriptfile+" "+workdir+"/")
   print(("cp synthoutput.py "+workdir+"/"))
   os.system("cp synthoutput.py "+workdir+"/")
+  print(("cp stage.py "+workdir+"/"))
+  os.system("cp stage.py "+workdir+"/")
+  print(("cp history.py "+workdir+"/"))
+  os.system("cp history.py "+workdir+"/")
   print(("cp jobdefs.py "+workdir+"/"))
   os.system("cp jobdefs.py "+workdir+"/")
   print(("cp identity.py "+workdir+"/"))
@@ -649,43 +655,105 @@ def prep(job):
       histargs = str(nrunyears)
   
   # You may have to change this part
-  jobscript =(BATCHSCRIPT(job,notify)+
-              "rm keepgoing                                                     \n"+
-              "mkdir /mnt/node_scratch/"+USER+"/"+home+"            \n")
+  # The run itself goes in runtask, so that it can be run either by runplasim (its own batch job)
+  # or as one member of a job array (see submitarray). If RESUBMIT is set, it is the command that
+  # resubmits this task; array members use it to resubmit only their own index.
+  # Only new and changed files are moved to and from scratch (see stage.py).
+  # A task from a task database is renewed each time one of its jobs starts or resubmits itself,
+  # and marked done or failed when the run stops without asking to keep going: failed if it left
+  # no output.
+  scratch = SCRATCH+"/"+home
+  queued = getattr(job,"queuefile",None)
+  jobscript =("#!/bin/bash                                                      \n"+
+              "WORKDIR=$(pwd)                                                   \n"+
+              "rm -f keepgoing                                                  \n")
+  if queued:
+      jobscript += ("python "+job.top+"/taskqueue.py renew "+job.name+" "+job.queuefile+"   \n")
+  jobscript +=("python stage.py in $WORKDIR "+scratch+"                          \n"+
+              "cd "+scratch+"                                                   \n")
   if nsn:
-      jobscript+=("mkdir /mnt/node_scratch/"+USER+"/"+home+"/snapshots         \n"+
-                  "tar cvzf stuff.tar.gz --exclude='*_OUT*' --exclude='*_REST*' --exclude='*.nc' --exclude='snapshots/' ./* \n")
-  jobscript +=("rsync -avzhur stuff.tar.gz /mnt/node_scratch/"+USER+"/"+home+"/         \n"+
-              "rm -rf stuff.tar.gz                     \n"+
-              "cd /mnt/node_scratch/"+USER+"/"+home+"/              \n"+
-              "tar xvzf stuff.tar.gz                   \n"+
-              "rm stuff.tar.gz          \n"+
-              "./"+scriptfile+" "+str(job.ncores)+" "+str(nlevs)+" "+histargs+"   \n"+
-              "tar cvzf stuff.tar.gz *                                          \n"+
-              "rsync -avzhur stuff.tar.gz $PBS_O_WORKDIR/                                          \n"+
-              "rm -rf *                                                         \n"+
-              "cd $PBS_O_WORKDIR                                                \n"+
-              "tar xvzf stuff.tar.gz                                \n"+
-              "rm stuff.tar.gz          \n"+
+      jobscript+=("mkdir -p snapshots                                               \n")
+  jobscript +=("./"+scriptfile+" "+str(job.ncores)+" "+str(nlevs)+" "+histargs+"   \n"+
+              "cd $WORKDIR                                                      \n"+
+              "python stage.py out "+scratch+" $WORKDIR                         \n"+
               "if [ -e keepgoing ]                                              \n"+
-              "then                                                            \n"+
-              "      qsub runplasim                                             \n"+
-              "else        \n")
+              "then                                                            \n")
+  if queued:
+      jobscript += ("      python "+job.top+"/taskqueue.py renew "+job.name+" "+job.queuefile+"   \n")
+  jobscript +=("      if [ -n \"$RESUBMIT\" ]; then eval \"$RESUBMIT\"; else "+SUB+" runplasim; fi \n"+
+               "else        \n")
   #if keeprs:
       #jobscript+= "cp plasim_restart ../output/"+job.name+"_restart            \n"
   #if monitor:
       #jobscript+= "python monitor_balance.py                                   \n"
       
-  jobscript += ("   python synthoutput.py MOST 1                                      \n"+
-                "fi \n")
+  if queued:
+      jobscript += ("   python stage.py clean "+scratch+"                                \n"+
+                    "   if ls MOST.*.nc >/dev/null 2>&1                                  \n"+
+                    "   then                                                             \n"+
+                    "      python synthoutput.py MOST 1                                  \n"+
+                    "      python "+job.top+"/taskqueue.py complete "+job.name+" "+job.queuefile+"   \n"+
+                    "   else                                                             \n"+
+                    "      python "+job.top+"/taskqueue.py fail "+job.name+" \"No model output\" "+job.queuefile+"   \n"+
+                    "   fi                                                               \n")
+  else:
+      jobscript += ("   python synthoutput.py MOST 1                                      \n"+
+                    "   python stage.py clean "+scratch+"                                \n")
+  jobscript += "fi \n"
   
-  rs = open(workdir+"/runplasim","w")
+  rs = open(workdir+"/runtask","w")
   rs.write(jobscript)
   rs.close()
   
+  rs = open(workdir+"/runplasim","w")
+  rs.write(BATCHSCRIPT(job,notify)+
+           "bash runtask                                                     \n")
+  rs.close()
+  
 def submit(job):
+  job.tag = schedulerstatus.cache().submit("runplasim",job.name,cwd=job.home) #ID comes from the submission output
+  job.write()
+
+def submitarray(jobs,arrayname,notify='ae'):
+  '''Submit prepared jobs (which must share ncores and queue) as one job array.
+
+  Array index n runs jobs[n]: the array script looks up the task's directory in the task table
+  arrays/ARRAYNAME.tasks (one line per index, with the task's parameters), and runs its runtask
+  there. A member that needs to keep going resubmits only its own index. Arrays larger than
+  MAXARRAY are split into several arrays.
+  '''
+  os.system("mkdir -p arrays")
+  top = os.getcwd()
+  for start in range(0,len(jobs),MAXARRAY):
+    members = jobs[start:start+MAXARRAY]
+    name = arrayname
+    if len(jobs)>MAXARRAY:
+      name = "%s_%d"%(arrayname,start//MAXARRAY)
+    table = "arrays/"+name+".tasks"
+    script = "arrays/"+name+".sh"
+    
+    tf = open(table,"w")
+    tf.write("# INDEX JOBNAME HOME NCORES QUEUE PARAMETERS\n")
+    for n in range(len(members)):
+      job = members[n]
+      tf.write(' '.join([str(n),job.name,job.home,str(job.ncores),job.queue]+
+                        [field+"="+job.parameters[field] for field in job.fields])+'\n')
+    tf.close()
+    
+    arrayjob = copy.copy(members[0])
+    arrayjob.name = name
+    indices = "0-%d"%(len(members)-1)
+    resubmit = "cd "+top+" && "+' '.join(SUBARRAY(script,ARRAYINDEX))
+    sf = open(script,"w")
+    sf.write(ARRAYSCRIPT(arrayjob,notify,indices)+
+             "cd "+top+"                                                       \n"+
+             "TASKHOME=$(awk -v i="+ARRAYINDEX+" '$1==i {print $3}' "+table+")  \n"+
+             "export RESUBMIT=\""+resubmit+"\"                                  \n"+
+             "cd $TASKHOME                                                     \n"+
+             "bash runtask                                                     \n")
+    sf.close()
     
-  os.system("cd "+job.home+" && "+SUB+" runplasim && cd "+job.top)
-  time.sleep(1.0)
-  tag = job.getID()
-  job.write()
\ No newline at end of file
+    tag = schedulerstatus.cache().submit(script,name,command=SUBARRAY(script,indices))
+    for n in range(len(members)):
+      members[n].tag = arraytag(tag,n) if tag else None
+      members[n].write()
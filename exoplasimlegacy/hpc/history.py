@@ -0,0 +1,176 @@
+'''
+Global means of model output, reduced once per file and kept in an appendable history.
+
+super_relax.py checks energy balance after every model year, and synthoutput.py summarizes a whole
+run; both used to re-open every netCDF file and re-sum every month with a loop over grid cells on
+each check. Here, area weights are computed once per grid and applied to all months of a variable
+at once, and a History remembers the annual mean of each file it has seen, so that each check only
+reads the newest year.
+
+A History can be kept in a file, one line per netCDF file, which is appended to. Each line records
+the file's size and modification time too, and a file that has changed since (e.g. a year that was
+rewritten after a crash) is read again. Asking for variables the file does not track yet adds them
+to it, keeping the records already there; those files are read again once, for the new variables:
+
+    history = History("MOST_history.dat",["ts","hfns","ntr"])
+    history.update(sorted(glob.glob("MOST.*.nc")))   # Reads only files new or changed since last time
+    ts = history.values("ts")
+'''
+import os
+import numpy as np
+import netCDF4 as nc
+
+_weights = {} #Area weights, keyed by grid
+
+UNKNOWN = "?" #Written in a history file for a variable a record was made without
+
+def areaweights(lt,ln):
+    '''Relative area of each cell of a latitude-longitude grid (the same cell edges as spatialmath).'''
+    key = (np.asarray(lt,dtype=float).tobytes(),np.asarray(ln,dtype=float).tobytes())
+    if key not in _weights:
+        lt1 = np.zeros(len(lt)+1)
+        lt1[0] = 90
+        lt1[1:-1] = 0.5*(lt[:-1]+lt[1:])
+        lt1[-1] = -90
+        ln1 = np.zeros(len(ln)+1)
+        ln1[0] = -2.8125
+        ln1[1:-1] = 0.5*(ln[:-1]+ln[1:])
+        ln1[-1] = 360.0-2.8125
+        lt1*=np.pi/180.0
+        ln1*=np.pi/180.0
+        _weights[key] = (np.sin(lt1[:-1])-np.sin(lt1[1:]))[:,np.newaxis]*np.diff(ln1)[np.newaxis,:]
+    return _weights[key]
+
+def _stamp(name):
+    stat = os.stat(name)
+    return [stat.st_size,stat.st_mtime_ns]
+
+def spatialmath(lt,ln,variable,mean=True,radius=6.371e6):
+    '''Area-weighted global mean (or total, if mean is False) of a variable.
+
+    The last two axes of variable are latitude and longitude; any leading axes (e.g. time) are
+    kept, so a whole year of months is reduced in one call.
+    '''
+    darea = areaweights(lt,ln)
+    svar = (variable*darea).sum(axis=(-2,-1))
+    if mean:
+        return svar/np.sum(darea)
+    return svar * radius**2
+
+def annualmean(ncd,key,mean=True,radius=6.371e6):
+    '''Time mean of the global mean of a variable in an open netCDF file (the lowest level of 3D variables).'''
+    variable = ncd.variables[key][:]
+    if len(variable.shape)>3:
+        variable = variable[:,-1,:,:]
+    return float(np.mean(spatialmath(ncd.variables['lat'][:],ncd.variables['lon'][:],variable,
+                                     mean=mean,radius=radius)))
+
+class History:
+    '''Annual global means of some variables, one record per netCDF file.
+
+    Parameters
+    ----------
+    filename : str, optional
+        File to keep the history in, so that later processes can pick it up. If None, the history
+        is only kept in memory.
+    keys : list
+        netCDF variables to track.
+    mean : bool, optional
+        Track global means (True) or global totals (False).
+    radius : float, optional
+        Planet radius in meters, for totals.
+    missing : float, optional
+        Value recorded for a variable a file does not have.
+
+    If the history file already tracks other variables as well, they are kept and tracked too.
+    '''
+    def __init__(self,filename=None,keys=["ts"],mean=True,radius=6.371e6,missing=np.nan):
+        self.filename = filename
+        self.keys = list(keys)
+        self.mean = mean
+        self.radius = radius
+        self.missing = missing
+        self.records = {} #netCDF file: values of keys (None where not read yet)
+        self.stamps = {}  #netCDF file: [size, modification time in ns] when it was read
+        self.order = []   #netCDF files, in the order they were added
+        self.written = None #Variables in the history file's header
+        if filename is not None and os.path.exists(filename):
+            with open(filename,"r") as historyf:
+                header = historyf.readline().split()[2:]
+                if header[:2]==["SIZE","MTIME"]:
+                    self.written = header[2:]
+                    self.keys = self.written+[key for key in self.keys if key not in self.written]
+                    for line in historyf:
+                        words = line.split()
+                        if len(words)!=len(header)+1:
+                            continue #A line cut short by a crash
+                        self._add(words[0],[int(words[1]),int(words[2])],
+                                  [None if word==UNKNOWN else float(word) for word in words[3:]])
+            if self.written is None: #Not a history file we can read, so start over
+                os.remove(filename)
+
+    def addkeys(self,keys):
+        '''Start tracking more variables, keeping the records already made.
+
+        Files already in the history are read again for the new variables the next time they are
+        passed to :py:meth:`update`.
+        '''
+        for key in keys:
+            if key not in self.keys:
+                self.keys.append(key)
+
+    def _add(self,name,stamp,values):
+        if name not in self.records:
+            self.order.append(name)
+        self.stamps[name] = stamp
+        self.records[name] = values
+
+    def _record(self,name):
+        '''A record's values for every tracked variable, None for those not read yet.'''
+        values = self.records[name]
+        return values+[None]*(len(self.keys)-len(values))
+
+    def _line(self,name):
+        return ' '.join([name]+[str(n) for n in self.stamps[name]]+
+                        [UNKNOWN if value is None else repr(value) for value in self._record(name)])+'\n'
+
+    def update(self,files):
+        '''Add every file not in the history, or changed since it was read. Returns the files that were read.'''
+        new = [name for name in files if name not in self.records or self.stamps[name]!=_stamp(name)
+               or None in self._record(name)]
+        lines = []
+        for name in new:
+            stamp = _stamp(name)
+            ncd = nc.Dataset(name,"r")
+            values = []
+            for key in self.keys:
+                if key in ncd.variables:
+                    values.append(annualmean(ncd,key,mean=self.mean,radius=self.radius))
+                else:
+                    values.append(self.missing)
+            ncd.close()
+            self._add(name,stamp,values)
+            lines.append(self._line(name))
+        if self.filename is not None and self.written is not None and self.written!=self.keys:
+            #The header needs the new variables, so write the whole history out again
+            tmpname = self.filename+".tmp"
+            with open(tmpname,"w") as historyf:
+                historyf.write("# FILE SIZE MTIME "+' '.join(self.keys)+'\n')
+                historyf.writelines([self._line(name) for name in self.order])
+            os.replace(tmpname,self.filename)
+            self.written = list(self.keys)
+        elif self.filename is not None and len(lines)>0:
+            header = not os.path.exists(self.filename)
+            with open(self.filename,"a") as historyf:
+                if header:
+                    historyf.write("# FILE SIZE MTIME "+' '.join(self.keys)+'\n')
+                historyf.writelines(lines)
+            self.written = list(self.keys)
+        return new
+
+    def values(self,key,files=None):
+        '''Annual means of one variable, for the given files (default: all, in the order added).'''
+        if files is None:
+            files = self.order
+        index = self.keys.index(key)
+        return np.array([self._record(name)[index] for name in files],dtype=float)
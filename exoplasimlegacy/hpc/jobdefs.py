@@ -1,5 +1,6 @@
 import os
 import numpy as np
+import schedulerstatus
 from identity import *
 
 class Job:
@@ -24,19 +25,10 @@ class Job:
     self.jobname = self.name+".cl"
     
   def getID(self):
-    os.system("qstat -u "+USER+" > cjobs.tmp")
-    jf = open("cjobs.tmp","r")
-    jlist = jf.read().split('\n')[5:-1]
-    jf.close()
-    os.system("rm cjobs.tmp")
-    tag = None
-    if len(jlist)>0:
-      for j in jlist:
-        job = j.split()
-        name = job[3]
-        if name==self.jobname:
-          tag = job[0]
-          break
+    status = schedulerstatus.cache() #One scheduler query per polling interval, however many jobs ask
+    tag = status.lookup(self.name)
+    if tag is None:
+      tag = status.lookup(self.jobname)
     self.tag = tag
     return tag
 
@@ -1,11 +1,12 @@
 import os
 import glob
+import time
 import launchset
+import taskqueue
 import sys
 import numpy as np
 from jobdefs import *
 from batch_system import *
-from sets import Set
 
 
 if __name__=="__main__":    
@@ -43,10 +44,50 @@ if __name__=="__main__":
     #rf.close()
 
   njobs=0
+  
+  #With 'array', tasks are set up as usual but then submitted together as job arrays (one
+  #scheduler submission per array instead of one per task).
+  usearray = ("array" in sys.argv[:])
+  arrayjobs = []
+  
+  #With a task database (created by passing 'sqlite', or already present), tasks are claimed
+  #atomically from it instead of from tasks.crwl, whose new tasks are queued on each launch.
+  usequeue = ("sqlite" in sys.argv[:] or os.path.exists(taskqueue.QUEUEFILE))
+  if usequeue:
+    queue = taskqueue.TaskQueue(taskqueue.QUEUEFILE)
+    if os.path.exists("tasks.crwl"):
+      print("Queued %d new tasks from tasks.crwl"%queue.importcrwl("tasks.crwl"))
+  while usequeue:
+    print("Getting job....")
+    claimed = queue.claim(walltime=WALLTIME) #Tasks whose jobs died unannounced go back in the queue
+    if claimed is None:
+      print("We have run out of jobs")
+      break
+    taskname,header,args = claimed
+    print("Creating a Job with header\n",header,"\n and arguments \n",args)
+    newjob = Job(header,args,-1)
+    newjob.home = taskname
+    newjob.queuefile = os.path.abspath(queue.filename) #So the job script can mark the task done
+    try:
+      launchset.newtask(newjob,dryrun=(dryrun or usearray))
+    except Exception as e:
+      print("Task "+taskname+" could not be launched: "+queue.fail(taskname,repr(e)))
+      continue
+    np.save(newjob.home+'/job.npy',newjob)
+    njobs+=1
+    if usearray:
+        arrayjobs.append(newjob) #Submitted together once every task is set up
+        continue
+    if not dryrun:
+        newjob.getID()
+    else:
+        newjob.tag='xxxxx.doug'
+    newjob.write()
+  
   #print "Moving on to normal tasks"
   #print running,nnodes
   capacityflag = False
-  openjobs=True
+  openjobs=not usequeue
   while openjobs: #We are using less than our full allocation, and the priority list is empty.
     
     #Get next task
@@ -112,21 +153,26 @@ if __name__=="__main__":
       task = ' '.join(task)
       tasks[mark] = task
       tasks='\n'.join(tasks)
-      if not Set(task).issubset(Set(" \n")): #Make sure we have something to write!
+      if not set(task).issubset(set(" \n")): #Make sure we have something to write!
           f=open("tasks.crwl","w")
           f.write(tasks)
           f.close()
       
-      launchset.newtask(newjob,dryrun=dryrun)            #Set up the job and submit it
+      launchset.newtask(newjob,dryrun=(dryrun or usearray)) #Set up the job and submit it
       np.save(newjob.home+'/job.npy',newjob)
+      njobs+=1
+      if usearray:
+          arrayjobs.append(newjob)
+          continue
       if not dryrun:
           newjob.getID()
       else:
           newjob.tag='xxxxx.doug'
       newjob.write()
       
-      njobs+=1
-      
+    
+  if usearray and len(arrayjobs)>0:
+    launchset.newarrays(arrayjobs,"sweep%d"%int(time.time()),dryrun=dryrun)
     
   #folders = []
   ##print MODELS.keys()
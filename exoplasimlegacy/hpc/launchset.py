@@ -1,11 +1,11 @@
 import os
 import time
+import importlib
 
 def newtask(job,dryrun=False):
   workdir  = job.home+"/"
   
-  modelroutines = "import build"+job.model+"job as setjob"
-  exec(modelroutines)
+  setjob = importlib.import_module("build"+job.model+"job")
   
   #Create the working directory if it doesn't already exist, and clean it if necessary
   try:
@@ -23,4 +23,25 @@ def newtask(job,dryrun=False):
   
   setjob.prep(job)
   if not dryrun:
-    setjob.submit(job)
\ No newline at end of file
+    setjob.submit(job)
+
+def newarrays(jobs,arrayname,dryrun=False):
+  '''Submit jobs already set up by newtask(job,dryrun=True) as job arrays, one per model, core
+  count, and queue (array members must all request the same resources).'''
+  groups = {}
+  for job in jobs:
+    groups.setdefault((job.model,job.ncores,job.queue),[]).append(job)
+  n=0
+  for model,ncores,queue in sorted(groups.keys()):
+    group = groups[(model,ncores,queue)]
+    setjob = importlib.import_module("build"+model+"job")
+    name = arrayname
+    if len(groups)>1:
+      name = "%s_%d"%(arrayname,n)
+    n+=1
+    if dryrun:
+      for job in group:
+        job.tag = 'xxxxx.doug'
+        job.write()
+    else:
+      setjob.submitarray(group,name)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+'''
+Local "batch system", for running the crawler on a workstation or a single large node.
+
+Provides the same interface as torque.py and slurm.py (SUB, BATCHSCRIPT, getjobs, and the rest);
+select it in batch_system.py. Job scripts run as subprocesses of this machine, at most MAXJOBS at
+a time and using at most MAXCORES cores between them (a job's cores are read from its #LOCAL
+--ncores line). Jobs wait in a queue until they fit. There is no daemon: each submission, and each
+job as it ends, starts whatever queued jobs now fit. Job states (queued, running, done, failed,
+cancelled) are kept in an SQLite database in LOCALDIR, shared by every process on the machine.
+
+SUB is this file, so job scripts (e.g. a runplasim that needs to keep going) submit with it just
+as they would with qsub:
+
+    local.py SCRIPT                   Submit a job script from the current directory
+    local.py --array=0-9 SCRIPT       Submit indices 0-9 of a job array
+    local.py status                   List queued and running jobs (ID, name, state)
+    local.py history                  List every job, with its exit code
+    local.py cancel ID                Cancel a job (or every member of an array)
+    local.py wait                     Wait until nothing is queued or running
+
+The limits default to every core on the machine, and can be set with EXOPLASIM_LOCAL_CORES and
+EXOPLASIM_LOCAL_JOBS; the database lives in EXOPLASIM_LOCALDIR (default ~/.plasimlocal).
+'''
+import os
+import re
+import sys
+import time
+import signal
+import sqlite3
+import getpass
+import subprocess
+import numpy as np
+
+SUB = os.path.abspath(__file__)
+
+STATUS = [SUB,"status"]
+
+USER = getpass.getuser()
+
+LOCALDIR = os.environ.get("EXOPLASIM_LOCALDIR",os.path.join(os.path.expanduser("~"),".plasimlocal"))
+
+MAXCORES = int(os.environ.get("EXOPLASIM_LOCAL_CORES",os.cpu_count() or 1))
+
+MAXJOBS = int(os.environ.get("EXOPLASIM_LOCAL_JOBS",MAXCORES))
+
+SCRATCH = os.path.join(os.environ.get("TMPDIR","/tmp"),"plasim-"+USER) #Stands in for node-local scratch
+
+WALLTIME = None #Local jobs have no time limit
+
+ARRAYINDEX = "$LOCAL_ARRAY_TASK_ID"
+
+MAXARRAY = 100000
+
+ACTIVE = ["queued","running"]
+
+def BATCHSCRIPT(job,notify):
+    return _BATCHSCRIPT%(job.name,job.ncores)
+
+_BATCHSCRIPT = ("#!/bin/bash                                                      \n"+
+                "#LOCAL --job-name=%s                                           \n"+
+                "#LOCAL --ncores=%d                                             \n")
+
+def ARRAYSCRIPT(job,notify,indices):
+    '''Header for a job array: BATCHSCRIPT with an --array directive (e.g. indices="0-99").'''
+    header = BATCHSCRIPT(job,notify).split('\n',1)
+    return header[0]+"\n#LOCAL --array=%s\n"%indices+header[1]
+
+def SUBARRAY(script,indices):
+    '''Command to submit some indices of a job array.'''
+    return [SUB,"--array=%s"%indices,script]
+
+def arraytag(tag,index):
+    '''ID of one member of a job array.'''
+    return "%s_%d"%(tag,index)
+
+def parsesubmit(text):
+    '''Job ID from the output of a submission ("Submitted batch job 12"), or None if it failed.'''
+    match = re.search(r"^Submitted batch job (\d+)",text,re.MULTILINE)
+    if match is None:
+        return None
+    return match.group(1)
+
+def parsestatus(text):
+    '''Map each job name to its (ID, state), from the output of STATUS.'''
+    jobs = {}
+    for line in text.split('\n'):
+        words = line.split()
+        if len(words)>=3:
+            jobs[words[1]] = (words[0],words[2])
+    return jobs
+
+MODELS = {"plasim":1}
+
+def _connect():
+    os.makedirs(LOCALDIR,exist_ok=True)
+    db = sqlite3.connect(os.path.join(LOCALDIR,"jobs.db"),timeout=120.0,isolation_level=None)
+    db.execute("PRAGMA journal_mode=DELETE")
+    db.execute("CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, array INTEGER, arrayindex INTEGER, "+
+               "name TEXT, script TEXT NOT NULL, cwd TEXT NOT NULL, ncores INTEGER NOT NULL, "+
+               "state TEXT NOT NULL DEFAULT 'queued', pid INTEGER, submitted REAL, started REAL, "+
+               "finished REAL, returncode INTEGER)")
+    return db
+
+def _tag(row):
+    '''Job ID as shown to the user: "12", or "12_3" for index 3 of array 12.'''
+    jobid,array,arrayindex = row
+    if array is None:
+        return str(jobid)
+    return arraytag(array,arrayindex)
+
+def _directives(script):
+    '''Job name, cores, and array indices from a script's #LOCAL lines.'''
+    name = os.path.basename(script)
+    ncores = 1
+    indices = None
+    with open(script,"r") as scriptf:
+        for line in scriptf:
+            words = line.split()
+            if len(words)<2 or words[0]!="#LOCAL":
+                continue
+            key,value = (words[1].split("=",1)+[''])[:2]
+            if key=="--job-name":
+                name = value
+            elif key=="--ncores":
+                ncores = int(value)
+            elif key=="--array":
+                indices = value
+    return name,ncores,indices
+
+def _indices(text):
+    '''Expand "0-3,7" into [0,1,2,3,7].'''
+    indices = []
+    for part in text.split(","):
+        bounds = part.split("-")
+        indices += list(range(int(bounds[0]),int(bounds[-1])+1))
+    return indices
+
+def _alive(pid):
+    try:
+        os.kill(pid,0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def submit(script,cwd=None,array=None):
+    '''Queue a job script (or the given indices of a job array), and start whatever now fits.
+
+    Returns the job ID (for an array, the array's ID).
+    '''
+    cwd = os.path.abspath(cwd or os.getcwd())
+    script = os.path.join(cwd,script)
+    name,ncores,indices = _directives(script)
+    if array is not None:
+        indices = array
+    db = _connect()
+    db.execute("BEGIN IMMEDIATE")
+    now = time.time()
+    if indices is None:
+        cursor = db.execute("INSERT INTO jobs (name,script,cwd,ncores,submitted) VALUES (?,?,?,?,?)",
+                            (name,script,cwd,ncores,now))
+        tag = cursor.lastrowid
+    else:
+        tag = None
+        for index in _indices(indices):
+            cursor = db.execute("INSERT INTO jobs (name,script,cwd,ncores,submitted,arrayindex) VALUES (?,?,?,?,?,?)",
+                                (name,script,cwd,ncores,now,index))
+            if tag is None:
+                tag = cursor.lastrowid #The array takes the ID of its first member
+            db.execute("UPDATE jobs SET array=? WHERE id=?",(tag,cursor.lastrowid))
+    db.execute("COMMIT")
+    dispatch(db)
+    db.close()
+    return tag
+
+def dispatch(db=None):
+    '''Start queued jobs, in submission order, while they fit within MAXJOBS and MAXCORES.
+
+    Jobs whose process has disappeared without recording how it ended are marked failed first.
+    A job asking for more than MAXCORES cores runs once nothing else is running.
+    '''
+    close = db is None
+    if close:
+        db = _connect()
+    db.execute("BEGIN IMMEDIATE")
+    starting = []
+    try:
+        for jobid,pid in db.execute("SELECT id,pid FROM jobs WHERE state='running'").fetchall():
+            if pid is not None and not _alive(pid):
+                db.execute("UPDATE jobs SET state='failed', finished=? WHERE id=?",(time.time(),jobid))
+        running,cores = db.execute("SELECT COUNT(*),COALESCE(SUM(ncores),0) FROM jobs WHERE state='running'").fetchone()
+        for jobid,ncores in db.execute("SELECT id,ncores FROM jobs WHERE state='queued' ORDER BY id").fetchall():
+            if running>=MAXJOBS or (running>0 and cores+ncores>MAXCORES):
+                break #Strictly in order, so big jobs aren't starved by small ones
+            db.execute("UPDATE jobs SET state='running', started=? WHERE id=?",(time.time(),jobid))
+            running += 1
+            cores += ncores
+            starting.append(jobid)
+        for jobid in starting:
+            runner = subprocess.Popen([sys.executable,SUB,"run",str(jobid)],start_new_session=True,
+                                      stdin=subprocess.DEVNULL,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+            db.execute("UPDATE jobs SET pid=? WHERE id=?",(runner.pid,jobid))
+        db.execute("COMMIT")
+    except:
+        db.execute("ROLLBACK")
+        raise
+    if close:
+        db.close()
+    return len(starting)
+
+def run(jobid):
+    '''Run a job that dispatch() has started (in its own session), and record how it ended.'''
+    db = _connect()
+    row = db.execute("SELECT script,cwd,ncores,array,arrayindex FROM jobs WHERE id=?",(jobid,)).fetchone()
+    script,cwd,ncores,array,arrayindex = row
+    tag = _tag((jobid,array,arrayindex))
+    environment = dict(os.environ)
+    environment["LOCAL_JOB_ID"] = tag
+    environment["LOCAL_NCORES"] = str(ncores)
+    environment["LOCAL_SUBMIT_DIR"] = cwd
+    if array is not None:
+        environment["LOCAL_ARRAY_TASK_ID"] = str(arrayindex)
+    name = os.path.basename(script)
+    with open(os.path.join(cwd,"%s.o%s"%(name,tag)),"w") as out, open(os.path.join(cwd,"%s.e%s"%(name,tag)),"w") as err:
+        returncode = subprocess.call(["bash",script],cwd=cwd,env=environment,stdin=subprocess.DEVNULL,
+                                     stdout=out,stderr=err)
+    db.execute("BEGIN IMMEDIATE")
+    db.execute("UPDATE jobs SET state=?, finished=?, returncode=? WHERE id=? AND state='running'",
+               ("done" if returncode==0 else "failed",time.time(),returncode,jobid))
+    db.execute("COMMIT")
+    dispatch(db)
+    db.close()
+
+def cancel(tag):
+    '''Cancel a job by ID ("12", "12_3"), or every member of an array by the array's ID.'''
+    db = _connect()
+    db.execute("BEGIN IMMEDIATE")
+    rows = db.execute("SELECT id,array,arrayindex,state,pid FROM jobs WHERE state IN ('queued','running')").fetchall()
+    cancelled = 0
+    for jobid,array,arrayindex,state,pid in rows:
+        if tag not in (_tag((jobid,array,arrayindex)),str(array)):
+            continue
+        if state=="running" and pid is not None and _alive(pid):
+            os.killpg(pid,signal.SIGTERM) #The runner leads its own session, so this takes the whole job
+        db.execute("UPDATE jobs SET state='cancelled', finished=? WHERE id=?",(time.time(),jobid))
+        cancelled += 1
+    db.execute("COMMIT")
+    dispatch(db)
+    db.close()
+    return cancelled
+
+def jobs(states=ACTIVE):
+    '''(ID, name, state, cwd, ncores, returncode) for every job in the given states, in submission order.'''
+    db = _connect()
+    rows = db.execute("SELECT id,array,arrayindex,name,state,cwd,ncores,returncode FROM jobs WHERE state IN (%s) ORDER BY id"%
+                      ','.join(['?']*len(states)),list(states)).fetchall()
+    db.close()
+    return [(_tag(row[:3]),)+tuple(row[3:]) for row in rows]
+
+def wait(poll=1.0):
+    '''Block until nothing is queued or running.'''
+    while len(jobs())>0:
+        dispatch() #In case a runner was killed before it could start the next job
+        time.sleep(poll)
+
+def getjobs():
+    print("Checking jobs")
+    resources={}
+    for m in list(MODELS.keys()):
+        resources[m] = np.zeros(256)
+    for tag,name,state,workdir,ncpus,returncode in jobs():
+        print("Looking up job "+tag)
+        try:
+            job = np.load(workdir+"/job.npy",allow_pickle=True).item()
+        except:
+            continue
+        jid = job.home
+        if jid>=len(resources[job.model]):
+            tmp = np.zeros(jid+100)
+            tmp[:len(resources[job.model])] = resources[job.model][:]
+            resources[job.model] = tmp
+        resources[job.model][jid] = float(ncpus)/8.0#MODELS[job.model]
+
+    return resources
+
+if __name__=="__main__":
+    command = sys.argv[1:]
+    if len(command)==0:
+        print(__doc__)
+    elif command[0]=="run":
+        run(int(command[1]))
+    elif command[0]=="status":
+        for tag,name,state,workdir,ncpus,returncode in jobs():
+            print("%s %s %s"%(tag,name,state.upper()))
+    elif command[0]=="history":
+        for tag,name,state,workdir,ncpus,returncode in jobs(ACTIVE+["done","failed","cancelled"]):
+            print("%-10s %-20s %-10s %4s  %s"%(tag,name,state,"" if returncode is None else returncode,workdir))
+    elif command[0]=="cancel":
+        print("Cancelled %d jobs"%cancel(command[1]))
+    elif command[0]=="wait":
+        wait()
+    else:
+        array = None
+        if command[0].startswith("--array="):
+            array = command.pop(0).split("=",1)[1]
+        print("Submitted batch job %s"%submit(command[0],array=array))
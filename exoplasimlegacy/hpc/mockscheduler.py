@@ -0,0 +1,85 @@
+'''
+A stand-in for SLURM or Torque, for testing the crawler without a cluster.
+
+A MockScheduler answers the same commands as the real scheduler (sbatch/squeue/scancel or
+qsub/qstat/qdel), in the same output formats, and counts how often each one is called. Pass it as
+the ``runner`` of a ``schedulerstatus.StatusCache``::
+
+    import slurm, schedulerstatus, mockscheduler
+    scheduler = mockscheduler.MockScheduler("slurm")
+    status = schedulerstatus.StatusCache(runner=scheduler,backend=slurm)
+    tag = status.submit("runplasim","myjob")
+    scheduler.advance()   # pending jobs start running
+    scheduler.finish(tag) # and this one ends
+
+Job names are read from the script's --job-name / -N line if the script exists, and otherwise
+default to the script's name.
+'''
+import os
+
+_STATES = {"slurm" :{"queued":"PENDING","running":"RUNNING"},
+           "torque":{"queued":"Q"      ,"running":"R"      }}
+
+class MockScheduler:
+    '''An in-memory batch scheduler.
+
+    Parameters
+    ----------
+    style : str, optional
+        "slurm" or "torque": which commands to answer, and in which format.
+    user : str, optional
+        User name to show in job listings.
+    '''
+    def __init__(self,style="slurm",user="user"):
+        self.style = style
+        self.user = user
+        self.jobs = [] #[ID, name, state], in submission order
+        self.nextid = 1000
+        self.calls = {}
+
+    def _jobname(self,script,cwd):
+        path = os.path.join(cwd or ".",script)
+        if os.path.exists(path):
+            with open(path,"r") as scriptf:
+                for line in scriptf:
+                    words = line.split()
+                    if len(words)>=2 and words[0]=="#PBS" and words[1]=="-N":
+                        return words[2]
+                    if len(words)>=2 and words[0]=="#SBATCH" and words[1].startswith("--job-name="):
+                        return words[1].split("=",1)[1]
+        return os.path.basename(script)
+
+    def __call__(self,command,cwd=None):
+        program = os.path.basename(command[0])
+        self.calls[program] = self.calls.get(program,0)+1
+        if program in ("sbatch","qsub"):
+            self.nextid += 1
+            array = "-t" in command or any([word.startswith("--array") for word in command])
+            tag = str(self.nextid) if self.style=="slurm" else "%d%s.mock"%(self.nextid,"[]" if array else "")
+            self.jobs.append([tag,self._jobname(command[-1],cwd),_STATES[self.style]["queued"]])
+            if self.style=="slurm":
+                return "Submitted batch job %s\n"%tag
+            return tag+"\n"
+        if program=="squeue":
+            return "".join(["%s %s %s\n"%tuple(job) for job in self.jobs])
+        if program=="qstat":
+            lines = ["","mock:","                                                            Req'd    Req'd       Elap",
+                     "Job ID          Username Queue    Jobname          SessID NDS   TSK Memory Time  S Time",
+                     "--------------- -------- -------- ---------------- ------ ----- --- ------ ----- - -----"]
+            for tag,name,state in self.jobs:
+                lines.append("%-15s %-8s %-8s %-16s %6s %5s %3s %6s %5s %s %5s"%(tag,self.user,"batch",name,"--",
+                                                                                 "1","1","--","48:00",state,"--"))
+            return "\n".join(lines)+"\n"
+        if program in ("scancel","qdel"):
+            self.finish(command[-1])
+            return ""
+        raise ValueError("MockScheduler does not know the command "+program)
+
+    def advance(self):
+        '''Start every queued job.'''
+        for job in self.jobs:
+            job[2] = _STATES[self.style]["running"]
+
+    def finish(self,tag):
+        '''End a job, removing it from the listings.'''
+        self.jobs = [job for job in self.jobs if job[0]!=tag]
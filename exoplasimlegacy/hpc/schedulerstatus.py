@@ -0,0 +1,95 @@
+'''
+Cached scheduler status, so that looking up many jobs costs one squeue/qstat query per polling
+interval instead of one query per job.
+
+Submissions go through the cache too: the job ID is read straight from the output of sbatch/qsub
+and recorded, so a job's ID is known as soon as it is submitted, with no need to wait for the
+scheduler to list it.
+
+The scheduler commands are run through a ``runner`` (by default, the shell), which takes a
+command as a list of arguments and returns its output; tests can pass a
+``mockscheduler.MockScheduler`` instead.
+'''
+import time
+import subprocess
+
+def _shell(command,cwd=None):
+    return subprocess.run(command,cwd=cwd,stdout=subprocess.PIPE,stderr=subprocess.STDOUT,
+                          universal_newlines=True).stdout
+
+class StatusCache:
+    '''Job IDs and states, refreshed from the scheduler at most once per interval.
+
+    Parameters
+    ----------
+    interval : float, optional
+        Seconds a status query stays fresh.
+    runner : callable, optional
+        Runs a command (a list of arguments, with an optional ``cwd`` keyword) and returns its
+        output. Defaults to running it in the shell.
+    backend : module, optional
+        Batch system module providing SUB, STATUS, parsesubmit, and parsestatus. Defaults to the one
+        selected in batch_system.py.
+    '''
+    def __init__(self,interval=30.0,runner=None,backend=None):
+        self.interval = interval
+        self.runner = runner or _shell
+        if backend is None:
+            import batch_system #Here rather than at the top, since the batch systems import jobdefs, which imports us
+            backend = batch_system
+        self.backend = backend
+        self.jobs = {}       #name: (ID, state), as of the last query
+        self.submitted = {}  #name: ID, for jobs submitted since the last query
+        self.updated = None
+        self.queries = 0
+
+    def refresh(self,force=False):
+        '''Query the scheduler, unless the last query is still fresh.'''
+        if not force and self.updated is not None and time.time()-self.updated<self.interval:
+            return
+        self.jobs = self.backend.parsestatus(self.runner(self.backend.STATUS))
+        self.updated = time.time()
+        self.queries += 1
+        for name in list(self.submitted):
+            if name in self.jobs:
+                del self.submitted[name] #The scheduler knows about it now
+
+    def lookup(self,name):
+        '''ID of the named job, or None if the scheduler doesn't list it.'''
+        if name in self.submitted:
+            return self.submitted[name]
+        self.refresh()
+        if name in self.jobs:
+            return self.jobs[name][0]
+        return None
+
+    def state(self,name):
+        '''Scheduler state of the named job (e.g. "PENDING", "R"), or None if it isn't listed.'''
+        self.refresh()
+        if name in self.jobs:
+            return self.jobs[name][1]
+        if name in self.submitted:
+            return "SUBMITTED"
+        return None
+
+    def submit(self,script,name,cwd=None,command=None):
+        '''Submit a job script, and return its ID (None if the submission failed).
+
+        ``command`` replaces the default submission command (``[SUB, script]``), e.g. to submit
+        only some indices of a job array.
+        '''
+        if command is None:
+            command = [self.backend.SUB,script]
+        tag = self.backend.parsesubmit(self.runner(command,cwd=cwd))
+        if tag is not None:
+            self.submitted[name] = tag
+        return tag
+
+_cache = None
+
+def cache():
+    '''The status cache shared by everything in this process.'''
+    global _cache
+    if _cache is None:
+        _cache = StatusCache()
+    return _cache
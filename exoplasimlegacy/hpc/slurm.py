@@ -1,22 +1,29 @@
 # SLURM plug-in
 
 import os
+import re
 import numpy as np
-from crawldefs import Job
+from jobdefs import Job
 from identity import *
 
 SUB = "sbatch"
 
 USER = "t-98b023"
 
+STATUS = ["squeue","-h","-u",USER,"-o","%i %j %T"] #One line per job: ID, name, state
+
+SCRATCH = "/mnt/node_scratch/"+USER #Node-local disk that jobs run in
+
+WALLTIME = 36*3600.0 #Seconds, as in --time below
+
 def BATCHSCRIPT(job,notify):
     return _BATCHSCRIPT%(job.name,job.name,job.name,job.ncores,16,job.queue,
                          notify,job.top+"plasim/job"+str(job.home))
 
 _BATCHSCRIPT = ("#!/bin/bash                                                  \n"+
                 "#SBATCH --job-name=%s                                        \n"+
-                "#SBATCH --output=%j_%s.out                                   \n"+
-                "#SBATCH --error=%j_%s.err                                    \n"+
+                "#SBATCH --output=%%j_%s.out                                   \n"+
+                "#SBATCH --error=%%j_%s.err                                    \n"+
                 "#SBATCH --ntasks=%d                                          \n"+
                 "##SBATCH --ntasks-per-node=%d                                \n"+
                 "#SBATCH --mem-per-cpu=2000M                                  \n"+
@@ -30,6 +37,39 @@ _BATCHSCRIPT = ("#!/bin/bash                                                  \n
 
 #job.queue could for example be 'broadw1'
 
+ARRAYINDEX = "$SLURM_ARRAY_TASK_ID"
+
+MAXARRAY = 1000 #SLURM's default MaxArraySize is 1001
+
+def ARRAYSCRIPT(job,notify,indices):
+    '''Header for a job array: BATCHSCRIPT with an --array directive (e.g. indices="0-99").'''
+    header = BATCHSCRIPT(job,notify).split('\n',1)
+    return header[0]+"\n#SBATCH --array=%s\n"%indices+header[1]
+
+def SUBARRAY(script,indices):
+    '''Command to submit some indices of a job array.'''
+    return [SUB,"--array=%s"%indices,script]
+
+def arraytag(tag,index):
+    '''ID of one member of a job array.'''
+    return "%s_%d"%(tag,index)
+
+def parsesubmit(text):
+    '''Job ID from the output of sbatch ("Submitted batch job 12345"), or None if it failed.'''
+    match = re.search(r"^Submitted batch job (\d+)",text,re.MULTILINE)
+    if match is None:
+        return None
+    return match.group(1)
+
+def parsestatus(text):
+    '''Map each job name to its (ID, state), from the output of STATUS.'''
+    jobs = {}
+    for line in text.split('\n'):
+        words = line.split()
+        if len(words)>=3:
+            jobs[words[1]] = (words[0],words[2])
+    return jobs
+
 
 MODELS = {"rossby-block":8,     #tasks per node (1 workq node on Sunnyvale has 8 threads)
           "plasim":1}           #Here we use 'task' to mean a Sunnyvale job, as opposed to the
@@ -0,0 +1,146 @@
+'''
+Incremental staging of a job directory to and from node-local scratch.
+
+Each cycle of a job used to tar up its whole directory, copy the tarball to scratch, unpack it,
+run, and then tar, copy, and unpack everything back. This instead moves only what has changed:
+
+    python stage.py in WORKDIR SCRATCHDIR     Copy new and changed inputs to scratch
+    python stage.py out SCRATCHDIR WORKDIR    Copy new and changed files back after the run
+    python stage.py clean SCRATCHDIR          Remove the scratch directory
+
+A manifest in the scratch directory records the size and modification time of every staged file,
+both in scratch and at its source. Staging in skips files the scratch directory already holds
+(e.g. when a resubmitted job lands on the same node), and removes files whose source is gone;
+staging out copies back only the files the run created or changed, and then deletes outputs
+(files matching EXCLUDE, which are never staged in) from scratch. A cycle's transfer is therefore
+its restart file, namelists, and new output, not the whole history of the run.
+
+Files are copied directly, several at a time, without compression: both ends are filesystems
+mounted on the compute node, so compressing would only add CPU time.
+'''
+import os
+import sys
+import json
+import shutil
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST = ".stagemanifest.json"
+
+EXCLUDE = ["*_OUT*","*_REST*","*.nc","snapshots","*.o[0-9]*","*.e[0-9]*"] #Outputs and job logs stay put
+
+THREADS = 8
+
+def _excluded(relpath):
+    for part in relpath.split(os.sep):
+        for pattern in EXCLUDE:
+            if fnmatch.fnmatch(part,pattern):
+                return True
+    return False
+
+def _stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size,stat.st_mtime_ns]
+
+def _walk(top,skipexcluded):
+    '''Relative paths of every file under top (except the manifest), optionally skipping EXCLUDE.'''
+    files = []
+    for root,dirs,names in os.walk(top):
+        for name in names:
+            relpath = os.path.relpath(os.path.join(root,name),top)
+            if relpath==MANIFEST or (skipexcluded and _excluded(relpath)):
+                continue
+            files.append(relpath)
+    return files
+
+def _copy(source,destination,relpaths):
+    def copyone(relpath):
+        target = os.path.join(destination,relpath)
+        os.makedirs(os.path.dirname(target),exist_ok=True)
+        shutil.copy2(os.path.join(source,relpath),target) #Keeps modification times
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(copyone,relpaths)) #list() so errors are raised here
+
+def _readmanifest(scratchdir):
+    try:
+        with open(os.path.join(scratchdir,MANIFEST),"r") as manifestf:
+            return json.load(manifestf)
+    except (OSError,ValueError):
+        return {}
+
+def _writemanifest(scratchdir,manifest):
+    tmpname = os.path.join(scratchdir,MANIFEST+".tmp")
+    with open(tmpname,"w") as manifestf:
+        json.dump(manifest,manifestf)
+    os.replace(tmpname,os.path.join(scratchdir,MANIFEST))
+
+def _current(scratchdir,relpath,entry):
+    '''Whether a manifest entry still matches the scratch copy it describes.'''
+    path = os.path.join(scratchdir,relpath)
+    return os.path.exists(path) and _stamp(path)==entry["scratch"]
+
+def stagein(workdir,scratchdir):
+    '''Mirror a job directory's inputs into scratch, copying only what scratch doesn't already have.
+
+    Returns the number of files and bytes copied.
+    '''
+    os.makedirs(scratchdir,exist_ok=True)
+    manifest = _readmanifest(scratchdir)
+    sources = _walk(workdir,True)
+    for relpath in set(manifest)-set(sources): #Gone from the job directory, so gone from scratch
+        if os.path.exists(os.path.join(scratchdir,relpath)):
+            os.remove(os.path.join(scratchdir,relpath))
+        del manifest[relpath]
+    stale = []
+    for relpath in sources:
+        entry = manifest.get(relpath)
+        if entry is None or entry["source"]!=_stamp(os.path.join(workdir,relpath)) or not _current(scratchdir,relpath,entry):
+            stale.append(relpath)
+    _copy(workdir,scratchdir,stale)
+    for relpath in stale:
+        manifest[relpath] = {"source":_stamp(os.path.join(workdir,relpath)),
+                             "scratch":_stamp(os.path.join(scratchdir,relpath))}
+    _writemanifest(scratchdir,manifest)
+    return len(stale),sum([manifest[relpath]["source"][0] for relpath in stale])
+
+def stageout(scratchdir,workdir):
+    '''Copy files the run created or changed back to the job directory, then drop outputs from scratch.
+
+    Returns the number of files and bytes copied.
+    '''
+    manifest = _readmanifest(scratchdir)
+    changed = []
+    for relpath in _walk(scratchdir,False):
+        entry = manifest.get(relpath)
+        if entry is None or not _current(scratchdir,relpath,entry):
+            changed.append(relpath)
+    _copy(scratchdir,workdir,changed)
+    nbytes = 0
+    for relpath in changed:
+        nbytes += os.path.getsize(os.path.join(scratchdir,relpath))
+        if _excluded(relpath):
+            os.remove(os.path.join(scratchdir,relpath))
+            manifest.pop(relpath,None)
+        else: #Now identical at both ends, so the next stagein can skip it
+            manifest[relpath] = {"source":_stamp(os.path.join(workdir,relpath)),
+                                 "scratch":_stamp(os.path.join(scratchdir,relpath))}
+    for root,dirs,names in os.walk(scratchdir,topdown=False):
+        if root!=scratchdir and len(os.listdir(root))==0:
+            os.rmdir(root)
+    _writemanifest(scratchdir,manifest)
+    return len(changed),nbytes
+
+def clean(scratchdir):
+    '''Remove a job's scratch directory once the job is finished.'''
+    shutil.rmtree(scratchdir,ignore_errors=True)
+
+if __name__=="__main__":
+    command = sys.argv[1] if len(sys.argv)>1 else None
+    if command=="in":
+        print("Staged in %d files (%d bytes)"%stagein(sys.argv[2],sys.argv[3]))
+    elif command=="out":
+        print("Staged out %d files (%d bytes)"%stageout(sys.argv[2],sys.argv[3]))
+    elif command=="clean":
+        clean(sys.argv[2])
+    else:
+        print(__doc__)
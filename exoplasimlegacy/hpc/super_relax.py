@@ -4,70 +4,52 @@ import sys
 import netCDF4 as nc
 import glob
 import time
+from history import History
 
 gplasim = True
-TIMELIMIT = 1.44e5
+TIMELIMIT = 1.44e5 #Wall time available to the job, in seconds
+TIMEMARGIN = 1.2   #Safety factor on the predicted duration of the next year
+HISTORYFILE = "MOST_relax_history.dat" #Annual means already read, kept as synthoutput.py keeps MOST_history.dat
 
 #This version lets the model relax.
 
-def spatialmath(lt,ln,variable,mean=True,radius=6.371e6):
-    lt1 = np.zeros(len(lt)+1)
-    lt1[0] = 90
-    for n in range(0,len(lt)-1):
-        lt1[n+1] = 0.5*(lt[n]+lt[n+1])
-    lt1[-1] = -90
-    ln1 = np.zeros(len(ln)+1)
-    ln1[0] = -2.8125
-    for n in range(0,len(ln)-1):
-        ln1[n+1] = 0.5*(ln[n]+ln[n+1])
-    ln1[-1] = 360.0-2.8125
-    
-    lt1*=np.pi/180.0
-    ln1*=np.pi/180.0
-    
-    darea = np.zeros((len(lt),len(ln)))
-    for jlat in range(0,len(lt)):
-        for jlon in range(0,len(ln)):
-            dln = ln1[jlon+1]-ln1[jlon]
-            darea[jlat,jlon] = (np.sin(lt1[jlat])-np.sin(lt1[jlat+1]))*dln
-    
-    svar = variable*darea
-    if mean:
-        outvar = np.sum(svar)/np.sum(darea)
-    else:
-        outvar = np.sum(svar) * radius**2
-    
-    return outvar
+_histories = {} #One History per kind of reduction, kept in a file so each netCDF file is only read once
+_priors = {}    #Histories carried over from previous submissions (*.pso), only read once
+
+def _history(keys,mean=True,radius=6.371e6):
+    filename = HISTORYFILE
+    if not mean: #Totals depend on the radius, so they get a history of their own
+        filename = HISTORYFILE[:-4]+"_total%g.dat"%radius
+    if filename not in _histories:
+        _histories[filename] = History(filename,["ts","hfns","ntr"],mean=mean,radius=radius)
+    history = _histories[filename]
+    history.addkeys(keys) #Start tracking another variable, if need be, keeping what has been read
+    return history
+
+def _prior(filename):
+    if filename not in _priors:
+        _priors[filename] = np.atleast_1d(np.loadtxt(filename)) if os.path.exists(filename) else np.zeros(0)
+    return _priors[filename]
+
+def _runningmean(x,window):
+    total = np.cumsum(np.concatenate([[0.0],x]))
+    return (total[window:]-total[:-window])/window
+
+def _slopes5(x):
+    #Least-squares slopes of every run of 5 consecutive values (the same as np.polyfit(np.arange(5)+1,...,1)[0])
+    return (-2*x[:-4]-x[1:-3]+x[3:-1]+2*x[4:])/10.0
 
 def isflat(key="ts",mean=True,radius=6.371e6,baseline=13,threshhold=0.05):
     #Key is the netCDF variable to evaluate, mean toggles whether to track the average or total,
     #radius is the planet radius in meters, and baseline is the number of years over which to measure
     #slope. Default is to track surface temperature. Threshhold is the maximum slope we'll allow.
   files = sorted(glob.glob("*.nc"))
-  nfiles = len(files)
-  prior=False
-  if len(glob.glob("thistory.ps*"))>0:
-      thistory = np.loadtxt("thistory.pso")
-      nfiles += len(thistory)
-      prior=True
-  dd = np.zeros(nfiles)
-  nstart=0
-  if prior:
-      dd[:len(thistory)] = thistory[:]
-      nstart=len(thistory)
   if len(files) < baseline+2:
     return False
   else:
-    for n in range(0,len(files)):
-        ncd = nc.Dataset(files[n],"r")
-        variable = ncd.variables[key][:]
-        if len(variable.shape)>3:
-            variable = variable[:,-1,:,:]
-        for m in range(0,variable.shape[0]):
-            dd[n+nstart] += spatialmath(ncd.variables['lat'][:],ncd.variables['lon'][:],variable[m,:,:],
-                                 mean=mean,radius=radius)
-        dd[n+nstart] /= variable.shape[0] #Monthly mean
-        ncd.close()
+    history = _history([key],mean=mean,radius=radius)
+    history.update(files)
+    dd = np.concatenate([_prior("thistory.pso"),history.values(key,files)])
     n=len(dd)-3
     tt=np.arange(baseline)+1
     linfits=[]
@@ -84,18 +66,9 @@ def isflat(key="ts",mean=True,radius=6.371e6,baseline=13,threshhold=0.05):
   
 def gethistory(key="ts",mean=True,radius=6.371e6):
     files = sorted(glob.glob("*.nc"))
-    dd=np.zeros(len(files))
-    for n in range(0,len(files)):
-        ncd = nc.Dataset(files[n],"r")
-        variable = ncd.variables[key][:]
-        if len(variable.shape)>3:
-            variable = variable[:,-1,:,:]
-        for m in range(0,variable.shape[0]):
-            dd[n] += spatialmath(ncd.variables['lat'][:],ncd.variables['lon'][:],variable[m,:,:],
-                                 mean=mean,radius=radius)
-        dd[n] /= variable.shape[0] #Monthly mean
-        ncd.close()
-    return dd
+    history = _history([key],mean=mean,radius=radius)
+    history.update(files)
+    return history.values(key,files)
   
 def hasnans():
     files = sorted(glob.glob("*.nc"))
@@ -109,47 +82,18 @@ def hasnans():
 
 def energybalanced(threshhold = 1.0e-4,baseline=50): #Takes an average of 200 years
     files = sorted(glob.glob("*.nc"))
-    nfiles = len(files)
-    prior=False
-    if len(glob.glob("toahistory.ps*"))>0:
-        toahistory = np.loadtxt("toahistory.pso")
-        nfiles+=len(toahistory)
-        shistory = np.loadtxt("shistory.pso")
-        prior=True
-    sbalance = np.zeros(nfiles)
-    toabalance=np.zeros(nfiles)
-    nstart=0
-    if prior:
-        sbalance[:len(toahistory)] = shistory[:]
-        toabalance[:len(toahistory)] = toahistory[:]
-        nstart = len(toahistory)
     if len(files) < baseline: #Run for minimum of baseline years
         return False
     else:
-        for n in range(0,len(files)):
-            ncd = nc.Dataset(files[n],"r")
-            ntr = ncd.variables['ntr'][:]
-            hfns = ncd.variables['hfns'][:]
-            lat = ncd.variables['lat'][:]
-            lon = ncd.variables['lon'][:]
-            ncd.close()
-            topt = np.zeros(12)
-            bott = np.zeros(12)
-            for m in range(0,12):
-                topt[m] = spatialmath(lat,lon,ntr[m,:,:])
-                bott[m] = spatialmath(lat,lon,hfns[m,:,:])
-            sbalance[n+nstart] = np.mean(bott)
-            toabalance[n+nstart] = np.mean(topt)
-        savgs = []
-        tavgs = []
-        for n in range(9,len(sbalance)):
-            savgs.append(abs(np.mean(sbalance[n-9:n+1]))) #10-year average energy balance
-            tavgs.append(abs(np.mean(toabalance[n-9:n+1])))
-        sslopes = []
-        tslopes = []
-        for n in range(4,len(savgs)): #5-baseline slopes in distance from energy balance
-            sslopes.append(np.polyfit(np.arange(5)+1,savgs[n-4:n+1],1)[0])
-            tslopes.append(np.polyfit(np.arange(5)+1,tavgs[n-4:n+1],1)[0])
+        history = _history(["hfns","ntr"])
+        history.update(files) #Only this year's file is new
+        sbalance = np.concatenate([_prior("shistory.pso"),history.values("hfns",files)])
+        toabalance = np.concatenate([_prior("toahistory.pso"),history.values("ntr",files)])
+        #Only the last 30 5-year slopes of 10-year averages count, so only the last 43 years are needed
+        savgs = abs(_runningmean(sbalance[-43:],10)) #10-year average energy balance
+        tavgs = abs(_runningmean(toabalance[-43:],10))
+        sslopes = _slopes5(savgs) #5-baseline slopes in distance from energy balance
+        tslopes = _slopes5(tavgs)
         savgslope = abs(np.mean(sslopes[-30:])) #30-year average of 5-year slopes  
         tavgslope = abs(np.mean(tslopes[-30:]))
         os.system("echo '%02.8f  %02.8f'>>slopes.log"%(savgslope,tavgslope))
@@ -161,19 +105,18 @@ def energybalanced(threshhold = 1.0e-4,baseline=50): #Takes an average of 200 ye
         
 def getbalance():
     files = sorted(glob.glob("*.nc"))
-    ncd = nc.Dataset(files[-1],"r")
-    ntr = ncd.variables['ntr'][:]
-    hfns = ncd.variables['hfns'][:]
-    lat = ncd.variables['lat'][:]
-    lon = ncd.variables['lon'][:]
-    ncd.close()
-    topt = np.zeros(12)
-    bott = np.zeros(12)
-    for m in range(0,12):
-        topt[m] = spatialmath(lat,lon,ntr[m,:,:])
-        bott[m] = spatialmath(lat,lon,hfns[m,:,:])
-    return (np.mean(bott),np.mean(topt))
+    history = _history(["hfns","ntr"])
+    history.update(files[-1:])
+    return (history.values("hfns",files[-1:])[0],history.values("ntr",files[-1:])[0])
     
+
+def fitsintime(elapsed,yeartimes,window=5):
+    #Predict the next year's wall time (run plus postprocessing) from the last few years, and check
+    #that it will finish inside TIMELIMIT, so the job isn't killed partway through a year.
+    if len(yeartimes)==0: #Nothing to go on yet
+        return elapsed<=TIMELIMIT
+    predicted = max(np.mean(yeartimes[-window:]),yeartimes[-1])
+    return elapsed+TIMEMARGIN*predicted<=TIMELIMIT
         
 
 if __name__=="__main__":
@@ -183,7 +126,7 @@ if __name__=="__main__":
     wf.close()
   EXP="MOST"
   os.system("rm keepgoing")
-  tstart = time.clock()
+  tstart = time.time()
   NCPU=int(sys.argv[1])
   nlevs = int(sys.argv[2])
   #os.system("rm -f plasim_restart") #Uncomment for a fresh run when you haven't cleaned up beforehand
@@ -195,7 +138,9 @@ if __name__=="__main__":
   minyears=75
   maxyears=year+300
   relaxed=False
-  while (year < minyears or not energybalanced(threshhold=4.0e-4)) and year<maxyears and (time.clock()-tstart)<=TIMELIMIT:
+  yeartimes=[]
+  while (year < minyears or not energybalanced(threshhold=4.0e-4)) and year<maxyears and fitsintime(time.time()-tstart,yeartimes):
+    tyear=time.time()
     year+=1
     dataname=EXP+".%04d"%year
     snapname=EXP+"_SNAP.%04d"%year
@@ -223,6 +168,7 @@ if __name__=="__main__":
         break
     sb,tb = getbalance()
     os.system("echo '%02.6f  %02.6f'>>balance.log"%(sb,tb))
+    yeartimes.append(time.time()-tyear)
   os.system("rm keepgoing")
   if not hasnans() and not energybalanced(threshhold=4.0e-4):
     os.system("touch keepgoing")
@@ -0,0 +1,339 @@
+'''
+Transactional job queue for the crawler, kept in an SQLite database (tasks.db) instead of tasks.crwl.
+
+Each task moves through queued -> running -> done, or -> failed once it has failed too many times.
+Claiming a task is a single transaction, so any number of launchers, on any number of nodes, can
+take tasks from the same queue without two of them ever getting the same one. Task parameters are
+stored one per row, in header order, so a Job can be rebuilt exactly as launcher.py would have
+built it from tasks.crwl, and tasks with different headers can share one queue.
+
+The database uses SQLite's rollback journal rather than WAL, because WAL needs shared memory and
+so does not work across nodes. It must live on a filesystem with working POSIX locks (most
+cluster filesystems; check before using NFS without lockd).
+
+Usage:
+
+    python taskqueue.py import tasks.crwl [tasks.db]    Queue every task in a tasks.crwl file
+    python taskqueue.py status [tasks.db]               Count tasks in each state
+    python taskqueue.py complete NAME [tasks.db]        Mark a task done (job scripts call this)
+    python taskqueue.py fail NAME [message] [tasks.db]  Mark a task failed; it is retried if it can be
+    python taskqueue.py requeue NAME [tasks.db]         Put a task back in the queue
+    python taskqueue.py renew NAME [tasks.db]           Note that a task's job is alive (job scripts call this)
+
+A running task is renewed each time one of its jobs starts or resubmits itself. A task whose job
+the scheduler no longer lists, and which has not been heard from for longer than a job's walltime
+plus QUEUEMARGIN, is presumed dead: its job was killed without getting to mark it. Such tasks
+count as failed, and are queued again the next time a task is claimed. Tasks whose jobs are still
+listed, however long they have been waiting in the scheduler's queue, are left alone.
+'''
+import os
+import sys
+import glob
+import time
+import socket
+import sqlite3
+import schedulerstatus
+
+QUEUEFILE = "tasks.db"
+MAXATTEMPTS = 3
+
+WALLTIME = 48*3600.0    #Seconds; a running task not heard from for this long (plus QUEUEMARGIN),
+QUEUEMARGIN = 6*3600.0  #and whose job the scheduler doesn't list, is presumed dead
+
+STATES = ["queued","running","done","failed"]
+
+_SCHEMA = ["CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, "+
+           "status TEXT NOT NULL DEFAULT 'queued', ncores INTEGER, queue TEXT, attempts INTEGER NOT NULL DEFAULT 0, "+
+           "maxattempts INTEGER NOT NULL, claimedby TEXT, claimed REAL, finished REAL, message TEXT)",
+           "CREATE TABLE IF NOT EXISTS parameters (task INTEGER NOT NULL REFERENCES tasks(id), position INTEGER NOT NULL, "+
+           "field TEXT NOT NULL, value TEXT, PRIMARY KEY (task, position))",
+           "CREATE TABLE IF NOT EXISTS events (task INTEGER NOT NULL REFERENCES tasks(id), time REAL NOT NULL, "+
+           "event TEXT NOT NULL, host TEXT, message TEXT)",
+           "CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, id)"]
+
+def _worker():
+    return "%s:%d"%(socket.gethostname(),os.getpid())
+
+def parsecrwl(filename):
+    '''Read a tasks.crwl file.
+
+    Returns a list of (name, status, ncores, queue, fields, values) for each task line, where fields
+    are the header fields after QUEUE and values the task's values for them. As in launcher.py, each
+    task uses the nearest header above it with the right number of fields; tasks with no such header
+    are skipped.
+    '''
+    with open(filename,"r") as crwlf:
+        lines = crwlf.read().split('\n')
+    tasks = []
+    headers = []
+    for line in lines:
+        if line.strip()=='':
+            continue
+        if line[0]=="#":
+            headers.append(line.split()[1:])
+            continue
+        words = line.split()
+        header = None
+        for candidate in headers[::-1]:
+            if len(candidate)==len(words):
+                header = candidate
+                break
+        if header is None:
+            print("Task "+words[0]+" header mismatch; skipping")
+            continue
+        tasks.append((words[0],int(words[1]),int(words[2]),words[3],header[4:],words[4:]))
+    return tasks
+
+class TaskQueue:
+    '''A queue of crawler tasks in an SQLite database.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Path to the database. It is created if it doesn't exist.
+    timeout : float, optional
+        Seconds to wait for another launcher to finish its transaction before giving up.
+    '''
+    def __init__(self,filename=QUEUEFILE,timeout=120.0):
+        self.filename = filename
+        self.db = sqlite3.connect(filename,timeout=timeout,isolation_level=None) #We manage transactions
+        self.db.execute("PRAGMA journal_mode=DELETE")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self._begin()
+        for statement in _SCHEMA:
+            self.db.execute(statement)
+        self.db.execute("COMMIT")
+
+    def _begin(self):
+        self.db.execute("BEGIN IMMEDIATE") #Take the write lock now, so nothing changes between read and write
+
+    def _event(self,taskid,event,message=None):
+        self.db.execute("INSERT INTO events (task,time,event,host,message) VALUES (?,?,?,?,?)",
+                        (taskid,time.time(),event,_worker(),message))
+
+    def close(self):
+        self.db.close()
+
+    def add(self,name,ncores,queue,fields,values,status="queued",maxattempts=MAXATTEMPTS):
+        '''Add a task. Returns False (and changes nothing) if a task of that name already exists.'''
+        self._begin()
+        try:
+            cursor = self.db.execute("INSERT OR IGNORE INTO tasks (name,status,ncores,queue,maxattempts) VALUES (?,?,?,?,?)",
+                                     (name,status,int(ncores),queue,maxattempts))
+            if cursor.rowcount==0:
+                self.db.execute("COMMIT")
+                return False
+            taskid = cursor.lastrowid
+            self.db.executemany("INSERT INTO parameters (task,position,field,value) VALUES (?,?,?,?)",
+                                [(taskid,n,fields[n],values[n]) for n in range(len(fields))])
+            self._event(taskid,"added")
+            self.db.execute("COMMIT")
+        except:
+            self.db.execute("ROLLBACK")
+            raise
+        return True
+
+    def importcrwl(self,filename="tasks.crwl",maxattempts=MAXATTEMPTS):
+        '''Queue every task in a tasks.crwl file (tasks whose status is already 1 are recorded as done).
+
+        Tasks already in the queue are left alone, so a file can be imported again after adding tasks
+        to it. Returns the number of tasks added.
+        '''
+        added = 0
+        for name,status,ncores,queue,fields,values in parsecrwl(filename):
+            added += self.add(name,ncores,queue,fields,values,status=("queued" if status==0 else "done"),
+                              maxattempts=maxattempts)
+        return added
+
+    def claim(self,walltime=WALLTIME,margin=QUEUEMARGIN,status=None):
+        '''Claim the next queued task for this process, atomically.
+
+        Running tasks whose jobs have died are expired first (see :py:meth:`expire`), so that
+        their jobs' deaths don't leave them running forever. Pass walltime=None to skip this.
+
+        Returns
+        -------
+        (name, header, args)
+            The task, with header and argument lines in the tasks.crwl format expected by
+            ``jobdefs.Job(header,args,resource)``; or None if nothing is queued.
+        '''
+        if walltime is not None:
+            self.expire(walltime,margin=margin,status=status)
+        self._begin()
+        try:
+            row = self.db.execute("SELECT id,name,ncores,queue FROM tasks WHERE status='queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                self.db.execute("COMMIT")
+                return None
+            taskid,name,ncores,queue = row
+            self.db.execute("UPDATE tasks SET status='running', attempts=attempts+1, claimedby=?, claimed=? WHERE id=?",
+                            (_worker(),time.time(),taskid))
+            self._event(taskid,"claimed")
+            self.db.execute("COMMIT")
+        except:
+            self.db.execute("ROLLBACK")
+            raise
+        fields,values = self.parameters(name)
+        header = "# JOBNAME STATUS NCORES QUEUE "+' '.join(fields)
+        args = ' '.join([name,'1',str(ncores),queue]+values)
+        return name,header,args
+
+    def renew(self,name):
+        '''Record that a running task's job is still alive. Returns False if the task isn't running.'''
+        self._begin()
+        cursor = self.db.execute("UPDATE tasks SET claimed=? WHERE name=? AND status='running'",(time.time(),name))
+        self.db.execute("COMMIT")
+        return cursor.rowcount>0
+
+    def _arrays(self):
+        '''Map each task submitted as part of a job array to the array's job name.
+
+        Array members are listed by the scheduler under the array's name, which is found from the
+        array task tables (arrays/NAME.tasks) written next to the database by submitarray.
+        '''
+        arrays = {}
+        for table in glob.glob(os.path.join(os.path.dirname(os.path.abspath(self.filename)),"arrays","*.tasks")):
+            with open(table,"r") as tablef:
+                for line in tablef:
+                    words = line.split()
+                    if len(words)>1 and words[0][0]!="#":
+                        arrays[words[1]] = os.path.basename(table)[:-6]
+        return arrays
+
+    def expire(self,walltime=WALLTIME,margin=QUEUEMARGIN,status=None):
+        '''Fail every running task whose job has died.
+
+        A task's job is presumed dead once the task has not been claimed or renewed within the last
+        ``walltime+margin`` seconds, and the scheduler no longer lists a job for it (under the
+        task's name, or its job array's). Jobs waiting in the scheduler's queue are still listed,
+        so their tasks are never expired, however long they wait.
+
+        Each counts as a failed attempt, so it is queued again unless it has used up its attempts.
+        Returns the names of the expired tasks.
+
+        Parameters
+        ----------
+        walltime : float, optional
+            Longest a job can run, in seconds.
+        margin : float, optional
+            Further seconds to allow, e.g. for a job to be listed after it is submitted.
+        status : schedulerstatus.StatusCache, optional
+            Where to look jobs up. Defaults to this process's shared cache.
+        '''
+        rows = self.db.execute("SELECT name FROM tasks WHERE status='running' AND claimed<? ORDER BY id",
+                               (time.time()-walltime-margin,)).fetchall()
+        if len(rows)==0:
+            return []
+        if status is None:
+            status = schedulerstatus.cache()
+        arrays = self._arrays()
+        dead = [row[0] for row in rows if status.lookup(row[0]) is None and
+                (row[0] not in arrays or status.lookup(arrays[row[0]]) is None)]
+        expired = []
+        self._begin()
+        try:
+            for name in dead:
+                row = self.db.execute("SELECT id,attempts,maxattempts FROM tasks WHERE name=? AND status='running' "+
+                                      "AND claimed<?",(name,time.time()-walltime-margin)).fetchone()
+                if row is None:
+                    continue #Renewed or finished while we were asking the scheduler
+                taskid,attempts,maxattempts = row
+                state = "queued" if attempts<maxattempts else "failed"
+                message = "No word from the job for %d seconds, and the scheduler no longer lists it"%(walltime+margin)
+                self.db.execute("UPDATE tasks SET status=?, finished=?, message=? WHERE id=?",
+                                (state,time.time(),message,taskid))
+                self._event(taskid,state,message)
+                expired.append(name)
+            self.db.execute("COMMIT")
+        except:
+            self.db.execute("ROLLBACK")
+            raise
+        return expired
+
+    def _finish(self,name,status,message=None,fromstates=("running",)):
+        self._begin()
+        try:
+            row = self.db.execute("SELECT id,status,attempts,maxattempts FROM tasks WHERE name=?",(name,)).fetchone()
+            if row is None:
+                self.db.execute("COMMIT")
+                raise KeyError("No task named "+name)
+            taskid,current,attempts,maxattempts = row
+            if current not in fromstates:
+                self.db.execute("COMMIT")
+                return current
+            if status=="failed" and attempts<maxattempts:
+                status = "queued" #Retry
+            self.db.execute("UPDATE tasks SET status=?, finished=?, message=? WHERE id=?",
+                            (status,time.time(),message,taskid))
+            self._event(taskid,status,message)
+            self.db.execute("COMMIT")
+        except KeyError:
+            raise
+        except:
+            self.db.execute("ROLLBACK")
+            raise
+        return status
+
+    def complete(self,name,message=None):
+        '''Mark a running task done. Returns the task's new status.'''
+        return self._finish(name,"done",message)
+
+    def fail(self,name,message=None):
+        '''Mark a running task failed. It is queued again unless it has used up its attempts.
+
+        Returns the task's new status ("queued" or "failed").
+        '''
+        return self._finish(name,"failed",message)
+
+    def requeue(self,name):
+        '''Put a task back in the queue, whatever its state, with a fresh set of attempts.'''
+        self._begin()
+        self.db.execute("UPDATE tasks SET attempts=0 WHERE name=?",(name,))
+        self.db.execute("COMMIT")
+        return self._finish(name,"queued",fromstates=STATES)
+
+    def parameters(self,name):
+        '''The header fields of a task, and its values for them, in header order.'''
+        rows = self.db.execute("SELECT field,value FROM parameters JOIN tasks ON tasks.id=parameters.task "+
+                               "WHERE tasks.name=? ORDER BY position",(name,)).fetchall()
+        return [row[0] for row in rows],[row[1] for row in rows]
+
+    def status(self,name=None):
+        '''Status of one task, or if no name is given, the number of tasks in each state.'''
+        if name is not None:
+            row = self.db.execute("SELECT status FROM tasks WHERE name=?",(name,)).fetchone()
+            return None if row is None else row[0]
+        counts = dict([(state,0) for state in STATES])
+        for state,count in self.db.execute("SELECT status,COUNT(*) FROM tasks GROUP BY status"):
+            counts[state] = count
+        return counts
+
+    def tasks(self,status=None):
+        '''Names of all tasks, or of those in one state, in queue order.'''
+        if status is None:
+            return [row[0] for row in self.db.execute("SELECT name FROM tasks ORDER BY id")]
+        return [row[0] for row in self.db.execute("SELECT name FROM tasks WHERE status=? ORDER BY id",(status,))]
+
+if __name__=="__main__":
+    command = sys.argv[1]
+    arguments = sys.argv[2:]
+    dbfile = QUEUEFILE
+    if len(arguments)>0 and arguments[-1].endswith(".db"):
+        dbfile = arguments.pop()
+    taskqueue = TaskQueue(dbfile)
+    if command=="import":
+        print("Queued %d new tasks"%taskqueue.importcrwl(arguments[0] if len(arguments)>0 else "tasks.crwl"))
+    elif command=="status":
+        counts = taskqueue.status()
+        print('  '.join(["%s: %d"%(state,counts[state]) for state in STATES]))
+    elif command=="complete":
+        print(arguments[0]+": "+taskqueue.complete(arguments[0]))
+    elif command=="fail":
+        print(arguments[0]+": "+taskqueue.fail(arguments[0],' '.join(arguments[1:]) or None))
+    elif command=="requeue":
+        print(arguments[0]+": "+taskqueue.requeue(arguments[0]))
+    elif command=="renew":
+        taskqueue.renew(arguments[0])
+    else:
+        print(__doc__)
+    taskqueue.close()
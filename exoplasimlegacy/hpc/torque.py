@@ -7,6 +7,12 @@ from identity import *
 
 SUB = "qsub"
 
+STATUS = ["qstat","-u",USER]
+
+SCRATCH = "/mnt/node_scratch/"+USER #Node-local disk that jobs run in
+
+WALLTIME = 48*3600.0 #Seconds, as in -l walltime below
+
 _BATCHSCRIPT = ("#!/bin/bash -l                                                  \n"+
               "#PBS -l nodes=%d:ppn=%d                                         \n"+
               "#PBS -q %s                                                      \n"+
@@ -24,6 +30,39 @@ _BATCHSCRIPT = ("#!/bin/bash -l
 
 def BATCHSCRIPT(job,notify):
     return _BATCHSCRIPT%(1,job.ncores,job.queue,notify,job.name)
+
+ARRAYINDEX = "$PBS_ARRAYID"
+
+MAXARRAY = 1000
+
+def ARRAYSCRIPT(job,notify,indices):
+    '''Header for a job array: BATCHSCRIPT with a -t directive (e.g. indices="0-99").'''
+    header = BATCHSCRIPT(job,notify).split('\n',1)
+    return header[0]+"\n#PBS -t %s\n"%indices+header[1]
+
+def SUBARRAY(script,indices):
+    '''Command to submit some indices of a job array.'''
+    return [SUB,"-t",indices,script]
+
+def arraytag(tag,index):
+    '''ID of one member of a job array ("123[].server" -> "123[4].server").'''
+    return tag.replace("[]","[%d]"%index)
+
+def parsesubmit(text):
+    '''Job ID from the output of qsub ("12345.server", or "12345[].server" for arrays), or None if it failed.'''
+    lines = [line.strip() for line in text.split('\n') if line.strip()!='']
+    if len(lines)==0 or not lines[-1].split('.')[0].replace("[]","").isdigit():
+        return None
+    return lines[-1]
+
+def parsestatus(text):
+    '''Map each job name to its (ID, state), from the output of STATUS.'''
+    jobs = {}
+    for line in text.split('\n')[5:]: #Skip qstat's header
+        words = line.split()
+        if len(words)>=10:
+            jobs[words[3]] = (words[0],words[9])
+    return jobs
     
 
 MODELS = {"plasim":1,                #tasks per node (1 workq node on Sunnyvale has 8 threads)
@@ -0,0 +1,95 @@
+"""
+A content-addressed store of model inputs, so working directories can link to them instead of
+holding their own copies.
+
+Every :py:class:`Model <exoplasimlegacy.Model>` needs the executable, namelists, boundary condition
+files (``.sra``), and data tables from ``plasim/run``, but only edits a few of them (mostly
+namelists). Rather than copying all of them into each working directory, the Model links them to
+read-only files in this store, named by the SHA-256 hash of their contents, and copies a file into
+the working directory only when it is about to be changed (see :py:func:`materialize`). Since the
+store is keyed by content, a later recompile or edit of ``plasim/run`` never changes the inputs of a
+model that already exists.
+
+The store lives in ``inputs/`` in the build cache directory (see
+:py:func:`buildcache.cachedir() <exoplasimlegacy.buildcache.cachedir>`). Working directories that are
+moved to another machine should be copied with links dereferenced (e.g. ``cp -rL`` or
+``rsync -L``), or created with ``Model(linkinputs=False)``.
+"""
+import os
+import shutil
+import hashlib
+import exoplasimlegacy.buildcache as buildcache
+
+_digests = {} #Hashes already computed by this process, keyed by path, size, and modification time
+
+def storedir():
+    '''Directory holding stored inputs.'''
+    return os.path.join(buildcache.cachedir(),"inputs")
+
+def digest(filename):
+    '''SHA-256 hash of a file's contents, only recomputed when its size or modification time changes.'''
+    stat = os.stat(filename)
+    stamp = (os.path.abspath(filename),stat.st_size,stat.st_mtime)
+    if stamp not in _digests:
+        sha = hashlib.sha256()
+        with open(filename,"rb") as inputf:
+            for block in iter(lambda: inputf.read(1<<20),b""):
+                sha.update(block)
+        _digests[stamp] = sha.hexdigest()
+    return _digests[stamp]
+
+def store(filename):
+    '''Add a file to the store (if it isn't there already), and return the path to the stored copy.
+
+    Stored files are read-only, and keep the original's permission to execute.
+    '''
+    stored = os.path.join(storedir(),digest(filename))
+    if not os.path.exists(stored):
+        os.makedirs(storedir(),exist_ok=True)
+        tmpname = "%s.%d.tmp"%(stored,os.getpid())
+        shutil.copyfile(filename,tmpname)
+        os.chmod(tmpname,os.stat(filename).st_mode&0o555)
+        os.replace(tmpname,stored) #Other processes only ever see a whole file
+    return stored
+
+def provision(filenames,workdir,link="symlink"):
+    '''Place files in a working directory as links to the store.
+
+    Directories are skipped, as ``cp`` without ``-r`` would. Existing files of the same names in the
+    working directory are replaced. If links cannot be made (e.g. hard links across filesystems),
+    files are copied instead.
+
+    Parameters
+    ----------
+    filenames : list
+        Paths of the files to place
+    workdir : str
+        Working directory
+    link : str, optional
+        "symlink" or "hard"
+    '''
+    for filename in filenames:
+        if not os.path.isfile(filename):
+            continue
+        destination = os.path.join(workdir,os.path.basename(filename))
+        if os.path.lexists(destination):
+            os.remove(destination)
+        try:
+            if link=="hard":
+                os.link(store(filename),destination)
+            else:
+                os.symlink(store(filename),destination)
+        except OSError:
+            shutil.copy2(filename,destination)
+
+def materialize(filename):
+    '''Replace a link to the store with a private, writable copy, so that it can be changed.
+
+    Does nothing for files that are not links (or that do not exist). Must be called before any file
+    in a working directory is written to or overwritten in place.
+    '''
+    if os.path.islink(filename) or (os.path.isfile(filename) and os.stat(filename).st_nlink>1):
+        tmpname = filename+".tmp"
+        shutil.copyfile(filename,tmpname)
+        os.chmod(tmpname,os.stat(filename).st_mode|0o200)
+        os.replace(tmpname,filename)
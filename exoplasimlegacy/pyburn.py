@@ -7,7 +7,6 @@ import exoplasimlegacy.gcmt
 import exoplasimlegacy.gcmt as gcmt
 import exoplasimlegacy.filesupport
 from exoplasimlegacy.filesupport import SUPPORTED
-import scipy, scipy.integrate, scipy.interpolate
 import os, sys
 
 '''
@@ -200,6 +199,49 @@ L_TIMES_RHOH2O = -333700000.0
 RLAPSE      = 0.0065    #International Standard Atmosphere temperature lapse rate in K/m
 RH2O        = 1000 * 1.380658e-23*6.0221367e+23 / 18.0153
 
+#Named compression profiles for the netCDF, HDF5, and NumPy writers. Each entry can also be overridden
+#per variable. 'codec' is 'gzip', 'lzf' (HDF5 only; other writers fall back to gzip), or None; 'level'
+#is the gzip level; 'shuffle' and 'checksum' toggle the byte-shuffle and Fletcher32 filters; 'precision'
+#is None, the number of decimal digits to keep (like netCDF's least_significant_digit), or "float16";
+#and 'keepbits' is the number of mantissa bits to keep when bit-rounding float32 data (None to skip).
+COMPRESSION_PROFILES = {"fast"    :{"codec":"gzip","level":1,"shuffle":True ,"checksum":False,
+                                    "precision":None,"keepbits":None},
+                        "balanced":{"codec":"gzip","level":4,"shuffle":True ,"checksum":False,
+                                    "precision":None,"keepbits":None},
+                        "archive" :{"codec":"gzip","level":9,"shuffle":True ,"checksum":True ,
+                                    "precision":None,"keepbits":None},
+                        }
+
+#Chunk layout for whole-simulation stores (chunks="timeseries"): each chunk holds this many output
+#timestamps (10 years of monthly means), and the horizontal dimensions are tiled until a chunk holds
+#no more than TIMESERIES_CHUNKSIZE values (1 MiB of float32), so a time series at one point or region
+#only touches a handful of chunks.
+TIMESERIES_CHUNK     = 120
+TIMESERIES_CHUNKSIZE = 2**18
+
+#CSV writer: number of values formatted per string operation
+CSV_BLOCKSIZE    = 2**16
+
+#Size of the blocks in which raw output files are streamed through a compressor
+STREAM_BLOCKSIZE = 2**22
+
+#Name of the netCDF/HDF5 global attribute (or the suffix of the sidecar file, for other formats) that
+#records which raw file and which postprocessor settings produced an output
+PROVENANCE = "pyburn_provenance"
+
+#Compressed raw output files that can be read directly, by file extension, and the signature their
+#contents start with. Reading or writing .zst requires Python 3.14+ or the zstandard package.
+RAW_COMPRESSION = {".gz" :b"\x1f\x8b",
+                   ".bz2":b"BZh",
+                   ".xz" :b"\xfd7zXZ\x00",
+                   ".zst":b"\x28\xb5\x2f\xfd",
+                   }
+
+#Plausible limits used by checkraw() for a quick sanity check, by variable code. A surface temperature
+#outside these bounds means the model has blown up, whatever planet it is simulating.
+RAWCHECK_LIMITS = {139:(1.0,2000.0),
+                   }
+
 
 def _getEndian(fbuffer):
     '''Determine Endian-ness of the buffer'''
@@ -520,6 +562,104 @@ def refactorvariable(variable,header,nlev=10):
             
     return newvar
 
+def _rawcodec(filename):
+    '''Which compression a raw output file uses (a key of ``RAW_COMPRESSION``), or None if uncompressed.'''
+    with open(filename,"rb") as fileobj:
+        head = fileobj.read(6)
+    for codec in RAW_COMPRESSION:
+        if head.startswith(RAW_COMPRESSION[codec]):
+            return codec
+    return None
+
+def _codecmodule(codec):
+    '''The module providing ``open()`` for a raw file compression type.'''
+    if codec==".gz":
+        import gzip
+        return gzip
+    elif codec==".bz2":
+        import bz2
+        return bz2
+    elif codec==".xz":
+        import lzma
+        return lzma
+    elif codec==".zst":
+        try:
+            from compression import zstd
+            return zstd
+        except ImportError:
+            pass
+        try:
+            import zstandard
+            return zstandard
+        except ImportError:
+            raise ImportError("Reading or writing .zst files requires Python 3.14+ or the zstandard package.")
+    raise Exception("Unsupported raw file compression %s. Supported types are:\n\t\n\t%s"%(codec,
+                    "\n\t".join(RAW_COMPRESSION)))
+
+def _openraw(filename):
+    '''Open a raw output file for reading, decompressing it on the fly if it is compressed.'''
+    codec = _rawcodec(filename)
+    if codec is None:
+        return open(filename,"rb")
+    return _codecmodule(codec).open(filename,"rb")
+
+def _rawstem(filename):
+    '''Name of a raw output file without its compression extension, if it has one.'''
+    for codec in RAW_COMPRESSION:
+        if filename.endswith(codec):
+            return filename[:-len(codec)]
+    return filename
+
+def compressraw(filename,codec=".xz",level=None,outfile=None,remove=True):
+    '''Compress a raw output file for archiving.
+    
+    The compressed file can be passed straight to :py:func:`readfile`, :py:func:`dataset`, or 
+    :py:func:`postprocess`, which decompress it in memory as it is read, so it never has to be 
+    decompressed to disk again.
+    
+    Parameters
+    ----------
+    filename : str
+        Path to the raw output file
+    codec : str, optional
+        Compression type: ".gz", ".bz2", ".xz" (default), or ".zst" (which requires Python 3.14+ or
+        the zstandard package).
+    level : int, optional
+        Compression level (the preset, for xz). If None, each library's default is used.
+    outfile : str, optional
+        Path to the compressed file. Defaults to ``filename`` plus the codec's extension.
+    remove : bool, optional
+        If True (default), delete the uncompressed file once the compressed file is complete.
+        
+    Returns
+    -------
+    str
+        Path to the compressed file.
+    '''
+    import shutil
+    if not codec.startswith("."):
+        codec = "."+codec
+    module = _codecmodule(codec)
+    if outfile is None:
+        outfile = filename+codec
+    kwargs = {}
+    if level is not None:
+        if codec==".xz":
+            kwargs["preset"] = level
+        elif codec==".zst" and module.__name__=="zstandard":
+            kwargs["cctx"] = module.ZstdCompressor(level=level)
+        elif codec==".zst":
+            kwargs["level"] = level
+        else:
+            kwargs["compresslevel"] = level
+    with open(filename,"rb") as source:
+        with module.open(outfile+".tmp","wb",**kwargs) as destination:
+            shutil.copyfileobj(source,destination,STREAM_BLOCKSIZE)
+    os.replace(outfile+".tmp",outfile) #Never leave a truncated archive under the final name
+    if remove:
+        os.remove(filename)
+    return outfile
+
 def readfile(filename):
     '''Extract all variables from a raw plasim output file and refactor them into the right shapes
     
@@ -528,7 +668,8 @@ def readfile(filename):
     Parameters
     ----------
     filename : str
-        Path to the output file to read
+        Path to the output file to read. This may be compressed with gzip, bzip2, xz, or zstd (see
+        :py:func:`compressraw`), in which case it is decompressed in memory as it is read.
         
     Returns
     -------
@@ -541,7 +682,7 @@ def readfile(filename):
     else:
         import exoplasimlegacy.pyfft as pyfft
     
-    with open(filename,"rb") as fb:
+    with _openraw(filename) as fb:
         fbuffer = fb.read()
     
     headers, variables = readallvariables(fbuffer)
@@ -583,6 +724,203 @@ def readfile(filename):
 
     return data
 
+def checkraw(filename,code=139,limits=None):
+    '''Check one variable in a raw output file for non-finite or implausible values, without postprocessing.
+    
+    Only the record headers are parsed on the way through the file; the records of the requested 
+    variable are then checked all at once with NumPy. Uncompressed files are memory-mapped, so only
+    the pages holding headers and the variable itself are read. This takes milliseconds, so it can be
+    run as soon as a year finishes, to catch a diverging run before any time is spent postprocessing it.
+    
+    Parameters
+    ----------
+    filename : str
+        Path to the raw output file, which may be compressed (see :py:func:`compressraw`)
+    code : int, optional
+        Variable code to check. Default is 139, surface temperature.
+    limits : tuple, optional
+        (min,max) range of plausible values. If None, ``RAWCHECK_LIMITS`` is used for the code, if it
+        has an entry; otherwise only non-finite values are looked for.
+        
+    Returns
+    -------
+    dict
+        "records" (the number of records found for the code), "nonfinite" (the number of NaN or infinite
+        values), "outofrange" (the number of finite values outside ``limits``), "min" and "max" (of the 
+        finite values, or None), and "ok" (True if records were found and no bad values were).
+    '''
+    import mmap
+    if limits is None:
+        limits = RAWCHECK_LIMITS.get(code)
+    fbuffer = None
+    if _rawcodec(filename) is None and os.path.getsize(filename)>0:
+        with open(filename,"rb") as fileobj:
+            fbuffer = mmap.mmap(fileobj.fileno(),0,access=mmap.ACCESS_READ)
+    else:
+        with _openraw(filename) as fileobj:
+            fbuffer = fileobj.read()
+    try:
+        en = _getEndian(fbuffer)
+        ml,mf = _getwordlength(fbuffer,0,en)
+        size = len(fbuffer)
+        
+        #Walk the record markers; the first header/data pair is the file header (dimensions and sigma)
+        records = []
+        n = 0
+        first = True
+        try:
+            while n<size:
+                headerlength = struct.unpack(en+mf,fbuffer[n:n+ml])[0]
+                header = struct.unpack(en+'8i',fbuffer[n+ml:n+ml+32])
+                n += 2*ml+headerlength
+                datalength = struct.unpack(en+mf,fbuffer[n:n+ml])[0]
+                if not first and header[0]==code:
+                    records.append((n+ml,datalength,header[4]*header[5]))
+                n += 2*ml+datalength
+                first = False
+        except struct.error:
+            n = size+1
+        if n>size:
+            raise Exception("%s is truncated"%filename)
+        
+        summary = {"records":len(records),"nonfinite":0,"outofrange":0,"min":None,"max":None,"ok":False}
+        if len(records)==0:
+            return summary
+        fields = []
+        for offset,datalength,nwords in records:
+            dtype = np.dtype(en+'f%d'%(datalength//nwords))
+            fields.append(np.frombuffer(fbuffer,dtype=dtype,count=nwords,offset=offset))
+        values = np.concatenate(fields)
+        del fields #Release the views, so the memory map can be closed
+        finite = np.isfinite(values)
+        summary["nonfinite"] = int(values.size-np.count_nonzero(finite))
+        if summary["nonfinite"]<values.size:
+            summary["min"] = float(np.min(values[finite]))
+            summary["max"] = float(np.max(values[finite]))
+            if limits is not None:
+                summary["outofrange"] = int(np.count_nonzero((values[finite]<limits[0])|
+                                                             (values[finite]>limits[1])))
+        summary["ok"] = summary["nonfinite"]==0 and summary["outofrange"]==0
+        return summary
+    finally:
+        if isinstance(fbuffer,mmap.mmap):
+            fbuffer.close()
+
+def splitraw(filename,outnames,offset=0,final=True):
+    '''Split a raw output file holding several model years into one raw file per year.
+
+    Records are assigned to years by the date in their headers. Each year's file gets a copy of the
+    file header, and its timesteps are counted from the start of that year rather than the start of
+    the run, so it can be read or postprocessed like the output of a single-year run. The file
+    may still be being written (e.g. by a model launched for several years at once): in that case,
+    pass ``final=False``, and only years followed by a record of a later year are written out. The
+    returned offset can be passed back in to resume from where this call stopped, so years already
+    split out are not read again.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the raw output file (uncompressed)
+    outnames : list(str)
+        Paths to write each year to, in order. The first year found from ``offset`` onward goes
+        to ``outnames[0]``, the next to ``outnames[1]``, and so on.
+    offset : int, optional
+        Byte offset of the first record to read. 0 (default) means the start of the file; to
+        resume, pass the offset returned by the previous call.
+    final : bool, optional
+        If True (default), the file is complete, so the last year found is written out too, and a
+        truncated record is an error. If False, an incomplete record at the end is simply left for
+        a later call.
+
+    Returns
+    -------
+    list(str), int
+        Paths of the year files written by this call, and the offset to resume from.
+    '''
+    written = []
+    with open(filename,"rb") as fileobj:
+        head = fileobj.read(8)
+        if len(head)<8:
+            if final and len(head)>0:
+                raise Exception("%s is truncated"%filename)
+            return written,offset
+        en = _getEndian(head)
+        ml,mf = _getwordlength(head,0,en)
+        
+        def _walk(fbuffer,base):
+            #(offset, year, timestep) of each complete header/data pair in a buffer starting at file 
+            #offset base, and the offset where the complete records end
+            pairs = []
+            n = 0
+            size = len(fbuffer)
+            while n<size:
+                try:
+                    headerlength = struct.unpack(en+mf,fbuffer[n:n+ml])[0]
+                    header = struct.unpack(en+'8i',fbuffer[n+ml:n+ml+32])
+                    datalength = struct.unpack(en+mf,fbuffer[n+2*ml+headerlength:
+                                                             n+3*ml+headerlength])[0]
+                except struct.error:
+                    break
+                if n+4*ml+headerlength+datalength>size:
+                    break
+                pairs.append((base+n,header[2]//10000,header[6]))
+                n += 4*ml+headerlength+datalength
+            return pairs,base+n
+        
+        #The file header (dimensions and sigma) is the first header/data pair; read only that much of
+        #the file before the offset, so polling a growing file doesn't re-read it
+        fileobj.seek(0)
+        headerlength = struct.unpack(en+mf,fileobj.read(ml))[0]
+        fileobj.seek(ml+headerlength+ml)
+        word = fileobj.read(ml)
+        if len(word)<ml:
+            if final:
+                raise Exception("%s is truncated"%filename)
+            return written,offset
+        headersize = 4*ml+headerlength+struct.unpack(en+mf,word)[0]
+        fileobj.seek(0)
+        fileheader = fileobj.read(headersize)
+        if len(fileheader)<headersize:
+            if final:
+                raise Exception("%s is truncated"%filename)
+            return written,offset
+        word = fileobj.read(ml+32) #Header of the run's first record, to count timesteps from
+        if len(word)<ml+32:
+            if final and len(word)>0:
+                raise Exception("%s is truncated"%filename)
+            return written,offset
+        firststep = struct.unpack(en+'8i',word[ml:])[6]
+        offset = max(offset,headersize)
+        fileobj.seek(offset)
+        fbuffer = fileobj.read()
+    
+    pairs,end = _walk(fbuffer,offset)
+    if end<offset+len(fbuffer) and final:
+        raise Exception("%s is truncated"%filename)
+    pairs.append((end,None,None)) #Where the complete records end
+    first = 0
+    for k in range(1,len(pairs)):
+        if pairs[k][1]==pairs[first][1]:
+            continue
+        if pairs[k][1] is None and not final: #This year may not be finished yet
+            break
+        if len(written)>=len(outnames):
+            raise Exception("%s holds more years than the %d output names given"%(filename,len(outnames)))
+        outname = outnames[len(written)]
+        start = pairs[first][0]-offset
+        records = bytearray(fbuffer[start:pairs[k][0]-offset])
+        shift = pairs[first][2]-firststep #Timesteps are counted from the start of the run
+        if shift!=0:
+            for pair in pairs[first:k]:
+                struct.pack_into(en+'i',records,pair[0]-offset-start+ml+24,pair[2]-shift)
+        with open(outname+".tmp","wb") as yearfile:
+            yearfile.write(fileheader)
+            yearfile.write(records)
+        os.replace(outname+".tmp",outname) #Never expose a partial year
+        written.append(outname)
+        first = k
+    return written,pairs[first][0]
+
 def _transformvar(lon,lat,variable,meta,nlat,nlon,nlev,ntru,ntime,mode='grid',
                   substellarlon=180.0,physfilter=False,zonal=False,presync=False):
     '''Ensure a variable is in a given horizontal mode.
@@ -1271,7 +1609,7 @@ def dataset(filename, variablecodes, mode='grid', zonal=False, substellarlon=180
     Parameters
     ----------
     filename : str
-        Path to the raw output file
+        Path to the raw output file, which may be compressed (see :py:func:`compressraw`)
     variablecodes : array-like
         list of variables to include. Can be the integer variable codes from the burn7 postprocessor
         conventions (as either strings or integers), or the short variable name strings 
@@ -1311,6 +1649,7 @@ def dataset(filename, variablecodes, mode='grid', zonal=False, substellarlon=180
     dict
         Dictionary of extracted variables
     '''
+    import scipy.integrate
     
     plarad = radius*6371220.0 #convert Earth radii to metres
     
@@ -2087,7 +2426,7 @@ def advancedDataset(filename, variablecodes, substellarlon=180.0,
     Parameters
     ----------
     filename : str
-        Path to the raw output file
+        Path to the raw output file, which may be compressed (see :py:func:`compressraw`)
     variablecodes : dict
         Variables to include. Each member must use the variable name as the key, and contain a sub-dict
         with the horizontal mode, zonal averaging, and physics filtering  options optionall set as 
@@ -2131,6 +2470,7 @@ def advancedDataset(filename, variablecodes, substellarlon=180.0,
     dict
         Dictionary of extracted variables
     '''
+    import scipy.integrate
     
     plarad = radius*6371220.0 #convert Earth radii to metres
     
@@ -2915,7 +3255,157 @@ def advancedDataset(filename, variablecodes, substellarlon=180.0,
     return rdataset
 
                 
-def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
+def _profile(name):
+    '''Settings of a named compression profile, raising a ValueError that lists the profiles if it is unknown.'''
+    if name not in COMPRESSION_PROFILES:
+        raise ValueError("Unknown compression profile '%s'. Supported profiles are:\n\t\n\t%s"%(name,
+                         "\n\t".join(COMPRESSION_PROFILES)))
+    return COMPRESSION_PROFILES[name]
+
+def _compressionsettings(compression,overrides,key):
+    '''Resolve the compression settings for one variable.
+    
+    Parameters
+    ----------
+    compression : str or dict or None
+        Either the name of one of the profiles in ``COMPRESSION_PROFILES``, or a dictionary of settings
+        (any settings it leaves out are taken from the "balanced" profile). If None, None is returned
+        unless there is an override for ``key``, and the writer falls back to its historical settings.
+    overrides : dict or None
+        Dictionary of per-variable settings dictionaries (or profile names), keyed by variable name. 
+        These are layered on top of ``compression``.
+    key : str
+        The variable name
+        
+    Returns
+    -------
+    dict or None
+        Dictionary with the keys 'codec', 'level', 'shuffle', 'checksum', 'precision', and 'keepbits'.
+        
+    Raises
+    ------
+    ValueError
+        If ``compression`` or the override for ``key`` names a profile that does not exist.
+    '''
+    override = None
+    if overrides is not None and key in overrides:
+        override = overrides[key]
+    if compression is None and override is None:
+        return None
+    settings = dict(COMPRESSION_PROFILES["balanced"])
+    if type(compression)==str:
+        settings.update(_profile(compression))
+    elif compression is not None:
+        settings.update(compression)
+    if override is not None:
+        if type(override)==str:
+            settings.update(_profile(override))
+        else:
+            settings.update(override)
+    return settings
+
+def _quantize(data,settings):
+    '''Apply the lossy part of a compression profile (precision and bit-rounding) to an array.
+    
+    Quantized data contains long runs of identical trailing bits, which the lossless codecs can then 
+    compress much more effectively.
+    
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Data to quantize
+    settings : dict or None
+        Settings as returned by :py:func:`_compressionsettings`.
+        
+    Returns
+    -------
+    numpy.ndarray
+        Quantized float32 data (float16 if that precision was requested)
+    '''
+    data = np.asarray(data).astype("float32")
+    if settings is None:
+        return data
+    precision = settings["precision"]
+    if precision=="float16":
+        return data.astype("float16")
+    if precision is not None: #Keep this many decimal digits, as netCDF's least_significant_digit does
+        bits = np.ceil(np.log2(10.0**int(precision)))
+        scale = 2.0**bits
+        data = (np.around(scale*data)/scale).astype("float32")
+    keepbits = settings["keepbits"]
+    if keepbits is not None and int(keepbits)<23: #Round the float32 mantissa to keepbits bits
+        drop = 23-int(keepbits)
+        ints = data.view(np.uint32)
+        half = np.uint32(1<<(drop-1))
+        mask = np.uint32((0xFFFFFFFF>>drop)<<drop)
+        ints = ((ints + half - np.uint32(1) + ((ints>>np.uint32(drop))&np.uint32(1))) & mask)
+        data = ints.view(np.float32)
+    return data
+
+def _ncfilters(settings):
+    '''Translate compression settings into netCDF4 ``createVariable`` keywords.'''
+    if settings is None: #Historical defaults
+        return {"zlib":True,"least_significant_digit":6}
+    level = settings["level"]
+    if settings["codec"] is None or not level:
+        return {"zlib":False,"shuffle":False,"fletcher32":bool(settings["checksum"])}
+    return {"zlib":True,"complevel":int(level),"shuffle":bool(settings["shuffle"]),
+            "fletcher32":bool(settings["checksum"])}
+
+def _h5filters(settings):
+    '''Translate compression settings into h5py ``create_dataset`` keywords.'''
+    if settings is None: #Historical defaults
+        return {"compression":"gzip","compression_opts":9,"shuffle":True,"fletcher32":True}
+    filters = {"shuffle":bool(settings["shuffle"]),"fletcher32":bool(settings["checksum"])}
+    if settings["codec"]=="lzf":
+        filters["compression"] = "lzf"
+    elif settings["codec"] is None or not settings["level"]:
+        filters["shuffle"] = False
+    else:
+        filters["compression"] = "gzip"
+        filters["compression_opts"] = int(settings["level"])
+    return filters
+
+def _timeserieschunks(shape):
+    '''Chunk shape for an appendable variable that will mostly be read as time series.
+    
+    The time axis (always the first axis) gets ``TIMESERIES_CHUNK`` timestamps per chunk, and the 
+    largest of the remaining dimensions is halved until the chunk holds at most ``TIMESERIES_CHUNKSIZE`` 
+    values, so a grid variable ends up as many timestamps by a lat/lon tile.
+    '''
+    chunk = [TIMESERIES_CHUNK,]+list(shape[1:])
+    while np.prod(chunk)>TIMESERIES_CHUNKSIZE and max(chunk[1:]+[1,])>1:
+        axis = len(chunk)-1-int(np.argmax(chunk[:0:-1])) #Prefer trailing (horizontal) axes on ties
+        chunk[axis] = (chunk[axis]+1)//2
+    return tuple(chunk)
+
+def _chunkshape(chunks,key,shape):
+    '''Resolve the ``chunks`` writer option for one variable (None means the library default).'''
+    if chunks is None:
+        return None
+    if type(chunks)==dict:
+        if key in chunks:
+            return tuple(chunks[key])
+        return None
+    if chunks=="timeseries":
+        return _timeserieschunks(shape)
+    raise Exception("Unknown chunk layout '%s'. Use None, 'timeseries', or a dictionary of chunk "%chunks+
+                    "shapes keyed by variable name.")
+
+def _appendstart(years,year):
+    '''Index along the time axis at which a given year should be written into a store.
+    
+    Records from ``year`` onward (or marked -1 by an earlier rewind) are superseded, e.g. when a
+    crash-tolerant run rewinds and repeats a few years, so the new year is written over them.
+    '''
+    years = np.asarray(years)
+    superseded = np.where((years>=year)|(years<0))[0]
+    if len(superseded)>0:
+        return int(superseded[0])
+    return len(years)
+
+def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None,compression=None,
+           compressionoverrides=None,chunks=None,year=None):
     '''Write a dataset to a netCDF file.
     
     Parameters
@@ -2929,6 +3419,24 @@ def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
     logfile : str or None, optional
         If None, log diagnostics will get printed to standard output. Otherwise, the log file
         to which diagnostic output should be written.
+    compression : str or dict or None, optional
+        Compression profile to use for data variables: one of "fast", "balanced", or "archive" (see
+        ``COMPRESSION_PROFILES``), or a dictionary of settings. If None (default), variables are written 
+        with zlib compression and ``least_significant_digit=6``. netCDF has no half-precision type, so 
+        a "float16" precision rounds the data to float16 values, but stores them as float32.
+    compressionoverrides : dict, optional
+        Per-variable compression settings (or profile names), keyed by variable name, which take 
+        precedence over ``compression``.
+    chunks : str or dict or None, optional
+        Chunk layout for data variables when the file is created. If None (default), netCDF's default
+        chunking is used. If "timeseries", chunks span many timestamps and a horizontal tile (see
+        ``TIMESERIES_CHUNK``), which suits a file that will be appended to year after year and read
+        as time series. A dictionary of chunk shapes keyed by variable name may also be given.
+    year : int or None, optional
+        If given, the model year of this dataset, which is recorded for each timestamp in an integer
+        ``year`` variable along the time dimension. When appending, any records already in the file for
+        this year or later years (e.g. from before a crash-tolerant rewind) are overwritten; records 
+        left over past the end of the new data are marked with year -1.
         
     Returns
     -------
@@ -2960,9 +3468,15 @@ def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
         
         ntimes0 = len(ncd.variables["time"][:])
         t0 = ntimes0
+        if year is not None and "year" in ncd.variables:
+            t0 = _appendstart(ncd.variables["year"][:],year)
         t1 = t0+ntimes
         times = ncd.variables['time']
         times[t0:t1] = np.array(timestamp[0]).astype("float32")
+        if year is not None and "year" in ncd.variables:
+            ncd.variables["year"][t0:t1] = np.full(ntimes,year,dtype="int32")
+            if t1<ntimes0: #Leftovers from a longer run of the same years; mark them as superseded
+                ncd.variables["year"][t1:ntimes0] = np.full(ntimes0-t1,-1,dtype="int32")
     else:
         ncd = nc.Dataset(filename, "w", format="NETCDF4")
         
@@ -3054,6 +3568,14 @@ def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
         
         levels.positive  = "down"
         hlevels.positive = "down"
+        
+        if year is not None:
+            years = ncd.createVariable("year","i4",("time",),zlib=True)
+            years.set_auto_mask(False)
+            years[:] = np.full(ntimes,year,dtype="int32")
+            years.units = "years"
+            years.standard_name = "model_year"
+            years.long_name = "model year (-1 marks superseded records)"
     
     keyvars = list(rdataset.keys())
     keyvars.remove("time")
@@ -3070,12 +3592,17 @@ def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
             _log(logfile,meta)
             raise
         shape = datavar.shape
+        settings = _compressionsettings(compression,compressionoverrides,key)
+        if settings is not None:
+            datavar = _quantize(datavar,settings).astype("float32")
+        filters = _ncfilters(settings)
+        if dims[0]=="time":
+            filters["chunksizes"] = _chunkshape(chunks,key,[n for n,d in zip(shape,dims) if d!="complex"])
         if "complex" in dims: #Complex dtype
             dims = dims[:-1]
             if not append:
                 try:
-                    variable = ncd.createVariable(key,complex64_t,dims,zlib=True,
-                                                  least_significant_digit=6)
+                    variable = ncd.createVariable(key,complex64_t,dims,**filters)
                 except:
                     _log(logfile,meta)
                     raise
@@ -3088,7 +3615,7 @@ def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
         else:
             if not append:
                 try:
-                    variable = ncd.createVariable(key,"f4",dims,zlib=True,least_significant_digit=6)
+                    variable = ncd.createVariable(key,"f4",dims,**filters)
                 except:
                     _log(logfile,meta)
                     raise
@@ -3115,7 +3642,7 @@ def netcdf(rdataset,filename="most_output.nc",append=False,logfile=None):
     ncd.sync()
     return ncd
     
-def npsavez(rdataset,filename="most_output.npz",logfile=None):
+def npsavez(rdataset,filename="most_output.npz",logfile=None,compression=None,compressionoverrides=None):
     '''Write a dataset to a NumPy compressed .npz file.
     
     Two output files will be created: filename as specified (e.g. most_output.npz), which contains the
@@ -3131,6 +3658,11 @@ def npsavez(rdataset,filename="most_output.npz",logfile=None):
     logfile : str or None, optional
         If None, log diagnostics will get printed to standard output. Otherwise, the log file
         to which diagnostic output should be written.
+    compression : str or dict or None, optional
+        Compression profile (see :py:func:`netcdf`). The ZIP archive is either deflated or not, so 
+        only the profile's precision settings and whether its codec is None are used here.
+    compressionoverrides : dict, optional
+        Per-variable precision settings (or profile names), keyed by variable name.
         
     Returns
     -------
@@ -3157,7 +3689,8 @@ def npsavez(rdataset,filename="most_output.npz",logfile=None):
     keyvars.remove("levp")
     keyvars.remove("time")
     for key in keyvars:
-        variables[key] = rdataset[key][0].astype("float32")
+        variables[key] = _quantize(rdataset[key][0],
+                                   _compressionsettings(compression,compressionoverrides,key))
         vmeta = rdataset[key][1]
         for n in range(len(vmeta)):
             if type(vmeta[n])==tuple or type(vmeta[n])==list:
@@ -3167,13 +3700,106 @@ def npsavez(rdataset,filename="most_output.npz",logfile=None):
     metafilename = filename[:-4]+"_metadata.npz"
     
     np.savez_compressed(metafilename,**meta)
-    np.savez_compressed(filename,**variables)
+    settings = _compressionsettings(compression,None,"")
+    if settings is not None and (settings["codec"] is None or not settings["level"]):
+        np.savez(filename,**variables)
+    else:
+        np.savez_compressed(filename,**variables)
+    return (variables,meta)
+
+def npydir(rdataset,filename="most_output.npyd",logfile=None,compression=None,compressionoverrides=None):
+    '''Write a dataset to an uncompressed, memory-mappable directory of NumPy .npy files.
+
+    A directory named ``filename`` will be created, containing one .npy file per variable and a
+    ``metadata.json`` file, which contains the metadata headers associated with each variable. Because
+    the arrays are stored uncompressed, they can be opened with ``np.load(mmap_mode='r')``, so that
+    reading a few slices of a large variable only reads the pages that are actually used. The price is
+    disk usage comparable to the uncompressed tarball format.
+
+    Parameters
+    ----------
+    rdataset : dict
+        A dictionary of outputs as generated from :py:func:`pyburn.dataset()<exoplasimlegacy.pyburn.dataset>`
+    filename : str, optional
+        Path to the output directory that should be written.
+    logfile : str or None, optional
+        If None, log diagnostics will get printed to standard output. Otherwise, the log file
+        to which diagnostic output should be written.
+    compression : str or dict or None, optional
+        Compression profile (see :py:func:`netcdf`). Files in this format are never compressed, so
+        only the profile's precision settings are used (e.g. "float16" halves the size on disk).
+    compressionoverrides : dict, optional
+        Per-variable precision settings (or profile names), keyed by variable name.
+
+    Returns
+    -------
+    tuple
+        A 2-item tuple containing (variables, meta), each of which is a
+        dictionary with variable names as keys.
+    '''
+    import json, shutil
+
+    filename = filename.rstrip("/")
+    if os.path.isdir(filename):
+        shutil.rmtree(filename) #Overwrite, as the other formats do
+    os.makedirs(filename)
+
+    variables = {}
+    meta = {}
+    dimvars = ["lat","lon","lev","levp","time"]
+    for key in rdataset:
+        if key in dimvars:
+            variables[key] = np.asarray(rdataset[key][0])
+        else:
+            variables[key] = _quantize(rdataset[key][0],
+                                       _compressionsettings(compression,compressionoverrides,key))
+        vmeta = list(rdataset[key][1])
+        for n in range(len(vmeta)):
+            if type(vmeta[n])==tuple or type(vmeta[n])==list:
+                vmeta[n] = '/'.join(vmeta[n])
+        meta[key] = [str(item) for item in vmeta]
+        np.save(os.path.join(filename,key+".npy"),variables[key])
+        if key not in dimvars:
+            _log(logfile,"Packing %8s in %s\t....... %d timestamps"%(key,filename,variables[key].shape[0]))
+
+    with open(os.path.join(filename,"metadata.json"),"w") as jsonf:
+        json.dump(meta,jsonf,indent=1)
     return (variables,meta)
+
+def _csvtext(data,header):
+    '''Format an array as CSV text, byte-for-byte as ``np.savetxt(fname,data,header=header,delimiter=',')``.
     
-def _writecsvs(filename,variables,meta,extension=None,logfile=None):
-    '''Write CSV output files
+    Rather than formatting one row at a time, whole blocks of ``CSV_BLOCKSIZE`` values are formatted
+    with a single ``%`` operation, and the result is returned as bytes instead of being written to disk.
     
-    Files are placed in a subdirectory named from the filename naming pattern (stripping off the extension).
+    Parameters
+    ----------
+    data : numpy.ndarray
+        1-D or 2-D array to format
+    header : str
+        Header line(s), which will be prefixed with '# '
+        
+    Returns
+    -------
+    bytes
+        The CSV file contents
+    '''
+    data = np.asarray(data)
+    if data.ndim==1:
+        data = np.reshape(data,(len(data),1))
+    nrows,ncols = data.shape
+    rowformat = ",".join(["%.18e"]*ncols)+"\n"
+    blocksize = max(CSV_BLOCKSIZE//max(ncols,1),1)
+    text = ["# "+header.replace("\n","\n# ")+"\n",]
+    for n in range(0,nrows,blocksize):
+        rows = data[n:n+blocksize]
+        text.append((rowformat*len(rows))%tuple(rows.ravel().tolist()))
+    return "".join(text).encode("latin1")
+
+def _csvmembers(filename,variables,meta,extension=None):
+    '''Encode each variable of a dataset as a CSV file in memory, one at a time.
+    
+    Only one variable's text is held in memory at once, and nothing is written to disk.
     
     Parameters
     ----------
@@ -3185,15 +3811,13 @@ def _writecsvs(filename,variables,meta,extension=None,logfile=None):
         Dictionary of metadata fields for associated variables
     extension : str, optional
         File extension to use for individual files
-    logfile : str or None, optional
-        If None, log diagnostics will get printed to standard output. Otherwise, the log file
-        to which diagnostic output should be written.
         
-    Returns
-    -------
-    list, str 
-        List of paths to output files, and the containing directory.
+    Yields
+    ------
+    str, str, bytes
+        Output path, variable name, and encoded file contents
     '''
+    import gzip
     idx = filename[::-1].find(".")+1 #Index of last period separator (negative)
     dirname = filename[:-idx]
     if dirname[-4:]==".tar":
@@ -3204,48 +3828,77 @@ def _writecsvs(filename,variables,meta,extension=None,logfile=None):
     fname = dirname
     if "/" in dirname:
         fname = dirname.split("/")[-1]
-    os.system("mkdir %s"%dirname) #Create a subdirectory that just omits the file extension
-    files = []
     dimvars = ["lat","lon","lev","levp","time"]
     keyvars = list(variables.keys())
     for var in dimvars:
         outname =  "%s/%s_%s%s"%(dirname,fname,var,extension)
-        np.savetxt(outname,variables[var].astype("float32"),
-                   header=(str(len(variables[var]))+",|||,"
-                          +','.join(meta[var])),delimiter=',')
+        text = _csvtext(variables[var].astype("float32"),str(len(variables[var]))+",|||,"+','.join(meta[var]))
+        if outname[-3:]==".gz":
+            text = gzip.compress(text) #Same compression level (9) as np.savetxt's gzip files
+        yield outname,var,text
         keyvars.remove(var)
-        files.append(outname)
-    maxlen = 0
-    for var in keyvars:
-        maxlen = max(maxlen,len("%s/%s_%s%s"%(dirname,fname,var,extension)))
-    maxlen+=1
     for var in keyvars:
         #This creates e.g. most_output/most_output_ts.csv if filename was most_output.csv
         shape = variables[var].shape
         dim2 = shape[-1]
         dim1 = int(np.prod(shape[:-1]))
-        var2d = np.reshape(variables[var],(dim1,dim2)) #np.savetxt can only handle 2 dimensions
+        var2d = np.reshape(variables[var],(dim1,dim2)) #CSV files can only handle 2 dimensions
         outname =  "%s/%s_%s%s"%(dirname,fname,var,extension)
         try:
-            np.savetxt(outname,var2d.astype("float32"),
-                   header=(','.join(np.array(shape).astype(str))+",|||,"
-                          +','.join(meta[var][:-1])+",".join(meta[var][-1])),delimiter=',')
+            #The original shape of the array to which it should be reshaped on unpacking is in the header,
+            #with the actual metadata separated from the shape by '|||'
+            header = (','.join(np.array(shape).astype(str))+",|||,"
+                      +','.join(meta[var][:-1])+",".join(meta[var][-1]))
         except:
             print(",".join(np.array(shape).astype(str)))
-            print(",|||,")
             print(meta[var])
-            print(','.join(meta[var]))
-            print(','.join(np.array(shape).astype(str))+",|||,"
-                          +','.join(meta[var]))
             raise
-        #The original shape of the array to which it should be reshaped on unpacking is in the header,
-        #with the actual metadata separated from the shape by '|||'
+        text = _csvtext(var2d.astype("float32"),header)
+        if outname[-3:]==".gz":
+            text = gzip.compress(text)
+        yield outname,var,text
+
+def _writecsvs(filename,variables,meta,extension=None,logfile=None):
+    '''Write CSV output files
+    
+    Files are placed in a subdirectory named from the filename naming pattern (stripping off the extension).
+    
+    Parameters
+    ----------
+    filename : str
+        Filename pattern
+    variables : dict
+        Dictionary of variable data arrays
+    meta : dict
+        Dictionary of metadata fields for associated variables
+    extension : str, optional
+        File extension to use for individual files
+    logfile : str or None, optional
+        If None, log diagnostics will get printed to standard output. Otherwise, the log file
+        to which diagnostic output should be written.
+        
+    Returns
+    -------
+    list, str 
+        List of paths to output files, and the containing directory.
+    '''
+    files = []
+    dirname = None
+    maxlen = 0
+    for outname,var,text in _csvmembers(filename,variables,meta,extension=extension):
+        if dirname is None:
+            dirname = outname[:outname.rfind("/")]
+            os.makedirs(dirname,exist_ok=True) #Create a subdirectory that just omits the file extension
+            maxlen = max([len(outname)-len(var)+len(key) for key in variables])+1
+        with open(outname,"wb") as outf:
+            outf.write(text)
         files.append(outname)
-        try:
-            writeline = "Writing %8s to %"+str(maxlen)+"s\t....... %d timestamps"
-            _log(logfile,writeline%(var,outname,variables[var].shape[0]))
-        except:
-            _log(logfile,"Writing %8s to %s"%(var,filename))
+        if var not in ("lat","lon","lev","levp","time"):
+            try:
+                writeline = "Writing %8s to %"+str(maxlen)+"s\t....... %d timestamps"
+                _log(logfile,writeline%(var,outname,variables[var].shape[0]))
+            except:
+                _log(logfile,"Writing %8s to %s"%(var,filename))
     return files,dirname+"/"
     
 def csv(rdataset,filename="most_output.tar.gz",logfile=None,extracompression=False):
@@ -3255,7 +3908,7 @@ def csv(rdataset,filename="most_output.tar.gz",logfile=None,extracompression=Fal
     gzip (.gz), bzip2 (.bz2), and lzma (.xz) compression types are supported. If a tarball format is 
     not used, then accepted file extensions are .csv, .txt, or .gz. All three will produce a directory
     named following the filename pattern, with one file per variable in the directory. If the .gz extension
-    is used, NumPy will compress each output file using gzip compression. 
+    is used, each output file will be compressed with gzip. 
     
     Files will only contain 2D
     variable information, so the first N-1 dimensions will be flattened. The original variable shape is
@@ -3264,6 +3917,9 @@ def csv(rdataset,filename="most_output.tar.gz",logfile=None,extracompression=Fal
     files, they should be reshaped according to these dimensions. This is true even in tarballs (which 
     contain CSV files).
     
+    Variables are formatted in memory, a block of rows at a time, and streamed straight into the
+    tarball (which tarfile compresses as it goes), so no intermediate files are written.
+    
     Parameters
     ----------
     rdataset : dict
@@ -3292,54 +3948,29 @@ def csv(rdataset,filename="most_output.tar.gz",logfile=None,extracompression=Fal
     
     fileparts = filename.split('.')
 
-    if fileparts[-2]=="tar": #We will be doing compression
-        import tarfile
+    if fileparts[-2]=="tar" or fileparts[-1]=="tar": #Stream the files straight into a tarball
+        import io, tarfile, time
         ext = ".csv"
         if extracompression:
             ext = ".gz"
-        files,dirname = _writecsvs(filename,variables,meta,extension=ext,logfile=logfile)
         namelen = len(filename)
-        with tarfile.open(filename,"w:%s"%fileparts[-1]) as tarball:
-            
+        mode = "w"
+        if fileparts[-1]!="tar":
+            mode = "w:%s"%fileparts[-1]
+        with tarfile.open(filename,mode) as tarball:
             maxlen = 0
-            for tfile in files:
-                maxlen = max(maxlen,len(tfile))
-            for var in files:
+            for var,key,text in _csvmembers(filename,variables,meta,extension=ext):
+                maxlen = max(maxlen,len(var))
                 varname = var
-                if len(varname.split("/"))>2:
+                if fileparts[-1]!="tar" and len(varname.split("/"))>2:
                     varname = "/".join(varname.split("/")[-2:])
-                tarball.add(var,arcname=varname)
+                info = tarfile.TarInfo(varname.lstrip("/"))
+                info.size = len(text)
+                info.mtime = int(time.time())
+                info.mode = 0o644
+                tarball.addfile(info,io.BytesIO(text))
                 writeline = "Packing %"+str(maxlen)+"s in %"+str(namelen)+"s"
-                try:
-                    _log(logfile,(writeline+" ....... %d timestamps")%(var,filename,
-                                                                  rdataset[var][0].shape[0]))
-                except:
-                    _log(logfile,writeline%(var,filename))
-        os.system("rm -rf %s"%dirname)
-        return filename
-        
-    elif fileparts[-1]=="tar": #We're still making a tarball, but it won't be compressed
-        import tarfile
-        ext = ".csv"
-        if extracompression:
-            ext = ".gz"
-        files,dirname = _writecsvs(filename,variables,meta,extension=ext,logfile=logfile)
-        namelen = len(filename)
-        
-        with tarfile.open(filename,"w") as tarball:
-            
-            maxlen = 0
-            for tfile in files:
-                maxlen = max(maxlen,len(tfile))
-            for var in files:
-                tarball.add(var)
-                writeline = "Packing %"+str(maxlen)+"s in %"+str(namelen)+"s"
-                try:
-                    _log(logfile,(writeline+"\t....... %d timestamps")%(var,filename,
-                                                                  rdataset[var][0].shape[0]))
-                except:
-                    _log(logfile,writeline%(var,filename))
-        os.system("rm -rf %s"%dirname)
+                _log(logfile,writeline%(var,filename))
         return filename
         
     else: #Just a collection of CSV/TXT-type files in a subdirectory, which may be individually-compressed.
@@ -3347,14 +3978,15 @@ def csv(rdataset,filename="most_output.tar.gz",logfile=None,extracompression=Fal
         files,dirname = _writecsvs(filename,variables,meta,logfile=logfile)
         return files,dirname
      
-def hdf5(rdataset,filename="most_output.hdf5",append=False,logfile=None):
+def hdf5(rdataset,filename="most_output.hdf5",append=False,logfile=None,compression=None,
+         compressionoverrides=None,chunks=None,year=None):
     '''Write a dataset to HDF5 output.
     
     Note: HDF5 files are opened in append mode. This means that this format can be used to create
     a single output dataset for an entire simulation.
     
-    HDF5 files here are generated with gzip compression at level 9, with chunk rearrangement and
-    Fletcher32 checksum data protection.
+    By default, HDF5 files here are generated with gzip compression at level 9, with chunk rearrangement and
+    Fletcher32 checksum data protection. This can be changed with the ``compression`` profile.
     
     Parameters
     ----------
@@ -3367,6 +3999,23 @@ def hdf5(rdataset,filename="most_output.hdf5",append=False,logfile=None):
     logfile : str or None, optional
         If None, log diagnostics will get printed to standard output. Otherwise, the log file
         to which diagnostic output should be written.
+    compression : str or dict or None, optional
+        Compression profile to use for data variables: one of "fast", "balanced", or "archive" (see
+        ``COMPRESSION_PROFILES``), or a dictionary of settings. The "lzf" codec and "float16" precision
+        are supported natively. If None (default), gzip level 9, shuffle, and Fletcher32 are used.
+    compressionoverrides : dict, optional
+        Per-variable compression settings (or profile names), keyed by variable name, which take 
+        precedence over ``compression``.
+    chunks : str or dict or None, optional
+        Chunk layout for data variables when they are created. If None (default), h5py picks the chunk
+        shape. If "timeseries", chunks span many timestamps and a horizontal tile (see 
+        ``TIMESERIES_CHUNK``), which suits a file that will be appended to year after year and read as
+        time series. A dictionary of chunk shapes keyed by variable name may also be given.
+    year : int or None, optional
+        If given, the model year of this dataset, which is recorded for each timestamp in an integer
+        ``year`` dataset along the time axis. When appending, any records already in the file for this
+        year or later years (e.g. from before a crash-tolerant rewind) are dropped before the new data
+        are written.
         
     Returns
     -------
@@ -3411,10 +4060,26 @@ def hdf5(rdataset,filename="most_output.hdf5",append=False,logfile=None):
         hdfile.create_dataset("levp",data=levelp[0].astype('float32'),compression='gzip',
                               compression_opts=9,shuffle=True,fletcher32=True)
         hdfile.attrs["levp"] = np.array(levelp[1]).astype('S') #Store metadata
+    ntimes = len(time[0])
     if "time" not in hdfile:
-        hdfile.create_dataset("time",data=time[0].astype('float32'),compression='gzip',
+        t0 = 0
+        hdfile.create_dataset("time",data=time[0].astype('float32'),maxshape=(None,),compression='gzip',
                               compression_opts=9,shuffle=True,fletcher32=True)
         hdfile.attrs["time"] = np.array(time[1]).astype('S') #Store metadata
+        if year is not None:
+            hdfile.create_dataset("year",data=np.full(ntimes,year,dtype="int32"),maxshape=(None,),
+                                  compression='gzip',compression_opts=9,shuffle=True,fletcher32=True)
+            hdfile.attrs["year"] = np.array(["year","model_year","years"]).astype('S') #Store metadata
+    elif hdfile["time"].maxshape[0] is None:
+        t0 = hdfile["time"].shape[0]
+        if year is not None and "year" in hdfile:
+            t0 = _appendstart(hdfile["year"][:],year)
+            hdfile["year"].resize(t0+ntimes,axis=0)
+            hdfile["year"][t0:] = np.full(ntimes,year,dtype="int32")
+        hdfile["time"].resize(t0+ntimes,axis=0) #Expand (or truncate) the time axis
+        hdfile["time"][t0:] = time[0].astype('float32')
+    else: #Older files have a fixed-length time axis; just append each variable at its end
+        t0 = None
     
     for var in keyvars:
         if var not in hdfile:
@@ -3422,8 +4087,10 @@ def hdf5(rdataset,filename="most_output.hdf5",append=False,logfile=None):
             for dim in rdataset[var][0].shape[1:]:
                 maxshape.append(dim)
             maxshape=tuple(maxshape)
-            hdfile.create_dataset(var,data=rdataset[var][0].astype("float32"),compression="gzip",
-                                  maxshape=maxshape,compression_opts=9,shuffle=True,fletcher32=True)
+            settings = _compressionsettings(compression,compressionoverrides,var)
+            hdfile.create_dataset(var,data=_quantize(rdataset[var][0],settings),maxshape=maxshape,
+                                  chunks=_chunkshape(chunks,var,rdataset[var][0].shape),
+                                  **_h5filters(settings))
             #_log(logfile,rdataset[var][1])
             #_log(logfile,np.array(rdataset[var][1]).astype('S'))
             meta = rdataset[var][1]
@@ -3433,15 +4100,94 @@ def hdf5(rdataset,filename="most_output.hdf5",append=False,logfile=None):
             except:
                 _log(logfile,meta)
         else:
-            hdfile[var].resize((hdfile[var].shape[0]+rdataset[var][0].shape[0]),axis=0) #Expand file
-            hdfile[var][-rdataset[var][0].shape[0]:] = rdataset[var][0].astype("float32") #Append
+            start = t0
+            if start is None:
+                start = hdfile[var].shape[0]
+            hdfile[var].resize((start+rdataset[var][0].shape[0]),axis=0) #Expand file
+            settings = _compressionsettings(compression,compressionoverrides,var)
+            hdfile[var][start:] = _quantize(rdataset[var][0],settings) #Append
         _log(logfile,"Packing %8s in %s\t....... %d timestamps"%(var,filename,rdataset[var][0].shape[0]))
     return hdfile
              
 
+def _cacheable(outfile):
+    '''Whether an output format has somewhere to keep provenance records (all but CSV directories).'''
+    fileparts = outfile.split('.')
+    if fileparts[-1] in ("csv","txt") or (fileparts[-1]=="gz" and fileparts[-2]!="tar"):
+        return False
+    return True
+
+def _provenancefile(outfile):
+    '''Where provenance records are kept for formats without attributes of their own.'''
+    if outfile.split('.')[-1]=="npyd":
+        return os.path.join(outfile.rstrip("/"),PROVENANCE+".json")
+    return outfile+"."+PROVENANCE+".json"
+
+def _readprovenance(outfile):
+    '''Provenance records of an existing output, keyed by model year ("all" for a whole file).
+    
+    Returns an empty dictionary if the output doesn't exist, has no records, or can't be read.
+    '''
+    import json
+    if not os.path.exists(outfile):
+        return {}
+    fileparts = outfile.split('.')
+    try:
+        if fileparts[-1]=="nc":
+            import netCDF4 as nc
+            with nc.Dataset(outfile,"r") as ncd:
+                if PROVENANCE not in ncd.ncattrs():
+                    return {}
+                text = ncd.getncattr(PROVENANCE)
+        elif fileparts[-1] in ("hdf5","h5","he5"):
+            import h5py
+            with h5py.File(outfile,"r") as hdfile:
+                if PROVENANCE not in hdfile.attrs:
+                    return {}
+                text = hdfile.attrs[PROVENANCE]
+        else:
+            if not os.path.exists(_provenancefile(outfile)):
+                return {}
+            with open(_provenancefile(outfile),"r") as jsonf:
+                text = jsonf.read()
+        if type(text)==bytes:
+            text = text.decode()
+        return json.loads(text)
+    except Exception: #An unreadable record just means the output gets rebuilt
+        return {}
+
+def _writeprovenance(outfile,records,output=None):
+    '''Store provenance records with an output, through ``output`` if the writer still has it open.'''
+    import json
+    text = json.dumps(records,sort_keys=True)
+    fileparts = outfile.split('.')
+    if fileparts[-1]=="nc":
+        if output is None:
+            import netCDF4 as nc
+            with nc.Dataset(outfile,"a") as ncd:
+                ncd.setncattr(PROVENANCE,text)
+        else:
+            output.setncattr(PROVENANCE,text)
+    elif fileparts[-1] in ("hdf5","h5","he5"):
+        if output is None:
+            import h5py
+            with h5py.File(outfile,"a") as hdfile:
+                hdfile.attrs[PROVENANCE] = text
+        else:
+            output.attrs[PROVENANCE] = text
+    elif len(records)==0:
+        if os.path.exists(_provenancefile(outfile)):
+            os.remove(_provenancefile(outfile))
+    else:
+        with open(_provenancefile(outfile)+".tmp","w") as jsonf:
+            jsonf.write(text)
+        os.replace(_provenancefile(outfile)+".tmp",_provenancefile(outfile))
+
 def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='grid',
                 zonal=False, substellarlon=180.0, physfilter=False,timeaverage=True,stdev=False,
-                times=12,interpolatetimes=True,radius=1.0,gravity=9.80665,gascon=287.0,mars=False):
+                times=12,interpolatetimes=True,radius=1.0,gravity=9.80665,gascon=287.0,mars=False,
+                compression=None,compressionoverrides=None,append=False,chunks=None,year=None,
+                cache=True):
     '''Convert a raw output file into a postprocessed formatted file.
     
     Output format is determined by the file extension of outfile. Current supported formats are 
@@ -3449,12 +4195,14 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
     single-array .npy extension is used, .npz will be substituted--this is a compressed ZIP archive 
     containing .npy files. Additionally, the CSV output format can be used in compressed form either
     individually by using the .gz file extension, or collectively via tarballs (compressed or uncompressed).
+    The \*.npyd extension produces a directory of uncompressed .npy files (one per variable) plus a JSON 
+    metadata file, which can be memory-mapped when read with :py:func:`gcmt.load() <exoplasimlegacy.gcmt.load>`.
     
     If a tarball format (e.g. \*.tar or \*.tar.gz) is used, output files will be packed into a tarball.
     gzip (.gz), bzip2 (.bz2), and lzma (.xz) compression types are supported. If a tarball format is 
     not used, then accepted file extensions are .csv, .txt, or .gz. All three will produce a directory
     named following the filename pattern, with one file per variable in the directory. If the .gz extension
-    is used, NumPy will compress each output file using gzip compression. 
+    is used, each output file will be compressed with gzip. 
     
     CSV-type files will only contain 2D
     variable information, so the first N-1 dimensions will be flattened. The original variable shape is
@@ -3491,11 +4239,11 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
     Parameters
     ----------
     rawfile : str
-        Path to the raw output file
+        Path to the raw output file, which may be compressed (see :py:func:`compressraw`)
     outfile : str
         Path to the destination output file. The file extension determines the format. Currently,
-        netCDF (\*.nc). numpy compressed (\*.npz), HDF5 (\*.hdf5, \*.he5, \*.h5), or CSV-type (\*.csv, \*.txt, \*.gz, \*.tar, \*.tar.gz,
-        \*.tar.bz2, \*.tar.xz) are supported. If a format (such as npz) that requires
+        netCDF (\*.nc). numpy compressed (\*.npz), memory-mappable NumPy directories (\*.npyd), HDF5 (\*.hdf5, 
+        \*.he5, \*.h5), or CSV-type (\*.csv, \*.txt, \*.gz, \*.tar, \*.tar.gz, \*.tar.bz2, \*.tar.xz) are supported. If a format (such as npz) that requires
         that metadata be placed in a separate file is chosen, a second file with a '_metadata' suffix will be
         created.
     append : bool, optional
@@ -3553,8 +4301,34 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
         Specific gas constant for dry gas (R$_d$) in J/kg/K.  
     mars : bool, optional
         If True, use Mars constants
+    compression : str or dict or None, optional
+        Compression profile for the netCDF, HDF5, and NumPy writers: "fast" (gzip level 1), "balanced"
+        (gzip level 4, shuffle), or "archive" (gzip level 9, shuffle, Fletcher32 checksums), or a 
+        dictionary with any of the keys 'codec', 'level', 'shuffle', 'checksum', 'precision', and 
+        'keepbits' (see ``COMPRESSION_PROFILES``). If None, each writer uses its historical settings.
+        CSV-type outputs ignore this option.
+    compressionoverrides : dict, optional
+        Per-variable compression settings, keyed by variable name, e.g. 
+        ``{"ta":{"precision":"float16"},"ts":{"keepbits":10}}``. These take precedence over ``compression``.
+    chunks : str or dict or None, optional
+        Chunk layout for netCDF and HDF5 outputs. "timeseries" lays chunks out as many timestamps by a
+        horizontal tile, for files that collect a whole simulation and are read as time series. A 
+        dictionary of chunk shapes keyed by variable name may also be given. If None, the library
+        defaults are used.
+    year : int, optional
+        Model year of the raw file. For netCDF and HDF5 outputs, this is recorded in a ``year`` variable
+        along the time axis, so that individual years can be found in a file that holds many years
+        (see :py:func:`gcmt.load() <exoplasimlegacy.gcmt.load>`).
+    cache : bool, optional
+        If True (default), and ``outfile`` already holds this raw file postprocessed with the same 
+        settings, return without doing anything. Every output (other than directories of CSV files) 
+        records the size, modification time, and SHA-256 hash of its raw file, along with a hash of 
+        the postprocessor settings--in a global attribute for netCDF and HDF5 files (per year, for 
+        files that collect many years), and otherwise in a ``*.pyburn_provenance.json`` file next to 
+        the output. If the raw file's size and modification time are unchanged, it isn't hashed again.
     
     '''
+    import scipy.interpolate
     #Check output format legality
     
     fileparts = outfile.split('.')
@@ -3562,6 +4336,8 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
         pass #OK
     elif fileparts[-1] == "npz" or fileparts[-1] == "npy":
         pass #OK
+    elif fileparts[-1] == "npyd":
+        pass #OK
     elif (fileparts[-1] in ("csv","txt","gz","tar") or \
           (fileparts[-2]+"."+fileparts[-1]) in ("tar.gz","tar.bz2","tar.xz")):
         pass #OK
@@ -3569,6 +4345,52 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
         pass #OK
     else:
         raise Exception("Unsupported output format detected. Supported formats are:\n\t\n\t%s"%("\n\t".join(SUPPORTED)))
+    if append and fileparts[-1] not in ("nc","hdf5","h5","he5"):
+        raise Exception("Appending to an existing output file is only supported for netCDF and HDF5 formats.")
+    append = append and os.path.exists(outfile)
+    
+    #Has this raw file already been postprocessed into outfile with these settings?
+    provenance = None
+    if _cacheable(outfile):
+        namelisttext = None
+        if namelist is not None:
+            with open(namelist,"r") as fname:
+                namelisttext = fname.read()
+        settings = {"namelist":namelisttext,"variables":variables,"mode":mode,"zonal":zonal,
+                    "substellarlon":substellarlon,"physfilter":physfilter,"timeaverage":timeaverage,
+                    "stdev":stdev,"times":times,"interpolatetimes":interpolatetimes,"radius":radius,
+                    "gravity":gravity,"gascon":gascon,"mars":mars,"compression":compression,
+                    "compressionoverrides":compressionoverrides,"chunks":chunks}
+        provkey = "all"
+        if year is not None and fileparts[-1] in ("nc","hdf5","h5","he5"):
+            provkey = str(year)
+        records = _readprovenance(outfile)
+        previous = records.get(provkey)
+        if not append and len(records)>1: #We'd be overwriting a multi-year file with one year
+            previous = None
+        confighash = _confighash(settings)
+        if cache and previous is not None and previous.get("config")==confighash:
+            fingerprint = _fingerprint(rawfile,previous=previous["raw"])
+        else: #Nothing to compare the hash with, so don't read the whole raw file for it
+            fingerprint = _fingerprint(rawfile,digest=False)
+        if cache and previous is not None and previous.get("config")==confighash \
+           and previous["raw"].get("sha256")==fingerprint.get("sha256"):
+            if previous["raw"]["mtime"]!=fingerprint["mtime"]: #Touched but unchanged; don't hash it again
+                records[provkey]["raw"] = fingerprint
+                _writeprovenance(outfile,records)
+            _log(logfile,"%s is up to date with %s; nothing to do."%(outfile,rawfile))
+            return
+        
+        #Drop the records of anything we're about to replace before touching the data, so that a 
+        #crash part-way through can't leave a stale record behind
+        kept = {}
+        if append and year is not None:
+            kept = dict([(key,records[key]) for key in records if key!="all" and int(key)<year])
+        if len(kept)<len(records) and (append or fileparts[-1] not in ("nc","hdf5","h5","he5")):
+            _writeprovenance(outfile,kept)
+        if not append or year is not None:
+            provenance = dict(kept)
+            provenance[provkey] = {"raw":fingerprint,"config":confighash}
     
     _log(logfile,"==================================")
     _log(logfile,"| PYBURN EXOPLASIM POSTPROCESSOR |")
@@ -3856,18 +4678,30 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
     
     fileparts = outfile.split('.')
     if fileparts[-1] == "nc":
-        output=netcdf(data,filename=outfile,logfile=logfile)
+        output=netcdf(data,filename=outfile,append=append,logfile=logfile,compression=compression,
+                      compressionoverrides=compressionoverrides,chunks=chunks,year=year)
+        if provenance is not None:
+            _writeprovenance(outfile,provenance,output=output)
         output.close()
     elif fileparts[-1] == "npz" or fileparts[-1] == "npy":
-        output=npsavez(data,filename=outfile,logfile=logfile)
+        output=npsavez(data,filename=outfile,logfile=logfile,compression=compression,
+                       compressionoverrides=compressionoverrides)
+    elif fileparts[-1] == "npyd":
+        output=npydir(data,filename=outfile,logfile=logfile,compression=compression,
+                      compressionoverrides=compressionoverrides)
     elif (fileparts[-1] in ("csv","txt","gz","tar") or \
           (fileparts[-2]+"."+fileparts[-1]) in ("tar.gz","tar.bz2","tar.xz")):
         output=csv(data,filename=outfile,logfile=logfile)
     elif fileparts[-1] in ("hdf5","h5","he5"):
-        output=hdf5(data,filename=outfile,logfile=logfile)
+        output=hdf5(data,filename=outfile,append=append,logfile=logfile,compression=compression,
+                    compressionoverrides=compressionoverrides,chunks=chunks,year=year)
+        if provenance is not None:
+            _writeprovenance(outfile,provenance,output=output)
         output.close()
     else:
         raise Exception("Unsupported output format detected. Supported formats are:\n\t\n\t%s"%("\n\t".join(SUPPORTED)))
+    if provenance is not None and fileparts[-1] not in ("nc","hdf5","h5","he5"):
+        _writeprovenance(outfile,provenance)
     
     _log(logfile,"\n")
     _log(logfile,"%s closed."%outfile)
@@ -3876,15 +4710,272 @@ def postprocess(rawfile,outfile,logfile=None,namelist=None,variables=None,mode='
     _log(logfile,"================================")
     _log(logfile,"| PYBURN FINISHED SUCCESSFULLY |")
     _log(logfile,"================================")
+
     
+
+def _canonical(obj):
+    '''Convert postprocessor options into plain JSON types, with string keys, so they hash consistently.'''
+    if isinstance(obj,dict):
+        return dict([(str(key),_canonical(value)) for key,value in obj.items()])
+    if isinstance(obj,(list,tuple)):
+        return [_canonical(value) for value in obj]
+    if isinstance(obj,np.ndarray):
+        return obj.tolist()
+    if isinstance(obj,np.generic):
+        return obj.item()
+    return obj
+
+def _confighash(config):
+    '''Canonical SHA-256 hash of a set of postprocessor keyword arguments.'''
+    import hashlib, json
+    text = json.dumps(_canonical(config),sort_keys=True,default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def _fingerprint(filename,previous=None,digest=True):
+    '''Size, modification time, and SHA-256 hash of a file.
     
+    If ``previous`` (an earlier fingerprint) has the same size and modification time, its hash (if it
+    has one) is reused instead of reading the whole file again. If ``digest`` is False, the file is
+    not hashed at all, and only its size and modification time are recorded.
+    '''
+    import hashlib
+    stat = os.stat(filename)
+    fingerprint = {"size":stat.st_size,"mtime":stat.st_mtime}
+    if previous is not None and previous.get("size")==stat.st_size and previous.get("mtime")==stat.st_mtime:
+        if "sha256" in previous:
+            fingerprint["sha256"] = previous["sha256"]
+        return fingerprint
+    if not digest:
+        return fingerprint
+    sha256 = hashlib.sha256()
+    with open(filename,"rb") as fileobj:
+        for block in iter(lambda: fileobj.read(2**20),b""):
+            sha256.update(block)
+    fingerprint["sha256"] = sha256.hexdigest()
+    return fingerprint
+
+def _israw(filename):
+    '''Whether a file looks like raw ExoPlaSim output (starts with the record marker of an 8-word header).
     
-        
+    Compressed raw files are recognized by their decompressed contents.
+    '''
+    if filename.endswith((".json",".log",".tmp")) or \
+       (filename.endswith(tuple(SUPPORTED)) and not filename.endswith(tuple(RAW_COMPRESSION))):
+        return False
+    try:
+        with _openraw(filename) as fileobj:
+            head = fileobj.read(4)
+    except Exception: #Unreadable, or compressed with something we can't open
+        return False
+    if len(head)<4:
+        return False
+    return struct.unpack("<i",head)[0] in (32,64) or struct.unpack(">i",head)[0] in (32,64)
+
+def _reburnfile(rawfile,outfile,kwargs,logfile):
+    '''Postprocess one raw file for :py:func:`reburn`; runs in a worker process and never raises.'''
+    import time
+    tic = time.time()
+    try:
+        fingerprint = _fingerprint(rawfile)
+        postprocess(rawfile,outfile,logfile=logfile,**kwargs)
+        return rawfile,outfile,fingerprint,time.time()-tic,None
+    except Exception as e:
+        return rawfile,outfile,None,time.time()-tic,"%s: %s"%(type(e).__name__,e)
+
+def _savemanifest(manifest,filename):
+    '''Write the reburn manifest atomically, so an interrupted run never leaves it half-written.'''
+    import json
+    with open(filename+".tmp","w") as jsonf:
+        json.dump(manifest,jsonf,indent=1,sort_keys=True)
+    os.replace(filename+".tmp",filename)
+
+def reburn(patterns,config=None,workers=None,extension=".npz",outputdir=None,
+           manifest="reburn_manifest.json",logdir=None,force=False,dryrun=False):
+    '''Re-postprocess many raw output files, across many runs, in parallel.
     
+    Raw files matching ``patterns`` are postprocessed with :py:func:`postprocess` over a pool of 
+    processes, largest files first so that the longest jobs don't end up running alone at the end.
+    Every finished file is recorded in a JSON manifest, together with the SHA-256 hash of the raw
+    file and a hash of the postprocessor options used. Files whose output exists and whose manifest
+    entry matches both hashes are skipped, so an interrupted reburn can simply be run again, and
+    only changed files or settings trigger new work.
     
-
-        
+    Options are read from ``config``, and then from a ``reburn.json`` file in the same directory as 
+    each raw file, if there is one. This is where per-run settings such as ``radius``, ``gravity``, and 
+    ``gascon`` belong.
+    
+    Parameters
+    ----------
+    patterns : str or list
+        Glob pattern(s) matching raw output files, e.g. "runs/*/MOST.*" ("**" is supported). Files that
+        don't look like raw output (e.g. postprocessed files or diagnostic logs) are ignored. Compressed
+        raw files (see :py:func:`compressraw`) are read directly, and their outputs are named without
+        the compression extension.
+    config : str or dict, optional
+        Keyword arguments for :py:func:`postprocess`, or the path to a JSON file containing them. 
+        An "extension" entry sets the output format.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    extension : str, optional
+        Output file extension (format), if not set in ``config``. Default ".npz".
+    outputdir : str, optional
+        If given, outputs are written here, mirroring the directory layout of the raw files. Otherwise
+        each output is written next to its raw file, as ``Model`` does.
+    manifest : str, optional
+        Path to the JSON manifest used to skip up-to-date outputs and resume interrupted reburns.
+    logdir : str, optional
+        Directory for per-file postprocessor logs. If None, logs are discarded.
+    force : bool, optional
+        If True, postprocess every file even if its output is up to date.
+    dryrun : bool, optional
+        If True, only report what would be done.
         
+    Returns
+    -------
+    list
+        One dictionary per raw file, with the keys "raw", "output", "status" ("done", "skipped", 
+        "failed", or "pending" for a dry run), "seconds", and "error".
+    '''
+    import glob, json, time
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    if type(patterns)==str:
+        patterns = [patterns,]
+    if config is None:
+        config = {}
+    elif type(config)==str:
+        with open(config,"r") as jsonf:
+            config = json.load(jsonf)
+    config = dict(config)
+    extension = config.pop("extension",extension)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    rawfiles = []
+    for pattern in patterns:
+        for name in glob.glob(pattern,recursive=True):
+            name = os.path.abspath(name)
+            if os.path.isfile(name) and name not in rawfiles and _israw(name):
+                rawfiles.append(name)
+    #If a raw file is there both compressed and uncompressed (e.g. mid-compression), only read it once
+    rawfiles = [name for name in rawfiles if name==_rawstem(name) or _rawstem(name) not in rawfiles]
+    rawfiles = sorted(rawfiles,key=lambda name: os.path.getsize(name),reverse=True) #Largest first
+    if len(rawfiles)==0:
+        print("No raw output files found matching %s"%(", ".join(patterns)))
+        return []
+    
+    if outputdir is not None:
+        outputdir = os.path.abspath(outputdir)
+        rootdir = os.path.commonpath([os.path.dirname(name) for name in rawfiles])
+    
+    records = {}
+    if os.path.exists(manifest):
+        with open(manifest,"r") as jsonf:
+            records = json.load(jsonf)
+    
+    dirconfigs = {}
+    jobs = []
+    report = []
+    for rawfile in rawfiles:
+        rundir = os.path.dirname(rawfile)
+        if rundir not in dirconfigs: #Per-run options layered over the global configuration
+            dirconfigs[rundir] = dict(config)
+            if os.path.exists(os.path.join(rundir,"reburn.json")):
+                with open(os.path.join(rundir,"reburn.json"),"r") as jsonf:
+                    dirconfigs[rundir].update(json.load(jsonf))
+        kwargs = dict(dirconfigs[rundir])
+        runext = kwargs.pop("extension",extension)
+        if outputdir is None:
+            outfile = _rawstem(rawfile)+runext
+        else:
+            outfile = os.path.join(outputdir,os.path.relpath(_rawstem(rawfile),rootdir))+runext
+        chash = _confighash(dict(kwargs,extension=runext))
+        if force:
+            kwargs["cache"] = False
         
-    
-    
+        entry = records.get(outfile)
+        if not force and entry is not None and entry.get("config")==chash and os.path.exists(outfile):
+            fingerprint = _fingerprint(rawfile,previous=entry)
+            if fingerprint["sha256"]==entry["sha256"]:
+                if fingerprint["mtime"]!=entry["mtime"]: #Touched but unchanged; don't hash it again next time
+                    entry.update(fingerprint)
+                    _savemanifest(records,manifest)
+                report.append({"raw":rawfile,"output":outfile,"status":"skipped","seconds":0.0,
+                               "error":None})
+                continue
+        logfile = os.devnull
+        if logdir is not None:
+            logfile = os.path.join(logdir,os.path.basename(outfile)+".log")
+        jobs.append((rawfile,outfile,kwargs,logfile,chash))
+    
+    print("%d raw files found: %d to postprocess, %d up to date"%(len(rawfiles),len(jobs),len(report)))
+    if dryrun:
+        for rawfile,outfile,kwargs,logfile,chash in jobs:
+            print("  %s -> %s"%(rawfile,outfile))
+            report.append({"raw":rawfile,"output":outfile,"status":"pending","seconds":0.0,"error":None})
+        return report
+    if logdir is not None:
+        os.makedirs(logdir,exist_ok=True)
+    
+    tic = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for rawfile,outfile,kwargs,logfile,chash in jobs:
+            outdir = os.path.dirname(outfile)
+            if outdir!="":
+                os.makedirs(outdir,exist_ok=True)
+            futures[pool.submit(_reburnfile,rawfile,outfile,kwargs,logfile)] = chash
+        ndone = 0
+        for future in as_completed(futures):
+            rawfile,outfile,fingerprint,elapsed,error = future.result()
+            ndone += 1
+            if error is None:
+                records[outfile] = dict(fingerprint,raw=rawfile,config=futures[future],seconds=elapsed)
+                _savemanifest(records,manifest) #Saved after every file, so an interrupted run can resume
+                print("[%d/%d] %8.1f s  %s"%(ndone,len(jobs),elapsed,outfile))
+                report.append({"raw":rawfile,"output":outfile,"status":"done","seconds":elapsed,
+                               "error":None})
+            else:
+                print("[%d/%d] %8.1f s  %s FAILED: %s"%(ndone,len(jobs),elapsed,outfile,error))
+                report.append({"raw":rawfile,"output":outfile,"status":"failed","seconds":elapsed,
+                               "error":error})
+    
+    nfailed = len([item for item in report if item["status"]=="failed"])
+    print("Reburned %d files in %.1f s (%d skipped, %d failed)"%(len(jobs)-nfailed,time.time()-tic,
+                                                                 len(report)-len(jobs),nfailed))
+    return report
+
+def main(argv=None):
+    '''Command-line interface: ``python -m exoplasimlegacy.pyburn reburn <pattern> ...``'''
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m exoplasimlegacy.pyburn",
+                                     description="ExoPlaSim raw output postprocessor")
+    commands = parser.add_subparsers(dest="command")
+    reburnparser = commands.add_parser("reburn",help="Re-postprocess many raw output files in parallel, "+
+                                                     "skipping outputs that are already up to date")
+    reburnparser.add_argument("patterns",nargs="+",help="Glob pattern(s) matching raw output files; "+
+                                                        "quote them to let pyburn expand '**'")
+    reburnparser.add_argument("--config",help="JSON file of pyburn.postprocess() keyword arguments")
+    reburnparser.add_argument("--workers",type=int,default=None,help="Number of worker processes")
+    reburnparser.add_argument("--extension",default=".npz",help="Output format (default .npz)")
+    reburnparser.add_argument("--outputdir",default=None,help="Write outputs here instead of next to "+
+                                                              "the raw files")
+    reburnparser.add_argument("--manifest",default="reburn_manifest.json",
+                              help="Manifest used to skip up-to-date outputs and resume")
+    reburnparser.add_argument("--logdir",default=None,help="Directory for per-file postprocessor logs")
+    reburnparser.add_argument("--force",action="store_true",help="Postprocess even up-to-date files")
+    reburnparser.add_argument("--dry-run",dest="dryrun",action="store_true",
+                              help="Only list what would be postprocessed")
+    args = parser.parse_args(argv)
+    if args.command!="reburn":
+        parser.print_help()
+        return 1
+    report = reburn(args.patterns,config=args.config,workers=args.workers,extension=args.extension,
+                    outputdir=args.outputdir,manifest=args.manifest,logdir=args.logdir,force=args.force,
+                    dryrun=args.dryrun)
+    if len([item for item in report if item["status"]=="failed"])>0:
+        return 2
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
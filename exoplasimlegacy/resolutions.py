@@ -0,0 +1,20 @@
+"""
+Model resolutions supported by ExoPlaSim, and parsing of the ways they can be given (``"T42"``,
+``42``, or the number of latitudes, ``64``).
+"""
+
+#Number of Gaussian latitudes for each supported truncation
+NLATS = {21:32,42:64,63:96,85:128,106:160,127:192,170:256}
+
+def truncation(resolution):
+    '''Spectral truncation for a resolution given as e.g. "T42", 42, or a number of latitudes (64).'''
+    try:
+        if isinstance(resolution,str):
+            resolution = int(resolution.strip().lstrip("Tt"))
+        for ntru in NLATS:
+            if resolution==ntru or resolution==NLATS[ntru]:
+                return ntru
+    except ValueError:
+        pass
+    raise ValueError("Resolution unsupported. ExoPlaSim supports %s (%s latitudes respectively)."%(
+                     ", ".join(["T%d"%ntru for ntru in NLATS]),", ".join([str(NLATS[ntru]) for ntru in NLATS])))
@@ -0,0 +1,277 @@
+"""
+Read, modify, and write PlaSim restart files (``MOST_REST.XXXXX``, ``plasim_restart``), and regrid
+them between resolutions.
+
+A restart file is a sequence of Fortran unformatted records, written by ``put_restart_*`` in
+``restartmod.f90``: each variable is a 16-character name record followed by a data record. Gridpoint
+fields hold NLON*NLAT values per level, ordered north to south with longitude varying fastest, and
+spectral fields hold (NTRU+1)*(NTRU+2) real numbers per level: the real and imaginary parts of each
+mode, ordered by zonal wavenumber m and then by total wavenumber n.
+
+Regridding truncates (or pads with zeros) each spectral field to the new truncation, and linearly
+interpolates each gridpoint field from the old Gaussian grid to the new one (nearest neighbour for
+land-sea masks). A model can therefore be spun up cheaply at low resolution, and continued at high
+resolution from the upscaled near-equilibrium state::
+
+    import exoplasimlegacy.restart as restart
+    restart.regridfile("t21/MOST_REST.00199","t63_restart","T63")
+    highres.configure(...,restartfile="t63_restart")
+
+The number of layers cannot be changed this way.
+"""
+import numpy as np
+import struct
+import collections
+from exoplasimlegacy.resolutions import NLATS, truncation
+
+#Integer scalars written with put_restart_integer
+INTEGERS = ["nstep","naccu","naccua","naccuout","naccuice","naccuo","naccuoce","nicec2d",
+            "nlat","nlon","nlev","nrsp","nlsoil","nlev_oce"]
+
+#Gridpoint fields that are masks, and so are regridded by nearest neighbour
+MASKS = ["dls","yls","xls","ccls"]
+
+def gaussianlatitudes(nlat):
+    '''Gaussian latitudes in degrees, from north to south, as used by PlaSim.'''
+    nodes = np.polynomial.legendre.leggauss(nlat)[0]
+    return np.arcsin(nodes[::-1])*180.0/np.pi
+
+def spectralmodes(ntru):
+    '''Zonal and total wavenumbers (m,n) of each complex spectral mode, in PlaSim's order.'''
+    return [(m,n) for m in range(ntru+1) for n in range(m,ntru+1)]
+
+def _interpmatrix(old,new,periodic=None,nearest=False):
+    '''Matrix mapping values at coordinates ``old`` to coordinates ``new`` by linear interpolation.
+
+    If ``periodic`` is given, coordinates wrap around with that period; otherwise values beyond the
+    ends are held constant. ``old`` must be increasing.
+    '''
+    nold = len(old)
+    weights = np.zeros((len(new),nold))
+    if periodic is not None:
+        coords = np.append(old,old[0]+periodic)
+        new = np.mod(new-old[0],periodic)+old[0]
+    else:
+        coords = old
+        new = np.clip(new,old[0],old[-1])
+    for k,x in enumerate(new):
+        j = min(max(np.searchsorted(coords,x,side="right")-1,0),len(coords)-2)
+        f = (x-coords[j])/(coords[j+1]-coords[j])
+        if nearest:
+            f = float(f>=0.5)
+        weights[k,j%nold] += 1.0-f
+        weights[k,(j+1)%nold] += f
+    return weights
+
+class RestartFile(object):
+    '''The contents of a PlaSim restart file.
+
+    Variables are read in order and can be read and replaced like a dictionary, e.g.
+    ``rest["st"]``. Integers are returned as Python ints; gridpoint fields as arrays with shape
+    (levels,nlat,nlon); spectral fields as arrays with shape (levels,(NTRU+1)*(NTRU+2)); and anything
+    else as a flat array.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Path to the restart file to read. If None, an empty restart is created.
+
+    Attributes
+    ----------
+    variables : collections.OrderedDict
+        Variables, keyed by name, in the order they appear in the file
+    kinds : dict
+        For each variable: "integer", "seed", "grid", "spectral", or "array".
+    nlat, nlon, nlev, ntru : int
+        Dimensions of the model that wrote the file
+    realsize : int
+        Size in bytes of the file's real numbers (8 for double precision builds, 4 for single)
+    endian : str
+        Byte order of the file, ">" or "<"
+    '''
+    def __init__(self,filename=None):
+        self.variables = collections.OrderedDict()
+        self.kinds = {}
+        self.nlat = None
+        self.nlon = None
+        self.nlev = None
+        self.ntru = None
+        self.realsize = 8
+        self.endian = "<"
+        if filename is not None:
+            self.read(filename)
+
+    def __getitem__(self,name):
+        return self.variables[name]
+
+    def __setitem__(self,name,value):
+        if name not in self.variables:
+            raise KeyError("%s is not in this restart file; new variables would not be read by the model."%name)
+        if self.kinds[name] in ("integer",):
+            value = int(value)
+        else:
+            value = np.asarray(value)
+            if value.shape!=self.variables[name].shape:
+                raise ValueError("%s has shape %s, not %s."%(name,self.variables[name].shape,value.shape))
+        self.variables[name] = value
+
+    def __contains__(self,name):
+        return name in self.variables
+
+    def keys(self):
+        return self.variables.keys()
+
+    def read(self,filename):
+        '''Read a restart file, replacing any variables already held.'''
+        with open(filename,"rb") as restf:
+            fbuffer = restf.read()
+        self.endian = "<"
+        if struct.unpack("<i",fbuffer[:4])[0]!=16:
+            self.endian = ">"
+        en = self.endian
+        raw = collections.OrderedDict()
+        n = 0
+        while n<len(fbuffer):
+            length = struct.unpack(en+"i",fbuffer[n:n+4])[0]
+            name = fbuffer[n+4:n+4+length].decode("ascii",errors="replace").strip()
+            n += 8+length
+            length = struct.unpack(en+"i",fbuffer[n:n+4])[0]
+            raw[name] = fbuffer[n+4:n+4+length]
+            n += 8+length
+            if n>len(fbuffer):
+                raise Exception("%s is truncated"%filename)
+
+        self.variables = collections.OrderedDict()
+        self.kinds = {}
+        for name in raw:
+            if name in INTEGERS:
+                self.variables[name] = struct.unpack(en+("i" if len(raw[name])==4 else "q"),raw[name])[0]
+                self.kinds[name] = "integer"
+        self.nlat = self.variables.get("nlat")
+        self.nlon = self.variables.get("nlon")
+        self.nlev = self.variables.get("nlev")
+        nrsp = self.variables.get("nrsp")
+        if None in (self.nlat,self.nlon,self.nlev,nrsp):
+            raise Exception("%s is missing the model dimensions (nlat, nlon, nlev, nrsp)."%filename)
+        self.ntru = int(round((-3+np.sqrt(1+4*nrsp))/2)) #nrsp = (ntru+1)*(ntru+2)
+        if "sz" in raw:
+            self.realsize = len(raw["sz"])//(nrsp*self.nlev)
+        nugp = self.nlat*self.nlon
+        realtype = en+"f%d"%self.realsize
+
+        variables = collections.OrderedDict()
+        for name in raw:
+            if name in self.kinds:
+                variables[name] = self.variables[name]
+            elif name=="seed":
+                variables[name] = np.frombuffer(raw[name],dtype=en+"i4").copy()
+                self.kinds[name] = "seed"
+            else:
+                values = np.frombuffer(raw[name],dtype=realtype).copy()
+                if values.size>=nugp and values.size%nugp==0:
+                    variables[name] = values.reshape((values.size//nugp,self.nlat,self.nlon))
+                    self.kinds[name] = "grid"
+                elif values.size>=nrsp and values.size%nrsp==0:
+                    variables[name] = values.reshape((values.size//nrsp,nrsp))
+                    self.kinds[name] = "spectral"
+                else:
+                    variables[name] = values
+                    self.kinds[name] = "array"
+        self.variables = variables
+
+    def write(self,filename):
+        '''Write the restart file, in the byte order and precision it was read with.'''
+        en = self.endian
+        realtype = en+"f%d"%self.realsize
+        with open(filename,"wb") as restf:
+            for name in self.variables:
+                records = [("%-16s"%name)[:16].encode("ascii")]
+                value = self.variables[name]
+                if self.kinds[name]=="integer":
+                    records.append(struct.pack(en+"i",value))
+                elif self.kinds[name]=="seed":
+                    records.append(np.asarray(value).astype(en+"i4").tobytes())
+                else:
+                    records.append(np.asarray(value).astype(realtype).tobytes())
+                for record in records:
+                    restf.write(struct.pack(en+"i",len(record)))
+                    restf.write(record)
+                    restf.write(struct.pack(en+"i",len(record)))
+
+    def regrid(self,resolution):
+        '''Regrid the restart to another horizontal resolution.
+
+        Spectral fields are truncated, or padded with zeros, to the new truncation. Gridpoint fields
+        are interpolated linearly in latitude and longitude between the Gaussian grids (masks by
+        nearest neighbour), with values beyond the outermost latitudes held constant.
+
+        Parameters
+        ----------
+        resolution : str or int
+            New resolution, e.g. "T63", 63, or 96 (the number of latitudes).
+
+        Returns
+        -------
+        RestartFile
+            A new restart, ready to be written and used to start a model at the new resolution.
+        '''
+        ntru = truncation(resolution)
+        nlat = NLATS[ntru]
+        nlon = 2*nlat
+        new = RestartFile()
+        new.endian = self.endian
+        new.realsize = self.realsize
+        new.nlat,new.nlon,new.nlev,new.ntru = nlat,nlon,self.nlev,ntru
+        new.kinds = dict(self.kinds)
+
+        #Spectral coefficients are normalized independently of truncation, so modes carry over as-is
+        oldmodes = dict([(mode,k) for k,mode in enumerate(spectralmodes(self.ntru))])
+        newmodes = spectralmodes(ntru)
+        source = np.array([oldmodes.get(mode,-1) for mode in newmodes])
+        keep = source>=0
+
+        latweights = _interpmatrix(gaussianlatitudes(self.nlat)[::-1],gaussianlatitudes(nlat)[::-1])[::-1,::-1]
+        lonweights = _interpmatrix(np.arange(self.nlon)*360.0/self.nlon,np.arange(nlon)*360.0/nlon,periodic=360.0)
+        latnearest = _interpmatrix(gaussianlatitudes(self.nlat)[::-1],gaussianlatitudes(nlat)[::-1],
+                                   nearest=True)[::-1,::-1]
+        lonnearest = _interpmatrix(np.arange(self.nlon)*360.0/self.nlon,np.arange(nlon)*360.0/nlon,
+                                   periodic=360.0,nearest=True)
+
+        for name in self.variables:
+            value = self.variables[name]
+            kind = self.kinds[name]
+            if kind=="grid":
+                if name in MASKS:
+                    value = np.einsum("ij,ljk,mk->lim",latnearest,value,lonnearest)
+                else:
+                    value = np.einsum("ij,ljk,mk->lim",latweights,value,lonweights)
+            elif kind=="spectral":
+                old = value.reshape((value.shape[0],len(oldmodes),2))
+                spec = np.zeros((value.shape[0],len(newmodes),2))
+                spec[:,keep,:] = old[:,source[keep],:]
+                value = spec.reshape((value.shape[0],2*len(newmodes)))
+            elif kind=="integer":
+                value = {"nlat":nlat,"nlon":nlon,"nrsp":(ntru+1)*(ntru+2)}.get(name,value)
+            new.variables[name] = value
+        return new
+
+def regridfile(filename,outfile,resolution):
+    '''Regrid a restart file to another resolution (see :py:func:`RestartFile.regrid`).
+
+    Parameters
+    ----------
+    filename : str
+        Restart file to read (e.g. ``MOST_REST.00199``)
+    outfile : str
+        Path to write the regridded restart file to
+    resolution : str or int
+        New resolution, e.g. "T63"
+
+    Returns
+    -------
+    RestartFile
+        The regridded restart.
+    '''
+    new = RestartFile(filename).regrid(resolution)
+    new.write(outfile)
+    return new
@@ -0,0 +1,244 @@
+"""
+A library of equilibrated model states, for warm-starting new models.
+
+Spinning a model up to energy balance takes 75-300 years, but most members of a parameter sweep
+differ only slightly from a model that has already been run to balance. A :py:class:`RestartLibrary`
+stores the final restart file of each balanced run, together with its configuration (as written by
+:py:func:`Model.exportcfg() <exoplasimlegacy.Model.exportcfg>`), and can seed a new
+:py:class:`Model <exoplasimlegacy.Model>` with the closest compatible state.
+
+Only states with the same resolution, number of layers, and precision can be used, since the restart
+file holds the model's arrays as they are. Among those, the closest state is the one whose flux,
+surface pressure, gas partial pressures, rotation period, gravity, radius, and orbit are nearest, in
+relative terms, with a penalty for each difference in the configuration switches (land map,
+synchronous rotation, sea ice, and so on).
+"""
+import numpy as np
+import os
+import json
+import time
+import glob
+import shutil
+
+#Continuous parameters compared between configurations: (attribute, compare logarithms?, scale).
+#A difference of one scale counts as a distance of 1 (for logarithms, the scale is a fraction).
+_FEATURES = [("flux"          ,True ,0.05),
+             ("pressure"      ,True ,0.1 ),
+             ("rotationperiod",True ,0.1 ),
+             ("gravity"       ,True ,0.1 ),
+             ("radius"        ,True ,0.1 ),
+             ("eccentricity"  ,False,0.05),
+             ("obliquity"     ,False,5.0 ),
+             ]
+
+#Values the Model uses for orbital parameters left unset (those of the modern Earth)
+_DEFAULTS = {"eccentricity":0.016715,"obliquity":23.441}
+
+#Configuration switches which, if they differ, each add this much to the distance
+_SWITCHES = ["synchronous","aquaplanet","desertplanet","landmap","topomap","seaice","stratosphere",
+             "drycore","vtype"]
+_SWITCHPENALTY = 1.0
+
+#Scale for differences in the partial pressure of each gas, as a fraction
+_GASSCALE = 0.3
+
+def _precision(model):
+    return getattr(model,"precision",8)
+
+def _describe(model):
+    '''The parts of a model's configuration that decide which stored states suit it.'''
+    features = {}
+    for key,logarithmic,scale in _FEATURES:
+        value = getattr(model,key,None)
+        if value is None:
+            value = _DEFAULTS.get(key)
+        features[key] = None if value is None else float(value)
+    switches = {}
+    for key in _SWITCHES:
+        value = getattr(model,key,None)
+        if isinstance(value,dict):
+            value = value.get("toggle")
+        switches[key] = None if value is None else str(value)
+    switches["glaciers"] = str(getattr(model,"glaciers",{}).get("toggle"))
+    return {"resolution":int(model.nsp),
+            "layers":int(model.layers),
+            "precision":int(_precision(model)),
+            "mars":bool(getattr(model,"mars",False)),
+            "features":features,
+            "gases":dict([(gas,float(model.pgases[gas])) for gas in getattr(model,"pgases",{})]),
+            "switches":switches}
+
+def distance(first,second):
+    '''Distance between two configurations, as described by the library (see :py:func:`RestartLibrary.add`).
+
+    Returns infinity if states of one cannot be used for the other.
+    '''
+    for key in ("resolution","layers","precision","mars"):
+        if first[key]!=second[key]:
+            return np.inf
+    terms = []
+    for key,logarithmic,scale in _FEATURES:
+        a = first["features"].get(key)
+        b = second["features"].get(key)
+        if a is None or b is None:
+            if a!=b:
+                terms.append(1.0)
+            continue
+        if logarithmic:
+            if a<=0 or b<=0:
+                terms.append(0.0 if a==b else 1.0)
+            else:
+                terms.append(np.log(a/b)/np.log1p(scale))
+        else:
+            terms.append((a-b)/scale)
+    for gas in set(first["gases"])|set(second["gases"]):
+        a = max(first["gases"].get(gas,0.0),1.0e-12)
+        b = max(second["gases"].get(gas,0.0),1.0e-12)
+        terms.append(np.log(a/b)/np.log1p(_GASSCALE))
+    mismatches = sum([first["switches"].get(key)!=second["switches"].get(key)
+                      for key in set(first["switches"])|set(second["switches"])])
+    return float(np.sqrt(np.sum(np.square(terms)))+_SWITCHPENALTY*mismatches)
+
+class RestartLibrary(object):
+    '''A directory of equilibrated model states.
+
+    Each state is kept as ``<id>_REST`` (the restart file) and ``<id>.cfg`` (the model configuration),
+    and is described in ``library.json``.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the library. It is created if it does not exist.
+
+    Attributes
+    ----------
+    entries : list
+        Descriptions of the stored states. Each one is a dict with the state's "id", "modelname",
+        "restart" and "config" file names, the number of "years" the run took to reach balance,
+        "coldyears" (the years a spin-up from a cold start took, counting back through any warm
+        starts the run itself had), and the configuration used to match states to models.
+    '''
+    def __init__(self,path):
+        self.path = os.path.abspath(path)
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        self.entries = []
+        if os.path.exists(os.path.join(self.path,"library.json")):
+            with open(os.path.join(self.path,"library.json"),"r") as indexf:
+                self.entries = json.load(indexf)
+
+    def _save(self):
+        indexname = os.path.join(self.path,"library.json")
+        with open(indexname+".tmp","w") as indexf:
+            json.dump(self.entries,indexf,indent=1)
+        os.replace(indexname+".tmp",indexname) #Never leave a half-written index
+
+    def add(self,model,restart=None,years=None):
+        '''Store the current state of a balanced model.
+
+        Parameters
+        ----------
+        model : exoplasimlegacy.Model
+            A model that has been run to energy balance (e.g. one for which
+            :py:func:`runtobalance() <exoplasimlegacy.Model.runtobalance>` returned True).
+        restart : str, optional
+            Restart file to store. Defaults to the model's ``plasim_restart``, or failing that, the
+            last ``MOST_REST`` file in its working directory.
+        years : int, optional
+            Number of years the model took to reach balance. Defaults to the number of years run since
+            the model was created or warm-started.
+
+        Returns
+        -------
+        dict
+            The new entry.
+        '''
+        if restart is None:
+            restart = os.path.join(model.workdir,"plasim_restart")
+            if not os.path.exists(restart):
+                restarts = sorted(glob.glob(os.path.join(model.workdir,"MOST_REST.*")))
+                if len(restarts)==0:
+                    raise Exception("%s has no restart file to store."%model.workdir)
+                restart = restarts[-1]
+        warmstart = getattr(model,"warmstart",None)
+        if years is None:
+            startyear = warmstart["startyear"] if warmstart else getattr(model,"inityear",0)
+            years = model.currentyear-startyear
+        coldyears = years
+        if warmstart:
+            coldyears = max(years,warmstart["coldyears"])
+
+        entryid = "%s_%d"%(model.modelname,int(time.time()*1000))
+        shutil.copyfile(restart,os.path.join(self.path,entryid+"_REST"))
+        model.exportcfg(filename=os.path.join(self.path,entryid+".cfg"))
+        entry = {"id":entryid,
+                 "modelname":model.modelname,
+                 "restart":entryid+"_REST",
+                 "config":entryid+".cfg",
+                 "years":int(years),
+                 "coldyears":int(coldyears),
+                 "warmstarted":warmstart["id"] if warmstart else None,
+                 "added":time.strftime("%Y-%m-%d %H:%M:%S")}
+        entry.update(_describe(model))
+        self.entries.append(entry)
+        self._save()
+        return entry
+
+    def nearest(self,model,maxdistance=None):
+        '''Find the stored state closest to a model's configuration.
+
+        Parameters
+        ----------
+        model : exoplasimlegacy.Model
+            A configured model.
+        maxdistance : float, optional
+            If given, states further away than this are ignored (see :py:func:`distance`).
+
+        Returns
+        -------
+        dict, float
+            The closest entry and its distance, or (None, None) if there is no compatible state.
+        '''
+        description = _describe(model)
+        best = (None,None)
+        for entry in self.entries:
+            d = distance(description,entry)
+            if not np.isfinite(d) or (maxdistance is not None and d>maxdistance):
+                continue
+            if best[1] is None or d<best[1]:
+                best = (entry,d)
+        return best
+
+    def warmstart(self,model,maxdistance=None):
+        '''Seed a model's ``plasim_restart`` with the closest stored state.
+
+        The model must already be configured. It remembers where its state came from in
+        ``model.warmstart``, so that :py:func:`runtobalance() <exoplasimlegacy.Model.runtobalance>` can
+        report how many years of spin-up the warm start saved.
+
+        Parameters
+        ----------
+        model : exoplasimlegacy.Model
+            A configured model, which has not been run yet.
+        maxdistance : float, optional
+            If given, states further away than this are not used (see :py:func:`distance`).
+
+        Returns
+        -------
+        dict
+            The entry used, or None if no compatible state was found (the model is then left to start
+            cold).
+        '''
+        entry,d = self.nearest(model,maxdistance=maxdistance)
+        if entry is None:
+            print("No compatible state in %s; %s will start cold."%(self.path,model.modelname))
+            return None
+        shutil.copyfile(os.path.join(self.path,entry["restart"]),os.path.join(model.workdir,"plasim_restart"))
+        model.restartfile = os.path.join(self.path,entry["restart"])
+        model.warmstart = {"id":entry["id"],
+                           "distance":d,
+                           "startyear":model.currentyear,
+                           "coldyears":entry["coldyears"]}
+        print("Warm-starting %s from %s (distance %1.3g), which took %d years to reach balance from a cold start."%(
+              model.modelname,entry["id"],d,entry["coldyears"]))
+        return entry
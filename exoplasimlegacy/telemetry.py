@@ -0,0 +1,216 @@
+"""
+Per-year run telemetry: wall time per simulated year, CPU and memory use, energy balance, and
+postprocessing time.
+
+Each DIAG file is parsed once, when its year finishes, and the result is appended to a small text
+table in the model's working directory, so reading the history of a run never means re-reading its
+DIAG files. The table can be returned as a NumPy record array, or exported in the Prometheus text
+exposition format for monitoring.
+"""
+import numpy as np
+import os
+
+#Columns of the telemetry table, in order. Times are in seconds, memory in MB, and balances in W/m^2.
+FIELDS = ["year",
+          "secondsperyear", #Wall time per simulated year, as reported in the DIAG file
+          "yearsperday",    #Simulated years per day at that rate
+          "cputime",        #Total CPU time of the root process
+          "usertime",
+          "systemtime",
+          "memory",         #Peak memory use of the root process
+          "postprocess",    #Time spent postprocessing the year's output
+          "walltime",       #Wall time for the whole year: model launch, run, and postprocessing
+          "toa",            #Top-of-atmosphere energy balance (only recorded by runtobalance)
+          "surface",        #Surface energy balance (only recorded by runtobalance)
+          ]
+
+#Labels in the resource summary PlaSim writes at the end of each DIAG file, the column each one goes
+#into, and the factor converting its value to the column's units
+_DIAGLABELS = [("User   time"         ,"usertime"      ,1.0    ),
+               ("System time"         ,"systemtime"    ,1.0    ),
+               ("Total CPU time"      ,"cputime"       ,1.0    ),
+               ("Memory usage"        ,"memory"        ,1.0    ),
+               ("Seconds per sim year","secondsperyear",1.0    ),
+               ("Minutes per sim year","secondsperyear",60.0   ),
+               ("Days per sim year"   ,"secondsperyear",86400.0),
+               ("Sim years per day"   ,"yearsperday"   ,1.0    ),
+               ]
+
+#Prometheus metric names and help text for each column (the most recent year is exported)
+_METRICS = [("secondsperyear","exoplasim_seconds_per_sim_year","Wall time per simulated year"),
+            ("yearsperday"   ,"exoplasim_sim_years_per_day"   ,"Simulated years per day"),
+            ("cputime"       ,"exoplasim_cpu_seconds"         ,"CPU time used by the most recent year"),
+            ("memory"        ,"exoplasim_memory_megabytes"    ,"Memory used by the most recent year"),
+            ("postprocess"   ,"exoplasim_postprocess_seconds" ,"Time spent postprocessing the most recent year"),
+            ("walltime"      ,"exoplasim_year_wall_seconds"   ,"Wall time for the most recent year, including postprocessing"),
+            ("toa"           ,"exoplasim_toa_balance_wm2"     ,"Top-of-atmosphere energy balance"),
+            ("surface"       ,"exoplasim_surface_balance_wm2" ,"Surface energy balance"),
+            ]
+
+def parsediag(filename,tail=8192):
+    '''Read the resource summary at the end of a PlaSim DIAG file.
+
+    Only the last ``tail`` bytes of the file are read, since that is where PlaSim writes its summary,
+    so this costs the same however long the DIAG file is.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the DIAG file
+    tail : int, optional
+        Number of bytes to read from the end of the file.
+
+    Returns
+    -------
+    dict
+        Values found, keyed by column name (see ``FIELDS``). Fields that were not found are left out.
+    '''
+    with open(filename,"rb") as diagf:
+        diagf.seek(0,os.SEEK_END)
+        diagf.seek(max(diagf.tell()-tail,0))
+        lines = diagf.read().decode(errors="replace").split("\n")
+    values = {}
+    for line in lines:
+        line = line.strip().strip("*").strip()
+        for label,key,factor in _DIAGLABELS:
+            if line.startswith(label):
+                words = line[len(label):].replace(":"," ").split()
+                try:
+                    values[key] = float(words[0])*factor
+                except (IndexError,ValueError):
+                    pass
+                break
+    return values
+
+class Telemetry(object):
+    '''Append-only table of per-year run telemetry.
+
+    Rows are appended to a whitespace-separated text file as they are recorded, and held in memory, so
+    that recording a year and looking up past years are both cheap. The file's first line names its
+    columns; a table written with other columns (e.g. by a version without ``walltime``) is loaded by
+    name, and written out again with the current columns. If a year is recorded more than
+    once (e.g. when a crashed run is rewound), or more fields are added to a year later, the most
+    recent values win.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the table. If it exists, its rows are loaded.
+    prometheus : str, optional
+        If given, the most recent year is also written to this file in the Prometheus text exposition
+        format (e.g. for node_exporter's textfile collector) each time a year is recorded.
+    labels : dict, optional
+        Labels attached to every exported Prometheus metric, e.g. ``{"model":"mymodel"}``.
+    '''
+    def __init__(self,filename,prometheus=None,labels=None):
+        self.filename = filename
+        self.promfile = prometheus
+        self.labels = labels or {}
+        self.rows = {}
+        if os.path.exists(filename):
+            columns = FIELDS
+            with open(filename,"r") as tablef:
+                for line in tablef:
+                    if line.startswith("#"): #Column names, so tables written with other columns still load
+                        columns = line.strip("#").split()
+                        continue
+                    if len(line.split())!=len(columns):
+                        continue
+                    row = dict(zip(columns,[float(word) for word in line.split()]))
+                    self._merge(int(row.pop("year")),dict([(key,row[key]) for key in row if key in FIELDS]))
+            if columns!=FIELDS: #Written with other columns (e.g. before walltime), so bring it up to date
+                self._rewrite()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self,year):
+        return year in self.rows
+
+    def __getitem__(self,year):
+        return self.rows[year]
+
+    def _merge(self,year,values):
+        if year not in self.rows:
+            self.rows[year] = dict([(key,np.nan) for key in FIELDS[1:]])
+        for key in values:
+            if values[key] is not None and not np.isnan(values[key]):
+                self.rows[year][key] = float(values[key])
+
+    def _line(self,year):
+        return " ".join(["%d"%year]+["%.6g"%self.rows[year][key] for key in FIELDS[1:]])+"\n"
+
+    def _rewrite(self):
+        '''Write the whole table out again with the columns in ``FIELDS``, replacing the file atomically.'''
+        with open(self.filename+".tmp","w") as tablef:
+            tablef.write("# "+" ".join(FIELDS)+"\n")
+            tablef.writelines([self._line(year) for year in sorted(self.rows)])
+        os.replace(self.filename+".tmp",self.filename)
+
+    def record(self,year,**values):
+        '''Record (or add to) the telemetry for a year.
+
+        Parameters
+        ----------
+        year : int
+            Model year
+        **values : float
+            Values keyed by column name (see ``FIELDS``), e.g. the output of :py:func:`parsediag`.
+        '''
+        unknown = [key for key in values if key not in FIELDS[1:]]
+        if len(unknown)>0:
+            raise KeyError("Unknown telemetry fields: %s"%", ".join(unknown))
+        self._merge(year,values)
+        newfile = not os.path.exists(self.filename)
+        with open(self.filename,"a") as tablef:
+            if newfile:
+                tablef.write("# "+" ".join(FIELDS)+"\n")
+            tablef.write(self._line(year))
+        if self.promfile is not None:
+            self.prometheus(self.promfile)
+
+    def recorddiag(self,year,diagfile):
+        '''Parse a DIAG file with :py:func:`parsediag` and record it for a year.'''
+        values = parsediag(diagfile)
+        if "secondsperyear" in values and "yearsperday" not in values:
+            values["yearsperday"] = 86400.0/max(values["secondsperyear"],1.0)
+        self.record(year,**values)
+
+    def array(self):
+        '''All recorded years, sorted by year, as a NumPy record array with the columns in ``FIELDS``.'''
+        years = sorted(self.rows)
+        return np.rec.fromrecords([tuple([year]+[self.rows[year][key] for key in FIELDS[1:]])
+                                   for year in years],
+                                  dtype=[("year",int)]+[(key,float) for key in FIELDS[1:]])
+
+    def prometheus(self,filename=None):
+        '''Telemetry for the most recent year, in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        filename : str, optional
+            If given, the text is also written (atomically) to this file.
+
+        Returns
+        -------
+        str
+        '''
+        labels = ",".join(['%s="%s"'%(key,self.labels[key]) for key in sorted(self.labels)])
+        if labels:
+            labels = "{"+labels+"}"
+        lines = ["# HELP exoplasim_year Most recent model year completed",
+                 "# TYPE exoplasim_year gauge"]
+        if len(self.rows)>0:
+            year = max(self.rows)
+            lines.append("exoplasim_year%s %d"%(labels,year))
+            for key,metric,description in _METRICS:
+                if not np.isnan(self.rows[year][key]):
+                    lines += ["# HELP %s %s"%(metric,description),
+                              "# TYPE %s gauge"%metric,
+                              "%s%s %.6g"%(metric,labels,self.rows[year][key])]
+        text = "\n".join(lines)+"\n"
+        if filename is not None:
+            with open(filename+".tmp","w") as promf:
+                promf.write(text)
+            os.replace(filename+".tmp",filename) #Scrapers must never see a half-written file
+        return text
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+TOP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HPC = os.path.join(TOP,"exoplasimlegacy","hpc")
+
+#The hpc scripts import each other as top-level modules, and import the identity module that
+#buildhpc.py writes for each cluster; give them a stand-in.
+IDENTITY = tempfile.mkdtemp()
+with open(os.path.join(IDENTITY,"identity.py"),"w") as identityf:
+    identityf.write('USER = "tester"\n'+
+                    'ACCOUNT = "testaccount"\n'+
+                    'EMAIL = "tester@example.com"\n'+
+                    'GCCMOD = "gcc"\n'+
+                    'PYTHONMOD = "python"\n'+
+                    'INTELMOD = "intel"\n'+
+                    'MPIMOD = "openmpi"\n')
+
+for path in (IDENTITY,HPC,TOP):
+    if path not in sys.path:
+        sys.path.insert(0,path)
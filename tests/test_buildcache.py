@@ -0,0 +1,55 @@
+import os
+import pytest
+
+import exoplasimlegacy.buildcache as buildcache
+
+@pytest.fixture
+def sourcedir(tmp_path):
+    os.makedirs(tmp_path/"plasim"/"src")
+    for name,text in (("compile.sh","make -e -j $jobs\n"),("most_compiler","MOST_F90=gfortran\n"),
+                      ("plasim/src/plasim.f90","program plasim\nend program\n"),
+                      ("plasim/src/make_plasim","plasim.x: plasim.o\n"),
+                      ("plasim/README","not part of the build\n")):
+        with open(tmp_path/name,"w") as f:
+            f.write(text)
+    return str(tmp_path)
+
+def test_key_depends_on_configuration(sourcedir):
+    key,config = buildcache.buildkey(21,10,4,sourcedir=sourcedir)
+    assert buildcache.buildkey(21,10,4,sourcedir=sourcedir)[0]==key
+    assert buildcache.buildkey("21",10.0,4,precision=8,debug=False,sourcedir=sourcedir)[0]==key #Normalized
+    assert config["nsp"]==21 and config["source"]==buildcache.sourcehash(sourcedir)
+    others = [buildcache.buildkey(42,10,4,sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,20,4,sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,10,8,sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,10,4,precision=4,sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,10,4,debug=True,sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,10,4,optimization="O3",sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,10,4,mars=True,sourcedir=sourcedir)[0],
+              buildcache.buildkey(21,10,4,force991=True,sourcedir=sourcedir)[0]]
+    assert len(set(others+[key]))==len(others)+1
+
+def test_key_depends_on_sources(sourcedir):
+    key = buildcache.buildkey(21,10,4,sourcedir=sourcedir)[0]
+    with open(os.path.join(sourcedir,"plasim","README"),"a") as f:
+        f.write("Files outside the build don't matter\n")
+    assert buildcache.buildkey(21,10,4,sourcedir=sourcedir)[0]==key
+    with open(os.path.join(sourcedir,"plasim","src","make_plasim"),"a") as f:
+        f.write("carbonmod.o: radmod.o\n")
+    changed = buildcache.buildkey(21,10,4,sourcedir=sourcedir)[0]
+    assert changed!=key
+    with open(os.path.join(sourcedir,"most_compiler"),"w") as f:
+        f.write("MOST_F90=mpif90\n")
+    assert buildcache.buildkey(21,10,4,sourcedir=sourcedir)[0] not in (key,changed)
+
+def test_executablename():
+    assert buildcache.executablename(21,10,4)=="most_plasim_t21_l10_p4.x"
+
+def test_truncation():
+    import exoplasimlegacy.resolutions as resolutions
+    assert [resolutions.truncation(resolution) for resolution in ("T42","t42"," T42 ",42,64,"64")]==[42,]*6
+    assert resolutions.truncation("T106")==106
+    with pytest.raises(ValueError):
+        resolutions.truncation("T31")
+    with pytest.raises(ValueError):
+        resolutions.truncation("high")
@@ -0,0 +1,16 @@
+import pytest
+
+import exoplasimlegacy.pyburn as pyburn
+
+def test_profiles():
+    assert pyburn._compressionsettings(None,None,"ts") is None
+    settings = pyburn._compressionsettings("fast",{"ta":"archive","ps":{"level":2}},"ta")
+    assert settings["level"]==pyburn.COMPRESSION_PROFILES["archive"]["level"]
+    assert pyburn._compressionsettings("fast",{"ps":{"level":2}},"ps")["level"]==2
+
+@pytest.mark.parametrize("compression,overrides",[("fastest",None),("fast",{"ts":"tiny"}),(None,{"ts":"tiny"})])
+def test_unknown_profiles(compression,overrides):
+    with pytest.raises(ValueError) as error:
+        pyburn._compressionsettings(compression,overrides,"ts")
+    for profile in pyburn.COMPRESSION_PROFILES:
+        assert profile in str(error.value)
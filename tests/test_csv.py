@@ -0,0 +1,60 @@
+import io
+import os
+import tarfile
+
+import numpy as np
+
+import exoplasimlegacy.pyburn as pyburn
+
+def savetxt(data,header):
+    buffer = io.BytesIO()
+    np.savetxt(buffer,data,header=header,delimiter=',')
+    return buffer.getvalue()
+
+def makedataset():
+    rng = np.random.default_rng(5)
+    rdataset = {"lat" :[np.linspace(-80.0,80.0,4),["lat","latitude","deg"]],
+                "lon" :[np.linspace(0.0,270.0,8),["lon","longitude","deg"]],
+                "lev" :[np.linspace(0.1,1.0,3),["lev","sigma","nondimensional"]],
+                "levp":[np.linspace(0.0,1.0,4),["levp","sigma","nondimensional"]],
+                "time":[np.arange(2.0),["time","time","days"]],
+                "ts"  :[rng.normal(280.0,30.0,(2,4,8)),["ts","surface temperature","K","169",["time","lat","lon"]]],
+                "ta"  :[rng.normal(250.0,30.0,(2,3,4,8)),["ta","air temperature","K","130",["time","lev","lat","lon"]]]}
+    rdataset["ts"][0][0,1,2] = np.nan
+    rdataset["ta"][0][1,0,0,0] = -np.inf
+    return rdataset
+
+def test_csvtext_matches_savetxt():
+    data = np.random.default_rng(3).normal(0.0,1e5,(300,7)).astype("float32")
+    data[4,2] = np.nan
+    data[7,0] = np.inf
+    assert pyburn._csvtext(data,"3,|||,a,b\nc")==savetxt(data,"3,|||,a,b\nc")
+    assert pyburn._csvtext(data[:,0],"x")==savetxt(data[:,0],"x")
+    pyburn.CSV_BLOCKSIZE,blocksize = 10,pyburn.CSV_BLOCKSIZE #Rows spread over many blocks
+    try:
+        assert pyburn._csvtext(data,"y")==savetxt(data,"y")
+    finally:
+        pyburn.CSV_BLOCKSIZE = blocksize
+
+def test_csv_tarball(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rdataset = makedataset()
+    assert pyburn.csv(rdataset,filename="out.tar.gz",logfile=os.devnull)=="out.tar.gz"
+    assert os.listdir(str(tmp_path))==["out.tar.gz",] #Nothing left behind
+    with tarfile.open("out.tar.gz","r") as tarball:
+        members = {info.name:tarball.extractfile(info).read() for info in tarball.getmembers()}
+    assert sorted(members)==sorted(["out/out_%s.csv"%key for key in rdataset])
+    assert members["out/out_ts.csv"]==savetxt(rdataset["ts"][0].reshape((8,8)).astype("float32"),
+                                              "2,4,8,|||,ts,surface temperature,K,169time,lat,lon")
+    assert members["out/out_lat.csv"]==savetxt(rdataset["lat"][0].astype("float32"),
+                                               "4,|||,lat,latitude,deg")
+
+def test_csv_directory(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rdataset = makedataset()
+    files,dirname = pyburn.csv(rdataset,filename="out.csv",logfile=os.devnull)
+    assert dirname=="out/"
+    assert sorted(files)==sorted(["out/out_%s.csv"%key for key in rdataset])
+    with open("out/out_ta.csv","rb") as csvf:
+        assert csvf.read()==savetxt(rdataset["ta"][0].reshape((24,8)).astype("float32"),
+                                    "2,3,4,8,|||,ta,air temperature,K,130time,lev,lat,lon")
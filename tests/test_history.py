@@ -0,0 +1,89 @@
+import os
+import numpy as np
+import pytest
+
+nc = pytest.importorskip("netCDF4")
+import history
+
+LAT = np.array([67.5,22.5,-22.5,-67.5])
+LON = np.arange(8)*45.0
+
+def writeyear(path,ts,extra=None):
+    ncd = nc.Dataset(path,"w")
+    ncd.createDimension("time",12)
+    ncd.createDimension("lat",len(LAT))
+    ncd.createDimension("lon",len(LON))
+    ncd.createVariable("lat","f8",("lat",))[:] = LAT
+    ncd.createVariable("lon","f8",("lon",))[:] = LON
+    ncd.createVariable("ts","f8",("time","lat","lon"))[:] = ts
+    if extra is not None:
+        ncd.createVariable("hfns","f8",("time","lat","lon"))[:] = extra
+    ncd.close()
+
+def test_spatialmath_weights():
+    field = np.ones((12,len(LAT),len(LON)))
+    np.testing.assert_allclose(history.spatialmath(LAT,LON,field),np.ones(12))
+    total = history.spatialmath(LAT,LON,field[0],mean=False,radius=1.0)
+    np.testing.assert_allclose(total,4*np.pi) #The whole sphere
+    hemispheres = np.where(LAT[:,np.newaxis]>0,1.0,0.0)*np.ones(len(LON))
+    np.testing.assert_allclose(history.spatialmath(LAT,LON,hemispheres),0.5)
+
+def test_update_reads_only_new_and_changed(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writeyear("MOST.0001.nc",280.0)
+    writeyear("MOST.0002.nc",290.0,extra=1.5)
+    store = history.History("MOST_history.dat",["ts","hfns"],missing=0.0)
+    assert store.update(["MOST.0001.nc","MOST.0002.nc"])==["MOST.0001.nc","MOST.0002.nc"]
+    np.testing.assert_allclose(store.values("ts"),[280.0,290.0])
+    np.testing.assert_allclose(store.values("hfns"),[0.0,1.5]) #Missing variables get the missing value
+
+    #A later process picks up the history from the file, and reads nothing again
+    store = history.History("MOST_history.dat",["ts","hfns"],missing=0.0)
+    assert store.update(["MOST.0001.nc","MOST.0002.nc"])==[]
+    np.testing.assert_allclose(store.values("ts"),[280.0,290.0])
+
+    #A rewritten year (e.g. after a crash rewind) is read again, and a new one is added
+    stamp = store.stamps["MOST.0002.nc"]
+    writeyear("MOST.0002.nc",300.0,extra=2.0)
+    os.utime("MOST.0002.nc",ns=(stamp[1]+10**9,stamp[1]+10**9))
+    writeyear("MOST.0003.nc",295.0)
+    assert store.update(["MOST.0001.nc","MOST.0002.nc","MOST.0003.nc"])==["MOST.0002.nc","MOST.0003.nc"]
+    np.testing.assert_allclose(store.values("ts"),[280.0,300.0,295.0])
+    store = history.History("MOST_history.dat",["ts","hfns"],missing=0.0)
+    np.testing.assert_allclose(store.values("ts"),[280.0,300.0,295.0]) #The newest line for a file wins
+    np.testing.assert_allclose(store.values("ts",["MOST.0003.nc"]),[295.0])
+
+def test_new_keys_extend_history(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writeyear("MOST.0001.nc",280.0,extra=1.0)
+    writeyear("MOST.0002.nc",290.0,extra=2.0)
+    history.History("MOST_history.dat",["ts"]).update(["MOST.0001.nc","MOST.0002.nc"])
+    store = history.History("MOST_history.dat",["hfns"])
+    assert store.keys==["ts","hfns"] #Variables already in the file are kept
+    assert store.update(["MOST.0002.nc"])==["MOST.0002.nc"] #Read again, for hfns only being new
+    with open("MOST_history.dat") as historyf:
+        lines = historyf.read().split("\n")
+    assert lines[0].split()==["#","FILE","SIZE","MTIME","ts","hfns"]
+    assert lines[1].split()[0]=="MOST.0001.nc" and lines[1].split()[-1]==history.UNKNOWN #Not read yet
+    store = history.History("MOST_history.dat",["ts","hfns"])
+    np.testing.assert_allclose(store.values("ts"),[280.0,290.0])
+    assert store.update(["MOST.0001.nc","MOST.0002.nc"])==["MOST.0001.nc"]
+    np.testing.assert_allclose(store.values("hfns"),[1.0,2.0])
+
+    store.addkeys(["ts","ntr"]) #In memory too, without dropping records
+    assert store.keys==["ts","hfns","ntr"]
+    assert np.isnan(store.values("ntr")).all()
+    assert store.update(["MOST.0001.nc","MOST.0002.nc"])==["MOST.0001.nc","MOST.0002.nc"]
+    assert store.update(["MOST.0001.nc","MOST.0002.nc"])==[]
+    np.testing.assert_allclose(store.values("hfns"),[1.0,2.0])
+
+def test_super_relax_history_persists(tmp_path,monkeypatch):
+    import super_relax
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(super_relax,"_histories",{})
+    writeyear("MOST.0001.nc",280.0,extra=1.0)
+    np.testing.assert_allclose(super_relax.gethistory("ts"),[280.0])
+    assert os.path.exists(super_relax.HISTORYFILE)
+    monkeypatch.setattr(super_relax,"_histories",{}) #As in the next job
+    monkeypatch.setattr(history.nc,"Dataset",None) #Nothing is read again
+    np.testing.assert_allclose(super_relax.gethistory("ts"),[280.0])
@@ -0,0 +1,132 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+import pytest
+
+import conftest
+import local
+import schedulerstatus
+import taskqueue
+
+@pytest.fixture
+def localdir(tmp_path,monkeypatch):
+    '''A private job database, with room for 2 jobs on 4 cores (shared with the job runners).'''
+    monkeypatch.setattr(local,"LOCALDIR",str(tmp_path/"localdb"))
+    monkeypatch.setattr(local,"MAXCORES",4)
+    monkeypatch.setattr(local,"MAXJOBS",2)
+    monkeypatch.setenv("EXOPLASIM_LOCALDIR",str(tmp_path/"localdb"))
+    monkeypatch.setenv("EXOPLASIM_LOCAL_CORES","4")
+    monkeypatch.setenv("EXOPLASIM_LOCAL_JOBS","2")
+    yield tmp_path
+    for tag,name,state,cwd,ncores,returncode in local.jobs():
+        local.cancel(tag)
+
+def writescript(path,name,ncores,body,array=None):
+    with open(path,"w") as scriptf:
+        scriptf.write("#!/bin/bash\n#LOCAL --job-name=%s\n#LOCAL --ncores=%d\n"%(name,ncores)+
+                      ("#LOCAL --array=%s\n"%array if array else "")+body+"\n")
+
+def states():
+    return dict([(name,state) for tag,name,state,cwd,ncores,returncode in local.jobs(local.ACTIVE+["done","failed","cancelled"])])
+
+def waitfor(path,timeout=20.0):
+    start = time.time()
+    while not os.path.exists(path):
+        assert time.time()-start<timeout, "timed out waiting for "+str(path)
+        time.sleep(0.05)
+
+def test_dispatch_in_order_within_limits(localdir):
+    gate = "while [ ! -e go_$LOCAL_JOB_ID ]; do sleep 0.05; done; touch done_$LOCAL_JOB_ID"
+    writescript(localdir/"small.sh","small",2,"touch started_$LOCAL_JOB_ID; "+gate)
+    writescript(localdir/"big.sh","big",4,"touch started_$LOCAL_JOB_ID; "+gate)
+    writescript(localdir/"tiny.sh","tiny",1,"touch started_$LOCAL_JOB_ID; "+gate)
+    small = local.submit("small.sh",cwd=str(localdir))
+    big = local.submit("big.sh",cwd=str(localdir))
+    tiny = local.submit("tiny.sh",cwd=str(localdir))
+    waitfor(localdir/("started_%d"%small))
+    #big needs every core, so it waits; tiny would fit, but waits its turn behind big
+    assert states()=={"small":"running","big":"queued","tiny":"queued"}
+    open(localdir/("go_%d"%small),"w").close()
+    waitfor(localdir/("started_%d"%big)) #small's runner starts the next job as it ends
+    assert states()=={"small":"done","big":"running","tiny":"queued"}
+    open(localdir/("go_%d"%big),"w").close()
+    open(localdir/("go_%d"%tiny),"w").close()
+    local.wait(poll=0.05)
+    assert states()=={"small":"done","big":"done","tiny":"done"}
+    for tag in (small,big,tiny):
+        assert os.path.exists(localdir/("done_%d"%tag))
+        assert os.path.exists(localdir/("%s.o%d"%({small:"small.sh",big:"big.sh",tiny:"tiny.sh"}[tag],tag)))
+
+def test_arrays_failures_and_cancel(localdir):
+    writescript(localdir/"sweep.sh","sweep",1,"touch member_$LOCAL_ARRAY_TASK_ID",array="0-2")
+    writescript(localdir/"broken.sh","broken",1,"exit 3")
+    writescript(localdir/"forever.sh","forever",1,"sleep 60")
+    array = local.submit("sweep.sh",cwd=str(localdir))
+    broken = local.submit("broken.sh",cwd=str(localdir))
+    local.wait(poll=0.05)
+    assert sorted([name for name in os.listdir(localdir) if name.startswith("member_")])==["member_0","member_1","member_2"]
+    history = dict([(tag,(state,returncode)) for tag,name,state,cwd,ncores,returncode in local.jobs(["done","failed"])])
+    assert history[local.arraytag(array,1)]==("done",0)
+    assert history[str(broken)]==("failed",3)
+    forever = local.submit("forever.sh",cwd=str(localdir))
+    assert local.cancel(str(forever))==1
+    assert states()["forever"]=="cancelled"
+
+def test_submission_through_statuscache(localdir):
+    writescript(localdir/"runplasim","run7",1,"true")
+    status = schedulerstatus.StatusCache(backend=local)
+    tag = status.submit("runplasim","run7",cwd=str(localdir))
+    assert tag is not None and tag.isdigit()
+    assert status.lookup("run7")==tag
+    local.wait(poll=0.05)
+    assert local.parsesubmit("Traceback (most recent call last):\n  line 12\n") is None
+
+STUBRUN = '''#!/bin/bash
+#Stands in for the model: writes one year of output per job, and asks to keep going once
+echo "$1 cores, $2 levels" >> cycles
+year=$(wc -l < cycles)
+python -c "import netCDF4; netCDF4.Dataset('MOST.%04d.nc'%$year,'w').close()"
+if [ $year -lt 2 ]; then touch keepgoing; fi
+'''
+
+def test_launcher_keepgoing_end_to_end(localdir):
+    '''launcher.py -> launchset.newtask -> buildplasimjob.prep/submit -> local, resubmitted once by keepgoing.'''
+    pytest.importorskip("netCDF4")
+    top = localdir/"crawler"
+    os.makedirs(str(top/"clean"))
+    for name in os.listdir(conftest.HPC):
+        if name.endswith(".py"):
+            shutil.copy(os.path.join(conftest.HPC,name),str(top/name))
+    shutil.copy(os.path.join(conftest.IDENTITY,"identity.py"),str(top/"identity.py"))
+    with open(top/"batch_system.py","w") as batchf:
+        batchf.write("from local import *\n")
+    with open(top/"run.sh","w") as runf:
+        runf.write(STUBRUN)
+    os.chmod(str(top/"run.sh"),0o755)
+    with open(top/"clean"/"plasim_namelist","w") as namelistf:
+        namelistf.write(" &PLASIM_NAMELIST\n NOUTPUT = 1\n &END\n")
+    with open(top/"tasks.crwl","w") as crwlf:
+        crwlf.write("# JOBNAME STATUS NCORES QUEUE\nrun1 0 2 batch\n")
+    environment = dict(os.environ,TMPDIR=str(localdir/"scratch"))
+    os.makedirs(environment["TMPDIR"])
+
+    launch = subprocess.run([sys.executable,"launcher.py","sqlite"],cwd=str(top),env=environment,
+                            stdout=subprocess.PIPE,stderr=subprocess.STDOUT,universal_newlines=True)
+    assert launch.returncode==0, launch.stdout
+    subprocess.run([sys.executable,"local.py","wait"],cwd=str(top),env=environment,timeout=120,check=True)
+
+    history = [(name,state) for tag,name,state,cwd,ncores,returncode in local.jobs(["done","failed","cancelled"])]
+    assert history==[("run1","done"),("run1","done")] #The first job, and the one keepgoing resubmitted
+    workdir = top/"run1"
+    with open(workdir/"cycles") as cyclesf:
+        assert cyclesf.read().split("\n")==["2 cores, 10 levels"]*2+[""]
+    assert not os.path.exists(workdir/"keepgoing")
+    assert sorted([name for name in os.listdir(str(workdir)) if name.endswith(".nc")])==["MOST.0001.nc","MOST.0002.nc"]
+    assert os.path.exists(workdir/"MOST_history.npy") #Summarized once the run stopped
+    queue = taskqueue.TaskQueue(str(top/"tasks.db"))
+    try:
+        assert queue.status("run1")=="done"
+    finally:
+        queue.close()
@@ -0,0 +1,82 @@
+import collections
+import numpy as np
+import pytest
+
+import exoplasimlegacy.restart as restart
+
+def makerestart(ntru=21,nlev=2,realsize=8,endian="<"):
+    '''A small restart with one variable of each kind, filled with random numbers.'''
+    nlat = restart.NLATS[ntru]
+    nlon = 2*nlat
+    nrsp = (ntru+1)*(ntru+2)
+    rng = np.random.default_rng(42)
+    rest = restart.RestartFile()
+    rest.endian = endian
+    rest.realsize = realsize
+    rest.nlat,rest.nlon,rest.nlev,rest.ntru = nlat,nlon,nlev,ntru
+    contents = [("nstep",11520,"integer"),("nlat",nlat,"integer"),("nlon",nlon,"integer"),
+                ("nlev",nlev,"integer"),("nrsp",nrsp,"integer"),
+                ("seed",np.arange(8,dtype="i4"),"seed"),
+                ("sz",rng.normal(size=(nlev,nrsp)),"spectral"),
+                ("dt",rng.normal(size=(nlev,nlat,nlon)),"grid"),
+                ("dls",(rng.random(size=(1,nlat,nlon))>0.5).astype(float),"grid"),
+                ("tsurf",np.full((1,nlat,nlon),288.0),"grid")]
+    rest.variables = collections.OrderedDict()
+    for name,value,kind in contents:
+        rest.variables[name] = value
+        rest.kinds[name] = kind
+    return rest
+
+@pytest.mark.parametrize("realsize,endian",[(8,"<"),(4,">")])
+def test_roundtrip(tmp_path,realsize,endian):
+    rest = makerestart(realsize=realsize,endian=endian)
+    rest.write(tmp_path/"plasim_restart")
+    back = restart.RestartFile(tmp_path/"plasim_restart")
+    assert list(back.keys())==list(rest.keys())
+    assert (back.nlat,back.nlon,back.nlev,back.ntru)==(32,64,2,21)
+    assert back.realsize==realsize and back.endian==endian
+    for name in rest.keys():
+        assert back.kinds[name]==rest.kinds[name]
+        expected = rest[name]
+        if rest.kinds[name] not in ("integer","seed"):
+            expected = np.asarray(expected).astype("f%d"%realsize)
+        np.testing.assert_array_equal(back[name],expected)
+
+def test_setitem_checks(tmp_path):
+    rest = makerestart()
+    with pytest.raises(KeyError):
+        rest["nosuchfield"] = 1
+    with pytest.raises(ValueError):
+        rest["dt"] = np.zeros((1,2,3))
+    rest["nstep"] = 5.0
+    assert rest["nstep"]==5 and isinstance(rest["nstep"],int)
+
+def test_regrid_spectral_modes():
+    rest = makerestart()
+    up = rest.regrid("T42")
+    oldmodes = restart.spectralmodes(21)
+    newmodes = restart.spectralmodes(42)
+    assert up.ntru==42 and up.nlat==64 and up.nlon==128
+    assert up["nrsp"]==43*44 and up["nlat"]==64 and up["nlon"]==128
+    assert up["nstep"]==rest["nstep"]
+    old = rest["sz"].reshape((2,len(oldmodes),2))
+    new = up["sz"].reshape((2,len(newmodes),2))
+    for k,mode in enumerate(newmodes):
+        if mode in oldmodes: #Each mode keeps its coefficients...
+            np.testing.assert_array_equal(new[:,k,:],old[:,oldmodes.index(mode),:])
+        else:                #...and modes beyond the old truncation start at zero
+            assert np.all(new[:,k,:]==0)
+    np.testing.assert_array_equal(up.regrid("T21")["sz"],rest["sz"]) #Truncating back loses nothing
+
+def test_regrid_gridpoints():
+    rest = makerestart()
+    up = rest.regrid(63)
+    assert up["dt"].shape==(2,96,192)
+    np.testing.assert_allclose(up["tsurf"],288.0) #Interpolation preserves constants
+    assert set(np.unique(up["dls"]))<=set([0.0,1.0]) #Masks are nearest-neighbour
+    assert up["dt"].min()>=rest["dt"].min() and up["dt"].max()<=rest["dt"].max()
+
+def test_regridfile(tmp_path):
+    makerestart().write(tmp_path/"MOST_REST.00009")
+    restart.regridfile(tmp_path/"MOST_REST.00009",tmp_path/"t42_restart","T42")
+    assert restart.RestartFile(tmp_path/"t42_restart").ntru==42
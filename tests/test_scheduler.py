@@ -0,0 +1,55 @@
+import pytest
+
+import slurm
+import torque
+import schedulerstatus
+import mockscheduler
+
+def test_slurm_parsesubmit():
+    assert slurm.parsesubmit("Submitted batch job 123456\n")=="123456"
+    assert slurm.parsesubmit("sbatch: warning: 2 nodes requested\nSubmitted batch job 77\n")=="77"
+    assert slurm.parsesubmit("sbatch: error: Batch job submission failed: Requested node configuration "+
+                             "is not available (2 nodes)\n") is None
+    assert slurm.parsesubmit("") is None
+
+def test_torque_parsesubmit():
+    assert torque.parsesubmit("12345.server.cluster\n")=="12345.server.cluster"
+    assert torque.parsesubmit("12346[].server\n")=="12346[].server"
+    assert torque.parsesubmit("qsub: submit error (Job exceeds queue resource limits MSG=2 nodes)\n") is None
+    assert torque.parsesubmit("") is None
+
+def writescript(path,header):
+    with open(path,"w") as scriptf:
+        scriptf.write("#!/bin/bash\n"+header+"\nbash runtask\n")
+
+@pytest.mark.parametrize("style,backend,header",[("slurm",slurm,"#SBATCH --job-name=run7"),
+                                                 ("torque",torque,"#PBS -N run7")])
+def test_statuscache_with_mock(tmp_path,style,backend,header):
+    writescript(tmp_path/"runplasim",header)
+    scheduler = mockscheduler.MockScheduler(style,user="tester")
+    status = schedulerstatus.StatusCache(interval=3600.0,runner=scheduler,backend=backend)
+    tag = status.submit("runplasim","run7",cwd=str(tmp_path))
+    assert tag is not None
+    assert status.lookup("run7")==tag #Known from the submission, without asking the scheduler
+    assert scheduler.calls.get({"slurm":"squeue","torque":"qstat"}[style],0)==0
+    queued = {"slurm":"PENDING","torque":"Q"}[style]
+    running = {"slurm":"RUNNING","torque":"R"}[style]
+    assert status.state("run7")==queued
+    scheduler.advance()
+    assert status.state("run7")==queued #Still within the polling interval
+    status.refresh(force=True)
+    assert status.state("run7")==running
+    assert status.lookup("run7")==tag
+    assert status.queries==2
+    scheduler.finish(tag)
+    status.refresh(force=True)
+    assert status.state("run7") is None and status.lookup("run7") is None
+
+def test_mock_array_tags():
+    scheduler = mockscheduler.MockScheduler("torque")
+    single = torque.parsesubmit(scheduler(["qsub","runplasim"]))
+    array = torque.parsesubmit(scheduler(torque.SUBARRAY("arrays/sweep.sh","0-9")))
+    assert "[]" not in single and array.endswith("[].mock")
+    assert torque.arraytag(array,3)==array.replace("[]","[3]")
+    with pytest.raises(ValueError):
+        scheduler(["srun","x"])
@@ -0,0 +1,58 @@
+import os
+import json
+
+import stage
+
+def write(path,text):
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    with open(path,"w") as f:
+        f.write(text)
+
+def read(path):
+    with open(path,"r") as f:
+        return f.read()
+
+def test_stage_cycle(tmp_path):
+    workdir = str(tmp_path/"job")
+    scratch = str(tmp_path/"scratch")
+    write(workdir+"/most_plasim_t21_l10_p4.x","executable")
+    write(workdir+"/plasim_namelist","namelist")
+    write(workdir+"/plasim_restart","year 0")
+    write(workdir+"/MOST.00000.nc","output")   #Outputs are never staged in
+    write(workdir+"/snapshots/MOST_SNAP.00000.nc","output")
+
+    assert stage.stagein(workdir,scratch)==(3,len("executable")+len("namelist")+len("year 0"))
+    assert sorted(os.listdir(scratch))==sorted([stage.MANIFEST,"most_plasim_t21_l10_p4.x",
+                                                "plasim_namelist","plasim_restart"])
+    with open(os.path.join(scratch,stage.MANIFEST)) as manifestf:
+        manifest = json.load(manifestf)
+    assert sorted(manifest)==["most_plasim_t21_l10_p4.x","plasim_namelist","plasim_restart"]
+    assert manifest["plasim_restart"]["source"]==stage._stamp(workdir+"/plasim_restart")
+    assert stage.stagein(workdir,scratch)==(0,0) #Nothing has changed
+
+    #The run rewrites the restart and writes a year of output
+    write(scratch+"/plasim_restart","year 1 restart")
+    write(scratch+"/MOST.00001.nc","output 1")
+    write(scratch+"/snapshots/MOST_SNAP.00001.nc","snapshot 1")
+    count,nbytes = stage.stageout(scratch,workdir)
+    assert count==3
+    assert read(workdir+"/plasim_restart")=="year 1 restart"
+    assert read(workdir+"/snapshots/MOST_SNAP.00001.nc")=="snapshot 1"
+    assert not os.path.exists(scratch+"/MOST.00001.nc")  #Outputs don't stay in scratch
+    assert not os.path.exists(scratch+"/snapshots")
+    assert stage.stagein(workdir,scratch)==(0,0)          #The restart is current at both ends
+
+    #Changed and removed inputs
+    write(workdir+"/plasim_namelist","new namelist")
+    os.remove(workdir+"/most_plasim_t21_l10_p4.x")
+    assert stage.stagein(workdir,scratch)==(1,len("new namelist"))
+    assert read(scratch+"/plasim_namelist")=="new namelist"
+    assert not os.path.exists(scratch+"/most_plasim_t21_l10_p4.x")
+
+    #A scratch copy that changed behind the manifest's back is replaced
+    write(scratch+"/plasim_restart","corrupted restart")
+    assert stage.stagein(workdir,scratch)[0]==1
+    assert read(scratch+"/plasim_restart")=="year 1 restart"
+
+    stage.clean(scratch)
+    assert not os.path.exists(scratch)
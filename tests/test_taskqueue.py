@@ -0,0 +1,84 @@
+import os
+import pytest
+
+import slurm
+import taskqueue
+import schedulerstatus
+import mockscheduler
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = taskqueue.TaskQueue(str(tmp_path/"tasks.db"))
+    yield queue
+    queue.close()
+
+def test_importcrwl(tmp_path,queue):
+    with open(tmp_path/"tasks.crwl","w") as crwlf:
+        crwlf.write("# JOBNAME STATUS NCORES QUEUE flux rotationperiod\n"+
+                    "run1 0 8 batch 1367.0 1.0\n"+
+                    "run2 1 8 batch 1200.0 2.0\n"+
+                    "# JOBNAME STATUS NCORES QUEUE flux\n"+
+                    "run3 0 4 short 1000.0\n")
+    assert queue.importcrwl(str(tmp_path/"tasks.crwl"))==3
+    assert queue.importcrwl(str(tmp_path/"tasks.crwl"))==0 #Already queued
+    assert queue.status()=={"queued":2,"running":0,"done":1,"failed":0}
+    assert queue.parameters("run1")==(["flux","rotationperiod"],["1367.0","1.0"])
+    assert queue.parameters("run3")==(["flux"],["1000.0"])
+
+def test_claim_in_order(queue):
+    queue.add("a",8,"batch",["flux"],["1367.0"])
+    queue.add("b",4,"short",["flux","p0"],["1000.0","1.0"])
+    name,header,args = queue.claim()
+    assert name=="a"
+    assert header=="# JOBNAME STATUS NCORES QUEUE flux"
+    assert args=="a 1 8 batch 1367.0"
+    assert queue.claim()[0]=="b"
+    assert queue.claim() is None
+    assert queue.status("a")=="running"
+
+def test_fail_retries_then_gives_up(queue):
+    queue.add("a",8,"batch",[],[],maxattempts=2)
+    queue.claim()
+    assert queue.fail("a","crashed")=="queued"
+    assert queue.claim()[0]=="a"
+    assert queue.fail("a","crashed again")=="failed"
+    assert queue.claim() is None
+    assert queue.requeue("a")=="queued" #A fresh set of attempts
+    assert queue.claim()[0]=="a"
+    assert queue.complete("a")=="done"
+    assert queue.fail("a")=="done" #Only running tasks can fail
+    with pytest.raises(KeyError):
+        queue.complete("nosuchtask")
+
+def test_expired_claims_are_requeued(queue):
+    scheduler = mockscheduler.MockScheduler("slurm")
+    status = schedulerstatus.StatusCache(interval=0.0,runner=scheduler,backend=slurm)
+    queue.add("a",8,"batch",[],[],maxattempts=2)
+    queue.add("b",8,"batch",[],[])
+    assert queue.claim(status=status)[0]=="a"
+    assert queue.claim(walltime=3600.0,status=status)[0]=="b" #a was claimed just now, so it is still alive
+    assert queue.expire(-1.0,margin=0.0,status=status)==["a","b"] #Every claim is older than a negative walltime
+    assert queue.status("a")=="queued" and queue.status("b")=="queued"
+    assert queue.claim(status=status)[0]=="a"
+    assert queue.expire(-1.0,margin=0.0,status=status)==["a"] #a's second attempt expires too, and it has no more
+    assert queue.status("a")=="failed"
+    assert queue.renew("b") is False             #Not running, so nothing to renew
+    assert queue.claim(status=status)[0]=="b"
+    assert queue.renew("b") is True
+
+def test_listed_jobs_never_expire(tmp_path,queue):
+    scheduler = mockscheduler.MockScheduler("slurm")
+    status = schedulerstatus.StatusCache(interval=0.0,runner=scheduler,backend=slurm)
+    for name in ("a","b","c"):
+        queue.add(name,8,"batch",[],[])
+        queue.claim(status=status)
+    scheduler(["sbatch","a"]) #Still waiting in the scheduler's queue
+    os.makedirs(str(tmp_path/"arrays"))
+    with open(str(tmp_path/"arrays"/"sweep1.tasks"),"w") as tablef:
+        tablef.write("# INDEX JOBNAME HOME NCORES QUEUE PARAMETERS\n0 b b 8 batch\n")
+    scheduler(["sbatch","sweep1"]) #b is a member of a job array that is still listed
+    assert queue.expire(-1.0,margin=0.0,status=status)==["c"]
+    assert queue.expire(3600.0,status=status)==[] #Nothing is that old yet
+    scheduler.finish(scheduler.jobs[0][0])
+    assert queue.expire(-1.0,margin=0.0,status=status)==["a"]
+    assert queue.status("b")=="running"
@@ -0,0 +1,29 @@
+import numpy as np
+
+import exoplasimlegacy.telemetry as telemetry
+
+def test_record_and_reload(tmp_path):
+    filename = str(tmp_path/"telemetry.txt")
+    table = telemetry.Telemetry(filename)
+    table.record(0,secondsperyear=10.0,walltime=12.0)
+    table.record(1,walltime=13.0)
+    table.record(0,postprocess=2.0) #Added to the year's row
+    table = telemetry.Telemetry(filename)
+    assert len(table)==2
+    assert table[0]["secondsperyear"]==10.0 and table[0]["postprocess"]==2.0 and table[0]["walltime"]==12.0
+    assert np.isnan(table[1]["secondsperyear"])
+
+def test_tables_with_other_columns_load(tmp_path):
+    filename = str(tmp_path/"telemetry.txt")
+    with open(filename,"w") as tablef: #Written before the walltime column existed
+        tablef.write("# year secondsperyear yearsperday cputime usertime systemtime memory postprocess toa surface\n"+
+                     "3 10 8640 9 8 1 100 2 0.5 0.25\n")
+    table = telemetry.Telemetry(filename)
+    assert len(table)==1 and table[3]["toa"]==0.5 and table[3]["surface"]==0.25
+    assert np.isnan(table[3]["walltime"])
+    table.record(4,walltime=12.0)
+    with open(filename) as tablef:
+        lines = tablef.read().split("\n")
+    assert lines[0]=="# "+" ".join(telemetry.FIELDS) #Rewritten with the current columns
+    table = telemetry.Telemetry(filename)
+    assert sorted(table.rows)==[3,4] and table[3]["surface"]==0.25 and table[4]["walltime"]==12.0